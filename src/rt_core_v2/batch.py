@@ -0,0 +1,301 @@
+from collections import defaultdict
+from dataclasses import fields
+from datetime import datetime, timezone
+from typing import Iterable
+from uuid6 import UUID
+
+from rt_core_v2.rttuple import RtTuple, TupleType, type_to_class
+from rt_core_v2.ids_codes.rui import ID_Rui
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency, only needed for columnar batches
+    np = None
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("TupleBatch requires numpy, install it with 'pip install numpy'")
+
+
+def rui_array(ruis: list[ID_Rui]):
+    """Packs ID_Ruis into an (n, 16) uint8 array holding the bytes of their uuids"""
+    _require_numpy()
+    return np.frombuffer(b"".join(rui.uuid.bytes for rui in ruis), dtype=np.uint8).reshape(len(ruis), 16)
+
+
+def rui_keys(array):
+    """Views an (n, 16) rui array as n opaque 16 byte keys, which numpy can compare, sort and search"""
+    return np.ascontiguousarray(array).view(np.dtype((np.void, 16))).ravel()
+
+
+def rui_pairs(array):
+    """Splits an (n, 16) rui array into the high and low 64 bits of each uuid, as two uint64 arrays"""
+    words = np.ascontiguousarray(array).view(">u8")
+    return words[:, 0].astype(np.uint64), words[:, 1].astype(np.uint64)
+
+
+def unpack_ruis(array) -> list[ID_Rui]:
+    return [ID_Rui(UUID(bytes=row)) for row in rui_keys(array).tolist()]
+
+
+def encode_times(values: list[datetime]):
+    """Encodes datetimes as int64 microseconds since the epoch, naive datetimes are taken as UTC"""
+    return np.array(
+        [(value if value.tzinfo else value.replace(tzinfo=timezone.utc)) - EPOCH for value in values],
+        dtype="timedelta64[us]",
+    ).astype(np.int64)
+
+
+def decode_times(array, naive=None) -> list[datetime]:
+    """Decodes int64 microseconds since the epoch into UTC datetimes, naive where the bool array naive is set"""
+    values = (EPOCH + np.asarray(array).astype("timedelta64[us]").astype(object)).tolist()
+    if naive is None:
+        return values
+    return [value.replace(tzinfo=None) if flag else value for value, flag in zip(values, naive.tolist())]
+
+
+def naive_column(name: str) -> str:
+    """Name of the bool column flagging which timestamps of component name were naive"""
+    return f"{name}.naive"
+
+
+def time_value(value: datetime) -> int:
+    return int(encode_times([value])[0])
+
+
+def _is_rui_array(column) -> bool:
+    return isinstance(column, np.ndarray) and column.ndim == 2 and column.shape[1] == 16
+
+
+class DictionaryColumn:
+    """Column of repeated values stored as int32 codes into a table of distinct values
+
+    Attributes:
+    codes -- The code of the value of every row
+    values -- The distinct values, code i standing for values[i]
+    """
+
+    def __init__(self, codes, values: list):
+        self.codes = codes
+        self.values = values
+
+    @classmethod
+    def encode(cls, values: list) -> "DictionaryColumn":
+        lookup = {}
+        codes = np.fromiter((lookup.setdefault(value, len(lookup)) for value in values), dtype=np.int32, count=len(values))
+        return cls(codes, list(lookup))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def decode(self) -> list:
+        return [self.values[code] for code in self.codes.tolist()]
+
+    def take(self, index) -> "DictionaryColumn":
+        return DictionaryColumn(self.codes[index], self.values)
+
+    def code_of(self, value) -> int:
+        """Returns the code of value, or -1 when no row holds it"""
+        try:
+            return self.values.index(value)
+        except ValueError:
+            return -1
+
+    def equals(self, value):
+        return self.codes == self.code_of(value)
+
+    def isin(self, values):
+        return np.isin(self.codes, [self.code_of(value) for value in values])
+
+
+class ListColumn:
+    """Column of variable length lists stored as one flat member column and row offsets into it
+
+    Attributes:
+    offsets -- int64 array of n + 1 offsets, the members of row i are members[offsets[i]:offsets[i + 1]]
+    members -- The flat member column, a rui array when every member is an ID_Rui and a DictionaryColumn otherwise
+    """
+
+    def __init__(self, offsets, members):
+        self.offsets = offsets
+        self.members = members
+
+    @classmethod
+    def encode(cls, lists: list[list]) -> "ListColumn":
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum([len(entry) for entry in lists], out=offsets[1:])
+        return cls(offsets, _encode_values([member for entry in lists for member in entry]))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def row_of_member(self):
+        """The row each member belongs to"""
+        return np.repeat(np.arange(len(self)), self.lengths())
+
+    def decode(self) -> list[list]:
+        members = unpack_ruis(self.members) if _is_rui_array(self.members) else self.members.decode()
+        bounds = self.offsets.tolist()
+        return [members[begin:end] for begin, end in zip(bounds, bounds[1:])]
+
+    def take(self, index) -> "ListColumn":
+        rows = np.arange(len(self))[index]
+        lengths = self.lengths()[rows]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        member_index = np.repeat(self.offsets[:-1][rows] - offsets[:-1], lengths) + np.arange(offsets[-1])
+        members = self.members[member_index] if _is_rui_array(self.members) else self.members.take(member_index)
+        return ListColumn(offsets, members)
+
+    def contains(self, value):
+        """Mask of the rows whose list holds value"""
+        member_mask = _values_equal(self.members, value)
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.row_of_member()[member_mask]] = True
+        return mask
+
+
+def _encode_values(values: list):
+    if values and all(type(value) is ID_Rui for value in values):
+        return rui_array(values)
+    return DictionaryColumn.encode(values)
+
+
+def _values_equal(column, value):
+    if _is_rui_array(column):
+        if type(value) is not ID_Rui:
+            return np.zeros(len(column), dtype=bool)
+        return rui_keys(column) == rui_keys(rui_array([value]))[0]
+    return column.equals(value)
+
+
+def encode_column(annotation, values: list):
+    """Encodes the values of one component, using the annotation of the component to pick the representation"""
+    if annotation is datetime:
+        return encode_times(values)
+    if annotation is bool:
+        return np.array(values, dtype=bool)
+    if annotation is float:
+        return np.array(values, dtype=np.float64)
+    if getattr(annotation, "__origin__", None) is list:
+        return ListColumn.encode(values)
+    return _encode_values(values)
+
+
+def decode_column(annotation, column, naive=None) -> list:
+    if annotation is datetime:
+        return decode_times(column, naive)
+    if isinstance(column, (DictionaryColumn, ListColumn)):
+        return column.decode()
+    if _is_rui_array(column):
+        return unpack_ruis(column)
+    return column.tolist()
+
+
+class TupleBatch:
+    """Struct of arrays holding many tuples of one type, one column per component
+
+    ID_Rui components are (n, 16) uint8 arrays of uuid bytes, timestamps int64 microseconds since the epoch
+    with a bool column named by naive_column flagging the naive ones, as the binary format does, polarity a bool array and confidence a float64 array. UUIs, relationships, enums, temporal references and
+    other repeated values are dictionary encoded as int32 codes, and lists such as p and replacements are
+    stored as offsets into a flat member column. Filters return boolean masks computed by numpy over whole
+    columns, which can be combined with & and | and applied with filter.
+
+    Attributes:
+    tuple_type -- The type of every tuple in the batch
+    columns -- Mapping from component name to its column
+    """
+
+    def __init__(self, tuple_type: TupleType, columns: dict):
+        _require_numpy()
+        self.tuple_type = tuple_type
+        self.columns = columns
+
+    @classmethod
+    def from_tuples(cls, tuples: Iterable[RtTuple], tuple_type: TupleType = None) -> "TupleBatch":
+        tuples = list(tuples)
+        tuple_type = tuple_type or (tuples[0].tuple_type if tuples else None)
+        if tuple_type is None:
+            raise ValueError("The tuple type of an empty batch must be given")
+        if any(tup.tuple_type is not tuple_type for tup in tuples):
+            raise ValueError(f"Every tuple in a batch must be of type {tuple_type}")
+        _require_numpy()
+        columns = {}
+        for entry in fields(type_to_class[tuple_type]):
+            values = [getattr(tup, entry.name) for tup in tuples]
+            columns[entry.name] = encode_column(entry.type, values)
+            if entry.type is datetime:
+                columns[naive_column(entry.name)] = np.array([value.tzinfo is None for value in values], dtype=bool)
+        return cls(tuple_type, columns)
+
+    def to_tuples(self) -> list[RtTuple]:
+        tuple_class = type_to_class[self.tuple_type]
+        components = {
+            entry.name: decode_column(entry.type, self.columns[entry.name], self.columns.get(naive_column(entry.name)))
+            for entry in fields(tuple_class)
+        }
+        return [tuple_class(**dict(zip(components, values))) for values in zip(*components.values())]
+
+    def __len__(self):
+        return len(self.columns["rui"])
+
+    def __getitem__(self, name: str):
+        return self.columns[name]
+
+    def equals(self, name: str, value):
+        """Mask of the rows whose component name equals value"""
+        column = self.columns[name]
+        if isinstance(value, datetime):
+            return column == time_value(value)
+        if isinstance(column, np.ndarray) and not _is_rui_array(column):
+            return column == value
+        return _values_equal(column, value)
+
+    def isin(self, name: str, values):
+        """Mask of the rows whose component name is one of values, which may also be a rui array such as the rui
+        column of another batch, so that batches can be joined on rui components"""
+        column = self.columns[name]
+        if _is_rui_array(column):
+            if not _is_rui_array(values):
+                values = rui_array([value for value in values if type(value) is ID_Rui])
+            return np.isin(rui_keys(column), rui_keys(values))
+        if isinstance(column, DictionaryColumn):
+            return column.isin(values)
+        return np.isin(column, list(values))
+
+    def contains(self, name: str, value):
+        """Mask of the rows whose list component name holds value"""
+        return self.columns[name].contains(value)
+
+    def between(self, name: str, begin: datetime = None, end: datetime = None):
+        """Mask of the rows whose timestamp component name lies within [begin, end]"""
+        column = self.columns[name]
+        mask = np.ones(len(column), dtype=bool)
+        if begin is not None:
+            mask &= column >= time_value(begin)
+        if end is not None:
+            mask &= column <= time_value(end)
+        return mask
+
+    def filter(self, mask) -> "TupleBatch":
+        """Returns the batch of the rows selected by a boolean mask or an array of row indices"""
+        return TupleBatch(
+            self.tuple_type,
+            {name: column[mask] if isinstance(column, np.ndarray) else column.take(mask)
+             for name, column in self.columns.items()},
+        )
+
+
+def batches_by_type(tuples: Iterable[RtTuple]) -> dict[TupleType, TupleBatch]:
+    """Splits tuples of mixed types into one batch per tuple type"""
+    grouped = defaultdict(list)
+    for tup in tuples:
+        grouped[tup.tuple_type].append(tup)
+    return {tuple_type: TupleBatch.from_tuples(group, tuple_type) for tuple_type, group in grouped.items()}
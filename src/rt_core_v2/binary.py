@@ -0,0 +1,317 @@
+"""Binary tuple format
+
+A record is a one byte tag, the position of the tuple type in TupleType, followed by the components in field
+order without names. ID_Ruis are their raw 16 uuid bytes, preceded by a kind byte wherever a Rui may be of
+another kind. Enums are varints holding their value, or their position in the enum when the values are not
+integers. Timestamps are int64 microseconds since the epoch, strings and bytes are varint length prefixed
+and lists are a varint count followed by their members. Streams of records frame each one with a varint
+length.
+"""
+
+import enum
+import struct
+from dataclasses import fields
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator
+from uuid6 import UUID
+
+from rt_core_v2.rttuple import RtTuple, TupleType, type_to_class
+from rt_core_v2.ids_codes.rui import Rui, ID_Rui, ISO_Rui, UUI, TempRef, Relationship
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+INT64 = struct.Struct("<q")
+DOUBLE = struct.Struct("<d")
+
+RUI_ID = 0
+RUI_ISO = 1
+RUI_NONE = 2
+TIME_NAIVE = 0
+TIME_AWARE = 1
+
+tuple_types = list(TupleType)
+
+
+class BinaryDecodeError(ValueError):
+    """Raised when bytes do not hold a valid binary tuple record"""
+
+
+def write_varint(out: bytearray, value: int):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, offset: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _encode_micros(out: bytearray, value: datetime):
+    out += INT64.pack((value - EPOCH) // timedelta(microseconds=1))
+
+
+def _decode_micros(data, offset: int) -> tuple[datetime, int]:
+    return EPOCH + timedelta(microseconds=INT64.unpack_from(data, offset)[0]), offset + INT64.size
+
+
+def encode_datetime(out: bytearray, value: datetime):
+    if value.tzinfo is None:
+        out.append(TIME_NAIVE)
+        _encode_micros(out, value.replace(tzinfo=timezone.utc))
+    else:
+        out.append(TIME_AWARE)
+        _encode_micros(out, value)
+
+
+def decode_datetime(data, offset: int) -> tuple[datetime, int]:
+    kind = data[offset]
+    value, offset = _decode_micros(data, offset + 1)
+    return (value.replace(tzinfo=None) if kind == TIME_NAIVE else value), offset
+
+
+def encode_rui(out: bytearray, value: Rui):
+    if type(value) is ID_Rui:
+        out.append(RUI_ID)
+        out += value.uuid.bytes
+    elif type(value) is ISO_Rui:
+        out.append(RUI_ISO)
+        _encode_micros(out, value.date)
+    elif value is None:
+        out.append(RUI_NONE)
+    else:
+        raise TypeError(f"Cannot encode {value!r} as a rui")
+
+
+def decode_rui(data, offset: int) -> tuple[Rui, int]:
+    kind = data[offset]
+    offset += 1
+    if kind == RUI_ID:
+        return ID_Rui(UUID(bytes=bytes(data[offset:offset + 16]))), offset + 16
+    if kind == RUI_ISO:
+        date, offset = _decode_micros(data, offset)
+        return ISO_Rui(date), offset
+    if kind == RUI_NONE:
+        return None, offset
+    raise BinaryDecodeError(f"Unknown rui kind {kind}")
+
+
+def encode_temp_ref(out: bytearray, value: TempRef):
+    encode_rui(out, value.ref)
+
+
+def decode_temp_ref(data, offset: int) -> tuple[TempRef, int]:
+    ref, offset = decode_rui(data, offset)
+    return TempRef(ref), offset
+
+
+def encode_bytes(out: bytearray, value: bytes):
+    write_varint(out, len(value))
+    out += value
+
+
+def decode_bytes(data, offset: int) -> tuple[bytes, int]:
+    length, offset = read_varint(data, offset)
+    end = offset + length
+    if end > len(data):
+        raise BinaryDecodeError("Truncated binary tuple record")
+    return bytes(data[offset:end]), end
+
+
+def _text_codec(build):
+    def encode(out: bytearray, value):
+        encode_bytes(out, str(value).encode("utf-8"))
+
+    def decode(data, offset: int):
+        raw, offset = decode_bytes(data, offset)
+        return build(raw.decode("utf-8")), offset
+
+    return encode, decode
+
+
+def _enum_codec(enum_class):
+    if all(isinstance(member.value, int) and member.value >= 0 for member in enum_class):
+        to_number = {member: member.value for member in enum_class}
+        from_number = {member.value: member for member in enum_class}
+    else:
+        to_number = {member: position for position, member in enumerate(enum_class)}
+        from_number = dict(enumerate(enum_class))
+
+    def encode(out: bytearray, value):
+        write_varint(out, to_number[value])
+
+    def decode(data, offset: int):
+        number, offset = read_varint(data, offset)
+        if number not in from_number:
+            raise BinaryDecodeError(f"Invalid {enum_class.__name__} {number}")
+        return from_number[number], offset
+
+    return encode, decode
+
+
+def _encode_bool(out: bytearray, value: bool):
+    out.append(1 if value else 0)
+
+
+def _decode_bool(data, offset: int) -> tuple[bool, int]:
+    return data[offset] != 0, offset + 1
+
+
+def _encode_float(out: bytearray, value: float):
+    out += DOUBLE.pack(value)
+
+
+def _decode_float(data, offset: int) -> tuple[float, int]:
+    return DOUBLE.unpack_from(data, offset)[0], offset + DOUBLE.size
+
+
+def _list_codec(encode_member, decode_member):
+    def encode(out: bytearray, value: list):
+        write_varint(out, len(value))
+        for member in value:
+            encode_member(out, member)
+
+    def decode(data, offset: int):
+        count, offset = read_varint(data, offset)
+        members = []
+        for _ in range(count):
+            member, offset = decode_member(data, offset)
+            members.append(member)
+        return members, offset
+
+    return encode, decode
+
+
+def component_codec(annotation):
+    """Returns the (encode, decode) pair for components annotated with annotation"""
+    if isinstance(annotation, type) and issubclass(annotation, Rui):
+        return encode_rui, decode_rui
+    if annotation is TempRef:
+        return encode_temp_ref, decode_temp_ref
+    if annotation is datetime:
+        return encode_datetime, decode_datetime
+    if annotation is UUI:
+        return _text_codec(UUI)
+    if annotation is Relationship:
+        return _text_codec(Relationship)
+    if annotation is str:
+        return _text_codec(str)
+    if annotation is bytes:
+        return encode_bytes, decode_bytes
+    if annotation is bool:
+        return _encode_bool, _decode_bool
+    if annotation is float:
+        return _encode_float, _decode_float
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        return _enum_codec(annotation)
+    if getattr(annotation, "__origin__", None) is list:
+        return _list_codec(*component_codec(annotation.__args__[0]))
+    raise TypeError(f"No binary encoding for components of type {annotation}")
+
+
+class BinaryTupleCodec:
+    """Encodes and decodes the tuples of one tuple class
+
+    Attributes:
+    tuple_class -- The tuple class
+    tag -- The one byte tag of the tuple type
+    components -- (name, encode, decode) for every component in field order
+    """
+
+    def __init__(self, tuple_class):
+        self.tuple_class = tuple_class
+        self.tag = tuple_types.index(tuple_class.tuple_type)
+        self.components = tuple((entry.name, *component_codec(entry.type)) for entry in fields(tuple_class))
+
+    def encode(self, tup: RtTuple) -> bytes:
+        out = bytearray((self.tag,))
+        for name, encode, _ in self.components:
+            encode(out, getattr(tup, name))
+        return bytes(out)
+
+    def decode(self, data, offset: int = 1) -> tuple[RtTuple, int]:
+        components = {}
+        for name, _, decode in self.components:
+            components[name], offset = decode(data, offset)
+        return self.tuple_class(**components), offset
+
+
+"""Mapping from tuple tag to the codec of its tuple class"""
+binary_codecs = [BinaryTupleCodec(type_to_class[tuple_type]) for tuple_type in tuple_types]
+
+
+def rttuple_to_binary(tup: RtTuple) -> bytes:
+    """Encodes a tuple as a binary record"""
+    return binary_codecs[tuple_types.index(tup.tuple_type)].encode(tup)
+
+
+def binary_to_rttuple(data) -> RtTuple:
+    """Decodes a binary record, raising BinaryDecodeError when it is not a valid tuple"""
+    if not data or data[0] >= len(binary_codecs):
+        raise BinaryDecodeError("Missing or unknown tuple type tag")
+    try:
+        tup, end = binary_codecs[data[0]].decode(data)
+    except (IndexError, struct.error, UnicodeDecodeError) as error:
+        raise BinaryDecodeError(f"Truncated or corrupt binary tuple record: {error}") from error
+    if end != len(data):
+        raise BinaryDecodeError(f"{len(data) - end} trailing bytes after binary tuple record")
+    return tup
+
+
+def write_binary_stream(tuples: Iterable[RtTuple], stream) -> int:
+    """Writes tuples to a binary stream as varint length framed records and returns the number written"""
+    written = 0
+    for tup in tuples:
+        frame = bytearray()
+        record = rttuple_to_binary(tup)
+        write_varint(frame, len(record))
+        stream.write(bytes(frame) + record)
+        written += 1
+    return written
+
+
+def iter_binary_tuples(stream) -> Iterator[RtTuple]:
+    """Lazily reads varint length framed binary records from a binary stream"""
+    while True:
+        length = shift = 0
+        while True:
+            byte = stream.read(1)
+            if not byte:
+                if shift:
+                    raise BinaryDecodeError("Truncated record length")
+                return
+            length |= (byte[0] & 0x7F) << shift
+            shift += 7
+            if byte[0] < 0x80:
+                break
+        record = stream.read(length)
+        if len(record) != length:
+            raise BinaryDecodeError("Truncated binary tuple record")
+        yield binary_to_rttuple(record)
+
+
+def records_to_binary(tuples: Iterable[RtTuple]) -> bytes:
+    """Encodes tuples as varint length framed records in one bytes object"""
+    out = bytearray()
+    for tup in tuples:
+        record = rttuple_to_binary(tup)
+        write_varint(out, len(record))
+        out += record
+    return bytes(out)
+
+
+def iter_binary_records(data: bytes) -> Iterator[RtTuple]:
+    """Decodes the varint length framed records of a bytes object"""
+    data = memoryview(data)
+    offset = 0
+    while offset < len(data):
+        length, offset = read_varint(data, offset)
+        yield binary_to_rttuple(data[offset:offset + length])
+        offset += length
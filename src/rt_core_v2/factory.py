@@ -1,6 +1,10 @@
-from rt_core_v2.rttuple import TupleType, DITuple, DCTuple, TupleComponents, RuiStatus, PorType, TempRef, type_to_class
+from datetime import datetime, timezone
+from typing import Iterable
+
+from rt_core_v2.rttuple import TupleType, DITuple, DCTuple, TupleComponents, RuiStatus, PorType, TempRef, type_to_class, component_names
 from rt_core_v2.metadata import RtChangeReason, TupleEventType
 from rt_core_v2.ids_codes.rui import Rui
+from rt_core_v2.batch import TupleBatch
 
 
 def component_to_string(enum_dict):
@@ -32,6 +36,68 @@ def rttuple_factory(tuple_arguments: dict, type: TupleType, t: TempRef, event: T
 
     return concrete_tuple, meta_tuple
 
+class BatchSchema:
+    """Validates the argument rows of one tuple type, checking each distinct set of keys only once
+
+    Attributes:
+    type -- The tuple type the rows are for
+    components -- The names of the components of the tuple type
+    plans -- Mapping from a validated set of keys to the (key, component name) pairs of a row with those keys
+    """
+
+    def __init__(self, type: TupleType):
+        if type not in type_to_class or type in (TupleType.DI, TupleType.DC):
+            raise ValueError(f"Tuples of type {type} cannot be created by the batch factory")
+        self.type = type
+        self.components = frozenset(component_names(type_to_class[type]))
+        self.plans = {}
+
+    def plan(self, keys) -> tuple:
+        keys = tuple(keys)
+        plan = self.plans.get(keys)
+        if plan is None:
+            names = [key.value if isinstance(key, TupleComponents) else key for key in keys]
+            unknown = [name for name in names if name not in self.components]
+            if unknown:
+                raise ValueError(f"Tuples of type {self.type} have no components {', '.join(map(str, unknown))}")
+            plan = self.plans[keys] = tuple(zip(keys, names))
+        return plan
+
+    def arguments(self, row: dict) -> dict:
+        return {name: row[key] for key, name in self.plan(row)}
+
+
+def rttuple_batch_factory(
+    rows: Iterable[dict],
+    type: TupleType,
+    author: Rui,
+    inserter: Rui = None,
+    t: datetime = None,
+    ta: TempRef = None,
+    event_reason: RtChangeReason = RtChangeReason.RELEVANCE,
+    as_batch: bool = False,
+):
+    """Creates one concrete tuple and its DITuple per argument row
+
+    Rows map TupleComponents or component names to values and are validated against the tuple type once per
+    distinct set of keys, raising ValueError for unknown components. The DITuples share the insertion time t,
+    the author, the inserter, which defaults to the author, and the time of authorship ta. Returns the list of
+    concrete tuples and the list of DITuples, or a TupleBatch of each when as_batch is set.
+    """
+    schema = BatchSchema(type)
+    tuple_class = type_to_class[type]
+    t = t if t else datetime.now().astimezone(timezone.utc)
+    ta = ta if ta else TempRef()
+    inserter = inserter if inserter else author
+    concrete_tuples = [tuple_class(**schema.arguments(row)) for row in rows]
+    meta_tuples = [
+        DITuple(ruit=concrete.rui, ruid=inserter, t=t, event_reason=event_reason, ruia=author, ta=ta)
+        for concrete in concrete_tuples
+    ]
+    if as_batch:
+        return TupleBatch.from_tuples(concrete_tuples, type), TupleBatch.from_tuples(meta_tuples, TupleType.DI)
+    return concrete_tuples, meta_tuples
+
 #TODO Make a factory for each tuple that calls rttuple_factory
 # def create_antuple(rui: Rui=None, ruia: Rui=None, ruin: Rui=None, ar: RuiStatus=RuiStatus.assigned, unique: PorType=PorType.singular, event=TupleEventType.INSERT, event_reason=RtChangeReason.BELIEF, replacements=[], author=None):
 #     antuple_arguments = {TupleComponents.rui:rui, TupleComponents.ruin:ruin, TupleComponents.ar:ar, TupleComponents.unique:unique}
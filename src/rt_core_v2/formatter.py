@@ -1,6 +1,13 @@
+import io
 import json
+import logging
 import enum
 from io import StringIO
+from dataclasses import fields
+from itertools import islice
+from json.encoder import encode_basestring_ascii
+from operator import attrgetter
+from typing import Iterable, Iterator
 from uuid import UUID
 from datetime import datetime
 import base64
@@ -17,10 +24,14 @@ from rt_core_v2.rttuple import (
     ID_Rui, 
     ISO_Rui, 
     UUI,
+    component_names,
 )
 from rt_core_v2.ids_codes.rui import Rui, TempRef, Relationship
+from rt_core_v2.binary import rttuple_to_binary, write_binary_stream
 from rt_core_v2.metadata import TupleEventType, RtChangeReason
 
+logger = logging.getLogger(__name__)
+
 
 class RtTupleJSONEncoder(json.JSONEncoder):
     """Converts contents of RtTuples into a json representation"""
@@ -51,13 +62,80 @@ class ToJsonVisitor(RtTupleVisitor):
     """
     get_attributes = AttributesVisitor()
     def visit(self, host: RtTuple):
+        encode = tuple_json_encoders.get(type(host))
+        if encode is not None:
+            return encode(host)
         return json.dumps(host.accept(self.get_attributes), cls=RtTupleJSONEncoder)
 
 
+_encode_fallback = RtTupleJSONEncoder().encode
+
+
+def _quoted(value) -> str:
+    return '"' + str(value) + '"'
+
+
+def _value_encoder(annotation):
+    """Returns a function encoding one component value exactly as json.dumps with RtTupleJSONEncoder would
+
+    Values of the annotated type take a direct path, anything else is handed to RtTupleJSONEncoder.
+    """
+    if annotation is ID_Rui:
+        return lambda value: _quoted(value) if type(value) is ID_Rui else _encode_fallback(value)
+    if annotation is datetime:
+        return lambda value: _quoted(value) if type(value) is datetime else _encode_fallback(value)
+    if annotation in (UUI, Relationship, TempRef, Rui):
+        return lambda value: encode_basestring_ascii(str(value)) if isinstance(value, annotation) else _encode_fallback(value)
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        members = {member: _encode_fallback(member) for member in annotation}
+        return lambda value: members[value] if type(value) is annotation else _encode_fallback(value)
+    if annotation is bool:
+        return lambda value: ("true" if value else "false") if type(value) is bool else _encode_fallback(value)
+    if annotation is float:
+        return lambda value: float.__repr__(value) if type(value) is float and abs(value) <= 1.7976931348623157e308 else _encode_fallback(value)
+    if annotation is str:
+        return lambda value: encode_basestring_ascii(value) if type(value) is str else _encode_fallback(value)
+    if annotation is bytes:
+        return lambda value: _quoted(base64.b64encode(value).decode("ascii")) if type(value) is bytes else _encode_fallback(value)
+    if getattr(annotation, "__origin__", None) is list:
+        encode_member = _value_encoder(annotation.__args__[0])
+        return lambda value: "[" + ", ".join(map(encode_member, value)) + "]" if type(value) is list else _encode_fallback(value)
+    return _encode_fallback
+
+
+def compile_json_encoder(tuple_class):
+    """Builds a function that serializes tuples of tuple_class to the same JSON as ToJsonVisitor's generic path
+
+    The JSON object holds the components in field order followed by the tuple type, as produced by
+    AttributesVisitor, without building the intermediate dictionary.
+    """
+    names = component_names(tuple_class)
+    get_components = attrgetter(*names)
+    prefixes = ['{"' + names[0] + '": '] + [', "' + name + '": ' for name in names[1:]]
+    steps = tuple(zip(prefixes, [_value_encoder(entry.type) for entry in fields(tuple_class)]))
+    suffix = ', "tuple_type": ' + _encode_fallback(tuple_class.tuple_type) + "}"
+
+    def encode(tup) -> str:
+        return "".join([prefix + encode_value(value) for (prefix, encode_value), value in zip(steps, get_components(tup))]) + suffix
+
+    return encode
+
+
+"""Mapping from tuple class to its compiled JSON encoder"""
+tuple_json_encoders = {tuple_class: compile_json_encoder(tuple_class) for tuple_class in type_to_class.values()}
+
+
+class ToBinaryVisitor(RtTupleVisitor):
+    """Converts an RtTuple into the compact binary record of rt_core_v2.binary"""
+    def visit(self, host: RtTuple):
+        return rttuple_to_binary(host)
+
+
 # TODO Swap this from an enum to a dictionary
 class RtTupleFormat(enum.Enum):
     """A mapping from data represenation formats to functions that perform the conversion on RtTuples"""
     json_format = ToJsonVisitor()
+    binary_format = ToBinaryVisitor()
 
 
 def format_rttuple(tuple: RtTuple, format: RtTupleFormat = RtTupleFormat.json_format):
@@ -80,6 +158,42 @@ def write_tuples(
         stream.write(tup)
 
 
+def write_tuples_stream(
+    tuples: Iterable[RtTuple],
+    stream,
+    format: RtTupleFormat = RtTupleFormat.json_format,
+    chunk_size: int = 1024,
+) -> int:
+    """Writes tuples to the stream as JSON Lines, one formatted tuple per line, and returns the number written
+
+    The tuples are consumed lazily and written chunk_size records at a time, so memory use does not depend on
+    the number of tuples. Binary streams receive UTF-8 encoded lines. The binary format is written as length
+    framed records instead, see rt_core_v2.binary.
+    """
+    if format is RtTupleFormat.binary_format:
+        return write_binary_stream(tuples, stream)
+    binary = isinstance(stream, (io.RawIOBase, io.BufferedIOBase))
+    tuples = iter(tuples)
+    written = 0
+    while batch := list(islice(tuples, chunk_size)):
+        chunk = [formatted for formatted in (format_rttuple(tup, format) for tup in batch) if formatted]
+        if not chunk:
+            continue
+        lines = "\n".join(chunk) + "\n"
+        stream.write(lines.encode("utf-8") if binary else lines)
+        written += len(chunk)
+    return written
+
+
+def iter_tuples(stream) -> Iterator[RtTuple]:
+    """Lazily reads tuples from a text or binary stream of JSON Lines, skipping blank lines and invalid records"""
+    for line in stream:
+        if line.strip():
+            tup = json_to_rttuple(line)
+            if tup is not None:
+                yield tup
+
+
 class JsonEntryConverter:
     """Contains functions for converting correclty formatted json representations of tuple fields to tuple fields"""
     format = "%Y-%m-%d %H:%M:%S.%f%z"
@@ -98,7 +212,7 @@ class JsonEntryConverter:
     
     @staticmethod
     def str_to_isorui(x: str) -> ISO_Rui:
-        return ISO_Rui(datetime.strptime(x, JsonEntryConverter.format))
+        return ISO_Rui(JsonEntryConverter.process_datetime(x))
     
     @staticmethod 
     def str_to_uui(x: str) -> UUI:
@@ -118,7 +232,11 @@ class JsonEntryConverter:
     
     @staticmethod
     def process_datetime(x: str):
-        return datetime.strptime(x, JsonEntryConverter.format)
+        # fromisoformat reads str(datetime) output directly and is much faster than strptime
+        try:
+            return datetime.fromisoformat(x)
+        except ValueError:
+            return datetime.strptime(x, JsonEntryConverter.format)
     
     @staticmethod
     def process_temp_ref(x: str):
@@ -167,19 +285,105 @@ json_entry_converter = {
 }
 
 
+class TupleDecodeError(ValueError):
+    """Raised when a JSON record cannot be decoded into a tuple
+
+    Attributes:
+    tuple_type -- The tuple type named by the record, if any
+    component -- The offending component, if any
+    value -- The offending value
+    """
+
+    def __init__(self, message: str, tuple_type=None, component: str = None, value=None):
+        super().__init__(message)
+        self.tuple_type = tuple_type
+        self.component = component
+        self.value = value
+
+
+def _str_to_rui(x: str) -> Rui:
+    return JsonEntryConverter.str_to_isorui(x) if ':' in x else ID_Rui(UUID(x))
+
+
+def _str_to_temp_ref(x: str) -> TempRef:
+    return TempRef(_str_to_rui(x))
+
+
+"""Mapping from component name to the function decoding its JSON value, matching json_entry_converter"""
+component_decoders = {
+    "rui": lambda x: ID_Rui(UUID(x)),
+    "ruin": lambda x: ID_Rui(UUID(x)),
+    "ruia": lambda x: ID_Rui(UUID(x)),
+    "ruid": lambda x: ID_Rui(UUID(x)),
+    "ruit": lambda x: ID_Rui(UUID(x)),
+    "ruitn": lambda x: ID_Rui(UUID(x)),
+    "ruio": lambda x: ID_Rui(UUID(x)),
+    "ruir": UUI,
+    "ruics": UUI,
+    "ruidt": UUI,
+    "t": JsonEntryConverter.process_datetime,
+    "ta": _str_to_temp_ref,
+    "tr": _str_to_temp_ref,
+    "ar": RuiStatus,
+    "unique": PorType,
+    "event": TupleEventType,
+    "event_reason": RtChangeReason,
+    "replacements": lambda x: [_str_to_rui(entry) for entry in x],
+    "p": lambda x: [_str_to_rui(entry) for entry in x],
+    "C": float,
+    "polarity": bool,
+    "r": Relationship,
+    "code": str,
+    "data": base64.b64decode,
+}
+
+
+def compile_json_decoder(tuple_class):
+    """Builds a function that turns a parsed JSON object into a tuple of tuple_class, raising TupleDecodeError"""
+    tuple_type = tuple_class.tuple_type
+    decoders = {name: component_decoders[name] for name in component_names(tuple_class)}
+    type_key = TupleComponents.type.value
+
+    def decode(tuple_dict: dict) -> RtTuple:
+        components = {}
+        for key, value in tuple_dict.items():
+            decode_value = decoders.get(key)
+            if decode_value is None:
+                if key == type_key:
+                    continue
+                raise TupleDecodeError(f"{tuple_type} tuples have no component {key}", tuple_type, key, value)
+            try:
+                components[key] = decode_value(value)
+            except (ValueError, TypeError, AttributeError) as error:
+                raise TupleDecodeError(f"Invalid {key} of {tuple_type} tuple: {value!r} ({error})", tuple_type, key, value) from error
+        return tuple_class(**components)
+
+    return decode
+
+
+"""Mapping from the JSON value of a tuple type to the decoder of its tuple class"""
+tuple_json_decoders = {tuple_type.value: compile_json_decoder(tuple_class) for tuple_type, tuple_class in type_to_class.items()}
+
+
+def decode_rttuple(tuple_json) -> RtTuple:
+    """Map a json to an rttuple, raising TupleDecodeError when the json does not describe a valid tuple"""
+    try:
+        tuple_dict = json.loads(tuple_json)
+    except ValueError as error:
+        raise TupleDecodeError(f"Invalid rttuple-json: {error}", value=tuple_json) from error
+    if not isinstance(tuple_dict, dict):
+        raise TupleDecodeError("An rttuple-json must be an object", value=tuple_dict)
+    tuple_type = tuple_dict.get(TupleComponents.type.value)
+    decode = tuple_json_decoders.get(tuple_type) if isinstance(tuple_type, str) else None
+    if decode is None:
+        raise TupleDecodeError(f"Unknown tuple type {tuple_type!r}", tuple_type, TupleComponents.type.value, tuple_type)
+    return decode(tuple_dict)
+
+
 def json_to_rttuple(tuple_json) -> RtTuple:
-    """Map a json to an rttuple"""
-    tuple_dict = json.loads(tuple_json)
-    for key, value in tuple_dict.items():
-        try:
-            entry = TupleComponents(key)
-            tuple_dict[key] = json_entry_converter[entry](value)
-        except ValueError:
-            # TODO Log error
-            print(
-                f"Invalid rttuple-json processed due to key: {key} with entry: {value}. The processing of this tuple has been skipped."
-            )
-            return None
-    tuple_class = type_to_class[tuple_dict[TupleComponents.type.value]]
-    del tuple_dict[TupleComponents.type.value]
-    return tuple_class(**tuple_dict)
+    """Map a json to an rttuple, logging and returning None when the json is not a valid tuple"""
+    try:
+        return decode_rttuple(tuple_json)
+    except TupleDecodeError as error:
+        logger.warning("Invalid rttuple-json skipped: %s", error)
+        return None
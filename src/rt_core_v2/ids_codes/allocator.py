@@ -0,0 +1,205 @@
+import os
+import threading
+from typing import Optional
+from uuid import SafeUUID
+from uuid6 import uuid7, UUID
+
+from rt_core_v2.ids_codes.rui import Rui, ID_Rui
+from rt_core_v2.rttuple import ANTuple, RuiStatus, TupleType
+from rt_core_v2.persist.rts_store import RtStore, TupleQuery
+
+
+def fresh_rui(value: int) -> ID_Rui:
+    """Builds the ID_Rui of a uuid integer known to be valid and unused
+
+    Like ID_Rui(), the rui is unique by construction, so it bypasses UUID validation.
+    """
+    identifier = object.__new__(UUID)
+    object.__setattr__(identifier, "int", value)
+    object.__setattr__(identifier, "is_safe", SafeUUID.unknown)
+    rui = object.__new__(ID_Rui)
+    object.__setattr__(rui, "identifier", identifier)
+    return rui
+
+
+class RuiBlock:
+    """A contiguous range of uuid7 ruis reserved for a single thread or process
+
+    The block shares the timestamp and random bits of one uuid7 and numbers its ruis in the low bits of the
+    random field, so the ruis of a block are ordered and allocating one is a counter increment. The first rui
+    of a block names it in the ANTuple recording the block and is never handed out. Blocks are picklable and
+    can be handed to worker processes, which allocate from their copy without any round trip and hand it back
+    to be released.
+
+    Attributes:
+    base -- The integer of the first uuid of the block
+    size -- The number of ruis in the block, including the first
+    issued -- The number of ruis of the block used so far, including the first
+    """
+
+    def __init__(self, base: int, size: int):
+        self.base = base
+        self.size = size
+        self.issued = 1
+        self.pid = os.getpid()
+
+    def __contains__(self, rui: Rui) -> bool:
+        return type(rui) is ID_Rui and 0 <= rui.uuid.int - self.base < self.size
+
+    @property
+    def exhausted(self) -> bool:
+        return self.issued >= self.size
+
+    def allocate(self) -> Optional[ID_Rui]:
+        """Returns the next rui of the block, or None when the block is exhausted"""
+        if self.issued >= self.size:
+            return None
+        rui = fresh_rui(self.base + self.issued)
+        self.issued += 1
+        return rui
+
+
+class RuiAllocator:
+    """Hands out collision free uuid7 ruis from per-thread blocks
+
+    Each thread allocates from its own block without locking and only takes the lock to reserve a new block
+    once the current one is exhausted. A block that is still open in a forked child process is never reused
+    by the child. New blocks are reserved from a fresh uuid7, aligned on their size. The unused remainder of a
+    released block is reused by the next block reserved, so the ruis handed out by one thread increase within
+    a block but a reused remainder may be older than the block before it.
+
+    When a store is given, every block is recorded in it as an ANTuple for the first rui of the block: a new
+    block with ar=RuiStatus.reserved and a reused remainder with ar=RuiStatus.assigned. Releasing a block
+    records the first unused rui of its remainder with ar=RuiStatus.reserved. The first time a block is
+    reserved, the remainders released before the store was reopened are read back from these ANTuples: the
+    ruis of an aligned range are only handed out in increasing order, so a remainder is free when the greatest
+    rui recorded in its range is its reserved, unaligned, first rui. The ANTuples are saved and committed from
+    a thread of their own, so they never join the transaction of the thread that reserved the block. Whether
+    a rui has been handed out is only tracked in memory, for the blocks still open. block_bits must stay the
+    same for a store across runs.
+
+    Attributes:
+    block_bits -- Blocks hold 2 ** block_bits ruis
+    store -- The store recording the reserved blocks, or None
+    reserved -- Mapping from the aligned base of every block reserved and not yet released to the block
+    free -- The (base, size) of the released remainders not yet reused
+    reclaimed -- Whether the remainders recorded in the store have been read back
+    """
+
+    def __init__(self, block_bits: int = 12, store: RtStore = None):
+        if not 0 < block_bits <= 62:
+            raise ValueError("Blocks must hold between 2 and 2 ** 62 ruis")
+        self.block_bits = block_bits
+        self.store = store
+        self.reserved: dict[int, RuiBlock] = {}
+        self.free: list[tuple[int, int]] = []
+        self.reclaimed = store is None
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.pid = os.getpid()
+
+    def _after_fork(self):
+        # A forked child shares the reservations of its parent, so it must not hand out any of them
+        self.reserved = {}
+        self.free = []
+        self.reclaimed = True
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def _aligned(self, value: int) -> int:
+        return value & ~((1 << self.block_bits) - 1)
+
+    def _record(self, first: int, status: RuiStatus):
+        errors = []
+
+        def save():
+            try:
+                self.store.save_tuple(ANTuple(ruin=fresh_rui(first), ar=status))
+                self.store.commit()
+            except BaseException as error:
+                errors.append(error)
+
+        recorder = threading.Thread(target=save, name="rt-rui-reservation")
+        recorder.start()
+        recorder.join()
+        if errors:
+            raise errors[0]
+
+    def _reclaim(self):
+        """Reads back the remainders released in earlier runs from the ANTuples of the store"""
+        greatest: dict[int, tuple[int, bool]] = {}
+        for tup in self.store.run_query(TupleQuery(types={TupleType.AN})):
+            if type(tup.ruin) is not ID_Rui:
+                continue
+            value = tup.ruin.uuid.int
+            aligned = self._aligned(value)
+            free = tup.ar is RuiStatus.reserved and value != aligned
+            known, known_free = greatest.get(aligned, (-1, False))
+            if value > known or (value == known and known_free and not free):
+                greatest[aligned] = (value, free)
+        size = 1 << self.block_bits
+        self.free += [(value, aligned + size - value) for aligned, (value, free) in greatest.items() if free]
+        self.reclaimed = True
+
+    def reserve_block(self) -> RuiBlock:
+        """Reserves a block, reusing a released remainder if any, and records it in the store, if any"""
+        if self.pid != os.getpid():
+            self._after_fork()
+        with self.lock:
+            if not self.reclaimed:
+                self._reclaim()
+            remainder = self.free.pop() if self.free else None
+        if remainder is not None:
+            block = RuiBlock(*remainder)
+            status = RuiStatus.assigned
+        else:
+            size = 1 << self.block_bits
+            # The version and variant bits of a uuid7 lie above the 62 bits of rand_b, so clearing the low
+            # bits keeps the base a valid uuid7
+            block = RuiBlock(uuid7().int & ~(size - 1), size)
+            status = RuiStatus.reserved
+        if self.store is not None:
+            self._record(block.base, status)
+        with self.lock:
+            self.reserved[self._aligned(block.base)] = block
+        return block
+
+    def release(self, block: RuiBlock):
+        """Stops tracking a block, keeping its unused ruis, if any, for the next block reserved"""
+        with self.lock:
+            self.reserved.pop(self._aligned(block.base), None)
+        remainder = block.size - block.issued
+        # A remainder of one rui would only hold the rui naming it
+        if remainder < 2:
+            return
+        if self.store is not None:
+            self._record(block.base + block.issued, RuiStatus.reserved)
+        with self.lock:
+            self.free.append((block.base + block.issued, remainder))
+
+    def allocate(self) -> ID_Rui:
+        block = getattr(self.local, "block", None)
+        if block is None or block.pid != os.getpid() or block.exhausted:
+            if block is not None and block.pid == os.getpid():
+                self.release(block)
+            block = self.local.block = self.reserve_block()
+        return block.allocate()
+
+    def allocate_many(self, count: int) -> list[ID_Rui]:
+        ruis = []
+        while len(ruis) < count:
+            ruis.append(self.allocate())
+        return ruis
+
+    def status(self, rui: Rui) -> Optional[RuiStatus]:
+        """Whether a rui of an open block has been used (assigned) or not yet (reserved)
+
+        Ruis of released blocks are no longer tracked and, like ruis from elsewhere, have no status.
+        """
+        if type(rui) is not ID_Rui:
+            return None
+        with self.lock:
+            block = self.reserved.get(self._aligned(rui.uuid.int))
+        if block is None or rui not in block:
+            return None
+        return RuiStatus.assigned if rui.uuid.int - block.base < block.issued else RuiStatus.reserved
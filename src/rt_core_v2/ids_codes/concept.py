@@ -1,3 +1,7 @@
+import csv
+from typing import Iterable, Optional
+
+
 class Concept:
     """concept based system concept code"""
 
@@ -18,3 +22,44 @@ class Attribute:
         self.name = any_name
 
     # TODO Add a __str__
+
+
+class ConceptRegistry:
+    """Concepts of whole code systems, keyed by code system and code
+
+    Attributes:
+    concepts -- Mapping from (cs_rui, code) to the Concept
+    code_systems -- Mapping from a code system to the codes registered for it
+    """
+
+    def __init__(self):
+        self.concepts: dict[tuple, Concept] = {}
+        self.code_systems: dict = {}
+
+    def load_code_system(self, cs_rui, entries: Iterable) -> int:
+        """Registers a code system in one pass over (code, name) pairs, or a mapping from code to name,
+        and returns the number of concepts registered"""
+        if isinstance(entries, dict):
+            entries = entries.items()
+        codes = self.code_systems.setdefault(cs_rui, set())
+        count = 0
+        for code, name in entries:
+            self.concepts[(cs_rui, code)] = Concept(code, cs_rui, name)
+            codes.add(code)
+            count += 1
+        return count
+
+    def load_code_system_file(self, cs_rui, path: str, delimiter: str = "\t", code_column: int = 0, name_column: int = 1, header: bool = True) -> int:
+        """Registers a code system from a delimited file with one concept per row"""
+        with open(path, newline="", encoding="utf-8") as code_file:
+            rows = csv.reader(code_file, delimiter=delimiter)
+            if header:
+                next(rows, None)
+            return self.load_code_system(cs_rui, ((row[code_column], row[name_column]) for row in rows if row))
+
+    def get(self, cs_rui, code) -> Optional[Concept]:
+        return self.concepts.get((cs_rui, code))
+
+    def concept(self, cs_rui, code) -> Concept:
+        """The registered concept, or an unnamed one for codes of unregistered code systems"""
+        return self.concepts.get((cs_rui, code)) or Concept(code, cs_rui)
@@ -1,9 +1,76 @@
 from uuid6 import uuid7, UUID
 from typing import Union
 from datetime import datetime, timezone
-from abc import ABC, abstractmethod
+from abc import ABC, ABCMeta, abstractmethod
+from weakref import WeakValueDictionary
 
-class Rui(ABC):
+
+class InternPool(ABCMeta):
+    """Metaclass that shares one instance of an identifier class per identifier
+
+    Used for the shared vocabulary, UUI and Relationship, whose few values are repeated across many tuples:
+    constructing one from an identifier that is already in use returns the existing instance, so repeated
+    identifiers share a single object. The pool only holds weak references, so identifiers no longer
+    referenced by any tuple are released. Ruis and temporal references are mostly unique and are not pooled,
+    as a pool entry would cost more than the object it saves.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        cls._pool = WeakValueDictionary()
+
+    def __call__(cls, *args, **kwargs):
+        identifier = args[0] if args else next(iter(kwargs.values()), None)
+        if identifier is None:
+            return super().__call__(*args, **kwargs)
+        pooled = cls._pool.get(identifier)
+        if pooled is not None:
+            return pooled
+        instance = super().__call__(*args, **kwargs)
+        return cls._pool.setdefault(instance._intern_key(), instance)
+
+
+class Identifier:
+    """Shared behaviour of identifiers, which are immutable, hashable and never copied
+
+    Identifier classes declare __slots__ so that the many identifier objects held by tuples carry no __dict__.
+    Their value is set once by __init__ and cannot be reassigned, as one identifier object is shared by every
+    tuple, pool and index holding it.
+    """
+
+    __slots__ = ()
+
+    def _intern_key(self):
+        return self.identifier
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __hash__(self):
+        return hash(self._intern_key())
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, type(self)):
+            return False
+        return self._intern_key() == other._intern_key()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        # Unpickling goes through the constructor, and so through the pool of the receiving process for pooled classes
+        return type(self), (self._intern_key(),)
+
+
+class Rui(Identifier, ABC):
     """Referent Unique Identifier (RUI)
     A unique identifier for referent tracking.
 
@@ -11,6 +78,8 @@ class Rui(ABC):
     identifier -- The unique identifier of the Rui.
     """
 
+    __slots__ = ("identifier",)
+
     @abstractmethod
     def __init__(self, identifier):
         pass
@@ -18,11 +87,6 @@ class Rui(ABC):
     def __str__(self):
         return str(self.identifier)
 
-    def __eq__(self, other):
-        if not isinstance(other, type(self)):
-            return False
-        return self.identifier == other.identifier
-
 
 class ID_Rui(Rui):
     """ID-Based Referent Unique Identifier (RUI)
@@ -32,17 +96,15 @@ class ID_Rui(Rui):
     identifier -- A UUID that serves as the unique identifier.
     """
 
+    __slots__ = ()
+
     def __init__(self, identifier: UUID = None):
-        self.identifier = identifier if identifier else uuid7()
+        object.__setattr__(self, "identifier", identifier if identifier else uuid7())
 
     @property
     def uuid(self):
         return self.identifier
 
-    @uuid.setter
-    def uuid(self, uuid):
-        self.identifier = uuid
-
 
 class ISO_Rui(Rui):
     """ISO-Date Based Referent Unique Identifier (RUI)
@@ -52,21 +114,18 @@ class ISO_Rui(Rui):
     identifier -- A datetime object representing the ISO-based identifier.
     """
 
+    __slots__ = ()
+
     def __init__(self, identifier: datetime = None):
         identifier = identifier if identifier else datetime.now()
-        identifier = identifier.astimezone(timezone.utc)
-        self.identifier = identifier
+        object.__setattr__(self, "identifier", identifier.astimezone(timezone.utc))
 
     @property
     def date(self):
         return self.identifier
 
-    @date.setter
-    def date(self, date):
-        self.identifier = date
 
-
-class UUI:
+class UUI(Identifier, metaclass=InternPool):
     """Universal Unique Identifier (UUI)
     A unique identifier stored as a string.
 
@@ -74,40 +133,37 @@ class UUI:
     identifier -- A string representing the unique identifier.
     """
 
+    __slots__ = ("identifier", "__weakref__")
+
     def __init__(self, identifier: str = "http://default_uri.com"):
-        self.identifier = identifier
+        object.__setattr__(self, "identifier", identifier)
 
     def __str__(self):
         return str(self.identifier)
 
-    def __eq__(self, other):
-        if not isinstance(other, type(self)):
-            return False
-        return self.identifier == other.identifier
-
 
-class TempRef:
+class TempRef(Identifier):
     """Temporal Reference (TempRef)
-    A tuple component that represents either a calendar date 
+    A tuple component that represents either a calendar date
     or a unique identifier corresponding to an instance or interval of time.
 
     Attributes:
     ref -- Identifier for the temporal reference, either a Rui or a datetime.
     """
 
+    __slots__ = ("ref",)
+
     def __init__(self, tr: Rui = None):
-        self.ref = tr if tr else ID_Rui()
+        object.__setattr__(self, "ref", tr if tr else ID_Rui())
+
+    def _intern_key(self):
+        return self.ref
 
     def __str__(self):
         return str(self.ref)
 
-    def __eq__(self, other):
-        if not isinstance(other, type(self)):
-            return False
-        return self.ref == other.ref
-
 
-class Relationship:
+class Relationship(Identifier, metaclass=InternPool):
     """Relationship Component
     Represents a relationship using a URI.
 
@@ -115,13 +171,13 @@ class Relationship:
     uri -- A string representing the URI of the relationship.
     """
 
+    __slots__ = ("uri", "__weakref__")
+
     def __init__(self, uri: str = "http://invalid_relationship.com"):
-        self.uri = uri
+        object.__setattr__(self, "uri", uri)
+
+    def _intern_key(self):
+        return self.uri
 
     def __str__(self):
         return str(self.uri)
-
-    def __eq__(self, other):
-        if not isinstance(other, type(self)):
-            return False
-        return self.__dict__ == other.__dict__
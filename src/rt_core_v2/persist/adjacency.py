@@ -0,0 +1,108 @@
+from collections import defaultdict, deque
+from typing import Iterable, Optional
+
+from rt_core_v2.rttuple import NtoNTuple
+from rt_core_v2.ids_codes.rui import Rui, Relationship
+
+
+class AdjacencyIndex:
+    """Graph of the particulars related by NtoN tuples, for neighbourhood and path queries
+
+    Every positive NtoN tuple is an edge joining all the particulars in its p list, labelled with its
+    relationship. Traversals ignore direction and may be restricted to a set of relationships and told to
+    skip tuples, such as invalidated ones.
+
+    Attributes:
+    edges -- Mapping from a rui to the ruis of the NtoN tuples it participates in
+    edges_by_relationship -- Mapping from (rui, relationship) to the ruis of those tuples asserting relationship
+    participants -- Mapping from an NtoN tuple rui to its relationship and participants
+    """
+
+    def __init__(self):
+        self.edges: dict[Rui, set] = defaultdict(set)
+        self.edges_by_relationship: dict[tuple, set] = defaultdict(set)
+        self.participants: dict[Rui, tuple[Relationship, tuple]] = {}
+
+    def add(self, tup: NtoNTuple):
+        if not tup.polarity:
+            return
+        self.participants[tup.rui] = (tup.r, tuple(tup.p))
+        for participant in tup.p:
+            self.edges[participant].add(tup.rui)
+            self.edges_by_relationship[(participant, tup.r)].add(tup.rui)
+
+    def tuples_of(self, rui: Rui, relationships: Iterable[Relationship] = None) -> tuple:
+        """The ruis of the NtoN tuples rui participates in, optionally only those asserting one of relationships
+
+        The ruis are copied out of the index, so callers can iterate them while commits add edges.
+        """
+        if relationships is None:
+            return tuple(self.edges.get(rui, ()))
+        found = set()
+        for relationship in relationships:
+            found.update(tuple(self.edges_by_relationship.get((rui, relationship), ())))
+        return tuple(found)
+
+    def neighbors(self, rui: Rui, relationships: Iterable[Relationship] = None, skip: set = frozenset()) -> set[Rui]:
+        """The particulars related to rui by a single NtoN tuple"""
+        found = set()
+        for tuple_rui in self.tuples_of(rui, relationships):
+            if tuple_rui not in skip:
+                found.update(self.participants[tuple_rui][1])
+        found.discard(rui)
+        return found
+
+    def k_hop(self, rui: Rui, hops: int, relationships: Iterable[Relationship] = None, skip: set = frozenset()) -> dict[Rui, int]:
+        """Breadth-first neighbourhood of rui, mapping every particular within hops steps to its distance"""
+        relationships = None if relationships is None else list(relationships)
+        distances = {rui: 0}
+        frontier = [rui]
+        for distance in range(1, hops + 1):
+            next_frontier = []
+            for current in frontier:
+                for neighbor in self.neighbors(current, relationships, skip):
+                    if neighbor not in distances:
+                        distances[neighbor] = distance
+                        next_frontier.append(neighbor)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return distances
+
+    def follow(self, rui: Rui, steps: Iterable[Relationship], skip: set = frozenset()) -> set[Rui]:
+        """The particulars reached from rui by following one relationship per step, such as
+        patient -> encounter -> specimen -> result"""
+        current = {rui}
+        for relationship in steps:
+            current = set().union(*(self.neighbors(entry, (relationship,), skip) for entry in current))
+            if not current:
+                break
+        return current
+
+    def shortest_path(
+        self, source: Rui, target: Rui, max_hops: int, relationships: Iterable[Relationship] = None, skip: set = frozenset()
+    ) -> Optional[list[tuple[Rui, Optional[Rui]]]]:
+        """A shortest path of at most max_hops steps as (particular, rui of the NtoN tuple reaching it) pairs,
+        starting with (source, None), or None when target is not within reach"""
+        relationships = None if relationships is None else list(relationships)
+        parents = {source: None}
+        queue = deque([(source, 0)])
+        while queue:
+            current, distance = queue.popleft()
+            if current == target:
+                path = []
+                while current is not None:
+                    parent = parents[current]
+                    path.append((current, parent[1] if parent else None))
+                    current = parent[0] if parent else None
+                return path[::-1]
+            if distance == max_hops:
+                continue
+            for tuple_rui in self.tuples_of(current, relationships):
+                if tuple_rui in skip:
+                    continue
+                for neighbor in self.participants[tuple_rui][1]:
+                    if neighbor not in parents:
+                        parents[neighbor] = (current, tuple_rui)
+                        queue.append((neighbor, distance + 1))
+        return None
@@ -0,0 +1,199 @@
+import asyncio
+import copy
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Optional
+from weakref import WeakKeyDictionary
+
+from rt_core_v2.rttuple import RtTuple
+from rt_core_v2.ids_codes.rui import Rui
+from rt_core_v2.persist.rts_store import RtStore, TupleQuery
+
+
+class AsyncRtStore(ABC):
+    """asyncio counterpart of RtStore"""
+
+    @abstractmethod
+    async def save_tuple(self, tup: RtTuple) -> bool:
+        pass
+
+    @abstractmethod
+    async def commit(self):
+        pass
+
+    @abstractmethod
+    async def rollback(self):
+        pass
+
+    @abstractmethod
+    async def shut_down(self):
+        pass
+
+    @abstractmethod
+    async def get_tuple(self, rui: Rui) -> RtTuple:
+        pass
+
+    @abstractmethod
+    async def get_by_referent(self, rui: Rui) -> set[RtTuple]:
+        pass
+
+    @abstractmethod
+    def run_query(self, query: TupleQuery) -> AsyncIterator[RtTuple]:
+        """Streams the tuples matching the query"""
+        pass
+
+
+class BatchingAsyncRtStore(AsyncRtStore):
+    """AsyncRtStore running a synchronous RtStore on a single worker thread
+
+    Requests awaited concurrently are queued and dispatched together as one job on the worker thread, so the
+    event loop never blocks on the store and pays one thread hop per batch instead of one per request. Within a
+    batch, requests run in the order they were made, identical lookups reach the store once, and consecutive
+    commits are written as a single commit of the store, whose outcome they share. Lookups are otherwise made
+    one by one, as RtStore has no multi-key reads.
+
+    Saved tuples are buffered per asyncio task in the adapter and only reach the store when the task commits,
+    when they are saved and committed in one step on the worker thread, so a task's commit or rollback never
+    affects the tuples saved by other tasks.
+
+    Attributes:
+    store -- The wrapped store
+    max_batch -- The largest number of requests dispatched as one job
+    chunk_size -- The number of query results handed to the event loop at a time
+    queue -- The requests waiting for the next batch, as (operation, argument, future)
+    pending -- Mapping from task to the tuples it saved since its last commit or rollback
+    """
+
+    def __init__(self, store: RtStore, max_batch: int = 1024, chunk_size: int = 256):
+        self.store = store
+        self.max_batch = max_batch
+        self.chunk_size = chunk_size
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rt-store")
+        self.queue: list[tuple[str, object, asyncio.Future]] = []
+        self.pending: WeakKeyDictionary[asyncio.Task, list[RtTuple]] = WeakKeyDictionary()
+        self.dispatching = False
+
+    def _request(self, operation: str, argument=None) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.queue.append((operation, argument, future))
+        if not self.dispatching:
+            self.dispatching = True
+            loop.call_soon(self._dispatch)
+        return future
+
+    def _dispatch(self):
+        batch, self.queue = self.queue[: self.max_batch], self.queue[self.max_batch:]
+        loop = asyncio.get_running_loop()
+        job = loop.run_in_executor(self.executor, self._run_batch, [(operation, argument) for operation, argument, _ in batch])
+        job.add_done_callback(lambda done: self._complete(batch, done))
+
+    def _complete(self, batch, job: asyncio.Future):
+        if job.exception() is not None:
+            outcomes = [(False, job.exception())] * len(batch)
+        else:
+            outcomes = job.result()
+        for (_, _, future), (succeeded, outcome) in zip(batch, outcomes):
+            if future.done():
+                continue
+            if succeeded:
+                future.set_result(outcome)
+            else:
+                future.set_exception(outcome)
+        if self.queue:
+            self._dispatch()
+        else:
+            self.dispatching = False
+
+    def _commit(self, tuples: list[RtTuple]) -> tuple[bool, object]:
+        try:
+            for tup in tuples:
+                self.store.save_tuple(tup)
+            self.store.commit()
+        except Exception as error:
+            self.store.rollback()
+            return False, error
+        return True, None
+
+    def _stream(self, query: TupleQuery, produce: Callable[[Optional[list[RtTuple]]], None]):
+        """Runs the query one tuple type at a time and hands each chunk of results to produce, then None"""
+        try:
+            for tuple_type in sorted(query.match_tuple_type(), key=lambda tuple_type: tuple_type.value):
+                single = copy.copy(query)
+                single.types = {tuple_type}
+                found = list(self.store.run_query(single))
+                for start in range(0, len(found), self.chunk_size):
+                    produce(found[start:start + self.chunk_size])
+        finally:
+            produce(None)
+
+    def _run_batch(self, requests: list[tuple[str, object]]) -> list[tuple[bool, object]]:
+        outcomes = []
+        lookups = {}
+        position = 0
+        while position < len(requests):
+            operation, argument = requests[position]
+            if operation == "commit":
+                # Consecutive commits are written as one commit of the store
+                end = position
+                while end < len(requests) and requests[end][0] == "commit":
+                    end += 1
+                outcome = self._commit([tup for _, tuples in requests[position:end] for tup in tuples])
+                outcomes += [outcome] * (end - position)
+                position = end
+                # Commits change what later lookups in the batch see
+                lookups.clear()
+                continue
+            position += 1
+            key = (operation, argument) if operation in ("get_tuple", "get_by_referent") else None
+            if key is not None and key in lookups:
+                outcomes.append(lookups[key])
+                continue
+            try:
+                if operation == "run_query":
+                    outcome = (True, self._stream(*argument))
+                else:
+                    outcome = (True, getattr(self.store, operation)(*(() if argument is None else (argument,))))
+            except Exception as error:
+                outcome = (False, error)
+            if key is not None:
+                lookups[key] = outcome
+            outcomes.append(outcome)
+        return outcomes
+
+    async def save_tuple(self, tup: RtTuple) -> bool:
+        self.pending.setdefault(asyncio.current_task(), []).append(tup)
+        return True
+
+    async def commit(self):
+        tuples = self.pending.pop(asyncio.current_task(), [])
+        if tuples:
+            await self._request("commit", tuples)
+
+    async def rollback(self):
+        self.pending.pop(asyncio.current_task(), None)
+
+    async def shut_down(self):
+        self.pending.clear()
+        await self._request("shut_down")
+        self.executor.shutdown()
+
+    async def get_tuple(self, rui: Rui) -> RtTuple:
+        return await self._request("get_tuple", rui)
+
+    async def get_by_referent(self, rui: Rui) -> set[RtTuple]:
+        return set(await self._request("get_by_referent", rui))
+
+    async def run_query(self, query: TupleQuery) -> AsyncIterator[RtTuple]:
+        """Streams the results of the query as the worker thread produces them, one tuple type at a time
+
+        The whole query runs within one job of the worker thread, so no commit made through this adapter falls
+        between the tuple types, and chunks reach the event loop while the later types are still being read.
+        """
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        done = self._request("run_query", (query, lambda chunk: loop.call_soon_threadsafe(chunks.put_nowait, chunk)))
+        while (chunk := await chunks.get()) is not None:
+            for tup in chunk:
+                yield tup
+        await done
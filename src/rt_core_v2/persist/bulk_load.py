@@ -0,0 +1,132 @@
+import os
+import mmap
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Iterator
+
+from rt_core_v2.rttuple import RtTuple, TupleType
+from rt_core_v2.formatter import RtTupleFormat, json_to_rttuple
+from rt_core_v2.binary import iter_binary_records, read_varint
+from rt_core_v2.persist.rts_store import RtStore
+
+
+def json_chunks(path: str, chunk_size: int) -> list[tuple[int, int]]:
+    """Splits a JSON Lines file into (start, end) byte ranges of about chunk_size that end on a line boundary"""
+    chunks = []
+    size = os.path.getsize(path)
+    with open(path, "rb") as dump:
+        start = 0
+        while start < size:
+            dump.seek(min(start + chunk_size, size))
+            dump.readline()
+            end = min(dump.tell(), size)
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def binary_chunks(path: str, chunk_size: int) -> list[tuple[int, int]]:
+    """Splits a file of length framed binary records into (start, end) byte ranges of about chunk_size
+
+    Only the record lengths are read, by following the frames from the start of the file.
+    """
+    chunks = []
+    if os.path.getsize(path) == 0:
+        return chunks
+    with open(path, "rb") as dump, mmap.mmap(dump.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = offset = 0
+        while offset < len(data):
+            length, offset = read_varint(data, offset)
+            offset += length
+            if offset - start >= chunk_size:
+                chunks.append((start, offset))
+                start = offset
+        if start < len(data):
+            chunks.append((start, len(data)))
+    return chunks
+
+
+def read_chunk(path: str, start: int, end: int) -> bytes:
+    with open(path, "rb") as dump:
+        dump.seek(start)
+        return dump.read(end - start)
+
+
+def parse_json_chunk(path: str, start: int, end: int) -> Iterator[RtTuple]:
+    """The tuples of the JSON records of a chunk, skipping invalid records"""
+    tuples = (json_to_rttuple(line) for line in read_chunk(path, start, end).splitlines() if line.strip())
+    return (tup for tup in tuples if tup is not None)
+
+
+def parse_binary_chunk(path: str, start: int, end: int) -> Iterator[RtTuple]:
+    return iter_binary_records(read_chunk(path, start, end))
+
+
+def encode_chunk(parse: Callable, encode: Callable, path: str, start: int, end: int) -> list:
+    """Run by the workers: parses a chunk and encodes its tuples for the store with encode"""
+    return encode(parse(path, start, end))
+
+
+"""Mapping from tuple format to the function splitting a dump into chunks and the function parsing a chunk"""
+format_chunkers = {
+    RtTupleFormat.json_format: (json_chunks, parse_json_chunk),
+    RtTupleFormat.binary_format: (binary_chunks, parse_binary_chunk),
+}
+
+
+def bulk_load(
+    path: str,
+    store: RtStore,
+    format: RtTupleFormat = RtTupleFormat.json_format,
+    workers: int = None,
+    chunk_size: int = 16 << 20,
+    batch_size: int = 10000,
+    executor: Executor = None,
+) -> int:
+    """Loads every tuple of a dump into the store and returns the number of tuples loaded
+
+    The dump is split into chunks on record boundaries. When the store can save tuples already encoded, as
+    SqliteRtStore can through its encode_tuples and save_encoded, the chunks are parsed and encoded into rows
+    in parallel by a process pool, and the calling process is the single writer, saving the encoded tuples
+    in file order, which leaves it little more than the inserts to do. At most two chunks per worker are in
+    flight, which bounds memory use. workers defaults to one process per CPU, and an executor may be passed
+    to parse with instead of a new process pool. Other stores need the tuples themselves, which cost the
+    writer about as much to receive from a worker as to parse, so their dumps are parsed by the writer and
+    workers and executor are not used. Invalid JSON records are logged and skipped by json_to_rttuple.
+
+    A commit is made once batch_size tuples are saved, just before the next tuple that is not a DITuple, so a
+    tuple followed by its DITuples, as dumps list them, is never split across two commits.
+    """
+    split, parse = format_chunkers[format]
+    chunks = deque(split(path, chunk_size))
+    encode = getattr(store, "encode_tuples", None)
+    pool = None
+    if encode is not None:
+        pool = executor if executor is not None else ProcessPoolExecutor(max_workers=workers)
+        save = store.save_encoded
+    else:
+        save = store.save_tuple
+    in_flight_limit = 2 * (workers or os.cpu_count() or 1)
+    loaded = uncommitted = 0
+    try:
+        in_flight = deque()
+        while chunks or in_flight:
+            if pool is None:
+                tuples = parse(path, *chunks.popleft())
+            else:
+                while chunks and len(in_flight) < in_flight_limit:
+                    in_flight.append(pool.submit(encode_chunk, parse, encode, path, *chunks.popleft()))
+                tuples = in_flight.popleft().result()
+            for tup in tuples:
+                if uncommitted >= batch_size and tup.tuple_type is not TupleType.DI:
+                    store.commit()
+                    loaded += uncommitted
+                    uncommitted = 0
+                save(tup)
+                uncommitted += 1
+        store.commit()
+        loaded += uncommitted
+    finally:
+        if pool is not None and executor is None:
+            pool.shutdown(cancel_futures=True)
+    return loaded
@@ -0,0 +1,167 @@
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from rt_core_v2.rttuple import RtTuple
+from rt_core_v2.ids_codes.rui import Rui
+from rt_core_v2.binary import rttuple_to_binary
+from rt_core_v2.persist.rts_store import RtStore, TupleQuery
+from rt_core_v2.persist.memory_store import tuple_referents
+from rt_core_v2.persist.transaction import WriteBuffer
+
+
+class LruCache:
+    """Least recently used cache bounded by a number of entries and optionally by the total size of its values
+
+    Attributes:
+    max_entries -- The largest number of entries kept
+    max_bytes -- The largest total size of the entries kept, or None for no size bound
+    entries -- Mapping from key to (value, size), least recently used first
+    size -- The total size of the entries
+    hits -- The number of lookups that found their key
+    misses -- The number of lookups that did not
+    evictions -- The number of entries evicted to stay within the bounds
+    """
+
+    def __init__(self, max_entries: int, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Returns the value cached for key, or None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, size: int = 0):
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self.discard(key)
+        self.entries[key] = (value, size)
+        self.size += size
+        while len(self.entries) > self.max_entries or (self.max_bytes is not None and self.size > self.max_bytes):
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+
+class CachingRtStore(RtStore):
+    """RtStore caching the get_tuple and get_by_referent lookups of another store
+
+    Committed tuples never change, so cached tuples stay valid. The tuples of a referent change when a tuple
+    mentioning it is committed, so when a thread commits, the cached lookups of every referent held by the
+    tuples it saved are dropped. A lookup that was running while a commit was applied is returned but not
+    cached, as it may predate the commit. max_entries and max_bytes bound the store as a whole, and are split
+    evenly between the two caches. Sizes are measured as the length of the binary encoding of the tuples and
+    are only computed when a byte budget is set.
+
+    Attributes:
+    store -- The wrapped store
+    tuples -- Cache of get_tuple by rui
+    referents -- Cache of get_by_referent by referent
+    pending -- The tuples saved by each thread since its last commit or rollback
+    invalidations -- The number of commits, used to detect lookups overlapping a commit
+    """
+
+    def __init__(self, store: RtStore, max_entries: int = 100_000, max_bytes: Optional[int] = None):
+        self.store = store
+        half_bytes = None if max_bytes is None else max_bytes // 2
+        self.tuples = LruCache(max_entries // 2, half_bytes)
+        self.referents = LruCache(max_entries - max_entries // 2, None if max_bytes is None else max_bytes - half_bytes)
+        self.pending = WriteBuffer()
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    def _size(self, tuples: Iterable[RtTuple]) -> int:
+        if self.tuples.max_bytes is None:
+            return 0
+        return sum(len(rttuple_to_binary(tup)) for tup in tuples)
+
+    def _fill(self, cache: LruCache, key, value, size: int, invalidations: int):
+        with self.lock:
+            if invalidations == self.invalidations:
+                cache.put(key, value, size)
+
+    def save_tuple(self, tup: RtTuple) -> bool:
+        self.pending.save(tup)
+        return self.store.save_tuple(tup)
+
+    def commit(self):
+        saved = self.pending.take()
+        try:
+            self.store.commit()
+        finally:
+            self.invalidate(saved)
+
+    def invalidate(self, tuples: Iterable[RtTuple]):
+        """Drops the cached lookups of the referents held by tuples"""
+        with self.lock:
+            self.invalidations += 1
+            for tup in tuples:
+                for _, referent in tuple_referents(tup):
+                    self.referents.discard(referent)
+
+    def rollback(self):
+        self.pending.discard()
+        self.store.rollback()
+
+    def shut_down(self):
+        self.pending.discard()
+        with self.lock:
+            self.tuples.clear()
+            self.referents.clear()
+        self.store.shut_down()
+
+    def get_tuple(self, rui: Rui) -> RtTuple:
+        with self.lock:
+            cached = self.tuples.get(rui)
+            invalidations = self.invalidations
+        if cached is not None:
+            return cached
+        tup = self.store.get_tuple(rui)
+        if tup is not None:
+            self._fill(self.tuples, rui, tup, self._size((tup,)), invalidations)
+        return tup
+
+    def get_by_referent(self, rui: Rui) -> set[RtTuple]:
+        with self.lock:
+            cached = self.referents.get(rui)
+            invalidations = self.invalidations
+        if cached is not None:
+            return set(cached)
+        found = self.store.get_by_referent(rui)
+        self._fill(self.referents, rui, frozenset(found), self._size(found), invalidations)
+        return found
+
+    def get_by_author(self, rui: Rui) -> set[RtTuple]:
+        return self.store.get_by_author(rui)
+
+    def get_available_rui(self) -> Rui:
+        return self.store.get_available_rui()
+
+    def get_referents_by_type_and_designator_type(self, referent_type: Rui, designator_type: Rui, designator_txt: str) -> set[RtTuple]:
+        return self.store.get_referents_by_type_and_designator_type(referent_type, designator_type, designator_txt)
+
+    def run_query(self, query: TupleQuery) -> set[RtTuple]:
+        return self.store.run_query(query)
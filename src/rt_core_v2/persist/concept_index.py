@@ -0,0 +1,35 @@
+from collections import defaultdict
+
+from rt_core_v2.rttuple import RtTuple, TupleType
+from rt_core_v2.ids_codes.rui import Rui, UUI
+
+
+class ConceptIndex:
+    """Index of the NtoC tuples annotating particulars with concept codes
+
+    Attributes:
+    by_concept -- Mapping from (ruics, code) to the ruis of the NtoC tuples using that concept
+    by_code -- Mapping from a code, whatever its code system, to the ruis of the NtoC tuples using it
+    by_ruin -- Mapping from a particular to the ruis of the NtoC tuples annotating it
+    """
+
+    def __init__(self):
+        self.by_concept: dict[tuple[UUI, str], set] = defaultdict(set)
+        self.by_code: dict[str, set] = defaultdict(set)
+        self.by_ruin: dict[Rui, set] = defaultdict(set)
+
+    def add(self, tup: RtTuple):
+        if tup.tuple_type is not TupleType.NtoC:
+            return
+        self.by_concept[(tup.ruics, tup.code)].add(tup.rui)
+        self.by_code[tup.code].add(tup.rui)
+        self.by_ruin[tup.ruin].add(tup.rui)
+
+    def tuples_with_concept(self, ruics: UUI, code: str) -> set:
+        return self.by_concept.get((ruics, code), set())
+
+    def tuples_with_code(self, code: str) -> set:
+        return self.by_code.get(code, set())
+
+    def tuples_of(self, ruin: Rui) -> set:
+        return self.by_ruin.get(ruin, set())
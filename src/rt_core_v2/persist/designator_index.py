@@ -0,0 +1,152 @@
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable
+
+from rt_core_v2.rttuple import RtTuple, TupleType
+from rt_core_v2.ids_codes.rui import Rui, UUI
+from rt_core_v2.persist.adjacency import AdjacencyIndex
+
+
+def always_valid(rui: Rui) -> bool:
+    """Validity function of lookups that ignore invalidation"""
+    return True
+
+
+class DesignatorIndex:
+    """Index from (referent type, designator type, designator text) to the referents the designator denotes
+
+    A designator such as a medical record number is a particular with an NtoR tuple giving its type, an NtoDE
+    tuple holding its text and an NtoN tuple relating it to its referent, which has an NtoR tuple giving its
+    own type. The index records the types and texts of particulars, with the ruis of the tuples asserting
+    them, as their tuples arrive, in any order. Each tuple only adds the (designator, referent) pairs it
+    completes: an NtoN tuple pairs its own participants, an NtoDE tuple pairs its designator with the
+    designator's neighbours, and an NtoR tuple adds its one new type to the pairs its particular already
+    takes part in, so inserts on a particular with many neighbours stay linear. Texts are only decoded and
+    kept for typed particulars; the NtoDE tuples of a particular not yet typed are kept by rui and read back
+    through fetch when its first type arrives. A tuple later invalidated stays in the index, so lookups take
+    an is_valid function and only return referents for which every step, the two NtoR tuples, the NtoDE
+    tuple and the NtoN tuple, is asserted by a valid tuple. Texts are also kept sorted per (referent type,
+    designator type) for prefix lookups.
+
+    Attributes:
+    adjacency -- The graph of NtoN tuples relating designators to their referents
+    fetch -- Function returning the committed tuple with a rui
+    types -- Mapping from a rui to the UUIs of the repeatables it instantiates and the ruis of the NtoR tuples saying so
+    texts -- Mapping from a typed rui to the texts of its NtoDE tuples and the ruis of those tuples
+    untyped_texts -- Mapping from a rui with no type yet to the ruis of its NtoDE tuples
+    entries -- Mapping from (referent type, designator type) to a mapping from text to (designator, referent) pairs
+    sorted_texts -- The texts of each entries mapping in sorted order, rebuilt on demand
+    """
+
+    def __init__(self, adjacency: AdjacencyIndex, fetch: Callable[[Rui], RtTuple]):
+        self.adjacency = adjacency
+        self.fetch = fetch
+        self.types: dict[Rui, dict[UUI, set[Rui]]] = defaultdict(lambda: defaultdict(set))
+        self.texts: dict[Rui, dict[str, set[Rui]]] = defaultdict(lambda: defaultdict(set))
+        self.untyped_texts: dict[Rui, set[Rui]] = defaultdict(set)
+        self.entries: dict[tuple[UUI, UUI], dict[str, set[tuple[Rui, Rui]]]] = defaultdict(lambda: defaultdict(set))
+        self.sorted_texts: dict[tuple[UUI, UUI], list[str]] = {}
+
+    def add(self, tup: RtTuple):
+        """Updates the index with a committed tuple, NtoN tuples must already be in the adjacency index"""
+        if tup.tuple_type not in (TupleType.NtoR, TupleType.NtoDE, TupleType.NtoN) or not tup.polarity:
+            return
+        if tup.tuple_type is TupleType.NtoR:
+            self._add_type(tup)
+        elif tup.tuple_type is TupleType.NtoDE:
+            if tup.ruin not in self.types:
+                self.untyped_texts[tup.ruin].add(tup.rui)
+                return
+            text = self._add_text(tup)
+            if text is not None:
+                for referent in self.adjacency.neighbors(tup.ruin):
+                    self._pair(tup.ruin, referent, texts=(text,))
+        elif tup.tuple_type is TupleType.NtoN:
+            for designator in tup.p:
+                if designator in self.texts:
+                    for referent in tup.p:
+                        if referent != designator:
+                            self._pair(designator, referent)
+
+    def _add_text(self, tup: RtTuple):
+        """Records the text of an NtoDE tuple of a typed particular, returning it or None if it is not text"""
+        try:
+            text = tup.data.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+        self.texts[tup.ruin][text].add(tup.rui)
+        return text
+
+    def _add_type(self, tup: RtTuple):
+        particular, new_type = tup.ruin, tup.ruir
+        known = new_type in self.types.get(particular, ())
+        self.types[particular][new_type].add(tup.rui)
+        for text_rui in self.untyped_texts.pop(particular, ()):
+            self._add_text(self.fetch(text_rui))
+        if known:
+            return
+        neighbors = self.adjacency.neighbors(particular)
+        for neighbor in neighbors:
+            # particular as a designator of the new type and as a referent of the new type
+            if particular in self.texts:
+                self._pair(particular, neighbor, designator_types=(new_type,))
+            if neighbor in self.texts:
+                self._pair(neighbor, particular, referent_types=(new_type,))
+
+    def _pair(self, designator: Rui, referent: Rui, texts=None, designator_types=None, referent_types=None):
+        """Adds the entries of a designator related to a referent, limited to the given texts or types if any"""
+        texts = self.texts.get(designator, ()) if texts is None else texts
+        designator_types = self.types.get(designator, ()) if designator_types is None else designator_types
+        referent_types = self.types.get(referent, ()) if referent_types is None else referent_types
+        for referent_type in referent_types:
+            for designator_type in designator_types:
+                key = (referent_type, designator_type)
+                for text in texts:
+                    if text not in self.entries[key]:
+                        self.sorted_texts.pop(key, None)
+                    self.entries[key][text].add((designator, referent))
+
+    def _holds(self, pair: tuple[Rui, Rui], key: tuple[UUI, UUI], text: str, is_valid: Callable[[Rui], bool]) -> bool:
+        """Whether valid tuples still relate the designator of pair, with text, to its referent"""
+        designator, referent = pair
+        referent_type, designator_type = key
+        # Sets are copied before iterating, as a writer may be adding to them
+        links = (
+            tuple_rui
+            for tuple_rui in self.adjacency.tuples_of(designator)
+            if referent in self.adjacency.participants[tuple_rui][1]
+        )
+        return (
+            any(map(is_valid, tuple(self.texts[designator][text])))
+            and any(map(is_valid, tuple(self.types[designator][designator_type])))
+            and any(map(is_valid, tuple(self.types[referent][referent_type])))
+            and any(map(is_valid, links))
+        )
+
+    def _referents(self, key: tuple[UUI, UUI], text: str, is_valid: Callable[[Rui], bool]) -> set[Rui]:
+        return {pair[1] for pair in tuple(self.entries[key][text]) if self._holds(pair, key, text, is_valid)}
+
+    def lookup(self, referent_type: UUI, designator_type: UUI, text: str, is_valid: Callable[[Rui], bool] = always_valid) -> set[Rui]:
+        key = (referent_type, designator_type)
+        entries = self.entries.get(key)
+        if not entries or text not in entries:
+            return set()
+        return self._referents(key, text, is_valid)
+
+    def lookup_prefix(self, referent_type: UUI, designator_type: UUI, prefix: str, is_valid: Callable[[Rui], bool] = always_valid) -> dict[str, set[Rui]]:
+        """Maps every designator text starting with prefix, in sorted order, to its referents"""
+        key = (referent_type, designator_type)
+        entries = self.entries.get(key)
+        if not entries:
+            return {}
+        texts = self.sorted_texts.get(key)
+        if texts is None:
+            texts = self.sorted_texts[key] = sorted(entries)
+        found = {}
+        for position in range(bisect_left(texts, prefix), len(texts)):
+            if not texts[position].startswith(prefix):
+                break
+            referents = self._referents(key, texts[position], is_valid)
+            if referents:
+                found[texts[position]] = referents
+        return found
@@ -0,0 +1,314 @@
+import os
+import mmap
+import struct
+import hashlib
+import threading
+
+from rt_core_v2.rttuple import RtTuple, TupleType
+from rt_core_v2.ids_codes.rui import Rui, ID_Rui, UUI
+from rt_core_v2.ids_codes.allocator import RuiAllocator
+from rt_core_v2.formatter import format_rttuple, json_to_rttuple
+from rt_core_v2.persist.rts_store import RtStore, TupleQuery
+from rt_core_v2.persist.memory_store import tuple_referents
+from rt_core_v2.persist.validity import ValidityView
+from rt_core_v2.persist.transaction import WriteBuffer, GroupCommitter
+
+
+def rui_key(rui: Rui) -> bytes:
+    """16 byte index key of a rui, the raw uuid for ID_Ruis and a digest of the identifier otherwise"""
+    if isinstance(rui, ID_Rui):
+        return rui.uuid.bytes
+    return hashlib.blake2b(str(rui).encode("utf-8"), digest_size=16).digest()
+
+
+class OffsetIndex:
+    """Memory-mapped open addressing hash table from rui key to the location of a record in the log
+
+    The file starts with a header recording the table capacity, the number of entries and the end of the
+    log that the index covers, followed by fixed size slots of (key, segment, offset, length).
+    Segments are numbered from 1 so a slot with segment 0 is empty.
+
+    Attributes:
+    path -- The path of the index file
+    capacity -- The number of slots in the table
+    count -- The number of occupied slots
+    """
+
+    HEADER = struct.Struct("<4sQQIQ")
+    SLOT = struct.Struct("<16sIQI")
+    MAGIC = b"RTIX"
+    MAX_LOAD = 0.5
+
+    def __init__(self, path: str, capacity: int = 1 << 16):
+        self.path = path
+        if not os.path.exists(path):
+            self._create(path, capacity)
+        self._open()
+
+    @classmethod
+    def _create(cls, path: str, capacity: int, end_segment: int = 0, end_offset: int = 0):
+        with open(path, "wb") as index_file:
+            index_file.write(cls.HEADER.pack(cls.MAGIC, capacity, 0, end_segment, end_offset))
+            index_file.truncate(cls.HEADER.size + capacity * cls.SLOT.size)
+
+    def _open(self):
+        self.file = open(self.path, "r+b")
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        magic, self.capacity, self.count, self.end_segment, self.end_offset = self.HEADER.unpack_from(self.map, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f"{self.path} is not a tuple offset index")
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def _slot(self, key: bytes) -> int:
+        """Returns the slot holding key or the empty slot where it belongs"""
+        slot = int.from_bytes(key[8:], "little") % self.capacity
+        while True:
+            position = self.HEADER.size + slot * self.SLOT.size
+            found, segment, _, _ = self.SLOT.unpack_from(self.map, position)
+            if segment == 0 or found == key:
+                return position
+            slot = (slot + 1) % self.capacity
+
+    def get(self, key: bytes):
+        """Returns (segment, offset, length) of the record for key or None"""
+        _, segment, offset, length = self.SLOT.unpack_from(self.map, self._slot(key))
+        return (segment, offset, length) if segment else None
+
+    def put(self, key: bytes, segment: int, offset: int, length: int):
+        if (self.count + 1) > self.capacity * self.MAX_LOAD:
+            self._grow()
+        position = self._slot(key)
+        if self.SLOT.unpack_from(self.map, position)[1] == 0:
+            self.count += 1
+        self.SLOT.pack_into(self.map, position, key, segment, offset, length)
+
+    def mark_end(self, segment: int, offset: int):
+        """Records the end of the log covered by the index and writes the header
+
+        The slots of the records before the end must be flushed first, so that a header reaching the disk
+        never covers records whose slots did not.
+        """
+        self.end_segment, self.end_offset = segment, offset
+        self.HEADER.pack_into(self.map, 0, self.MAGIC, self.capacity, self.count, segment, offset)
+
+    def flush(self):
+        self.map.flush()
+
+    def flush_header(self):
+        self.map.flush(0, self.HEADER.size)
+
+    def _grow(self):
+        entries = []
+        for slot in range(self.capacity):
+            entry = self.SLOT.unpack_from(self.map, self.HEADER.size + slot * self.SLOT.size)
+            if entry[1]:
+                entries.append(entry)
+        grown_path = self.path + ".grow"
+        self._create(grown_path, self.capacity * 2)
+        grown = OffsetIndex(grown_path)
+        for entry in entries:
+            grown.put(*entry)
+        # The grown table covers the same end of the log, and is complete on disk before it replaces this one
+        grown.flush()
+        grown.mark_end(self.end_segment, self.end_offset)
+        grown.flush_header()
+        grown.close()
+        self.close()
+        os.replace(grown_path, self.path)
+        self._open()
+        self.mark_end(self.end_segment, self.end_offset)
+
+
+class LogRtStore(RtStore):
+    """Append-only RtStore that writes tuples sequentially to segment files
+
+    Tuples are never updated in referent tracking, so each committed tuple is appended as a JSON line to the
+    newest segment and its location is recorded in a memory-mapped OffsetIndex, which makes get_tuple a single
+    hash probe and read. Lookups by referent, author or query are answered by one filtered pass over the log,
+    without building any index, so this store suits write heavy workloads and point reads. Saved tuples are
+    buffered per thread, and the commits of concurrent writers are appended in groups that share a single
+    fsync.
+
+    A group is published once it is synced, by recording its locations and then the new end of the log in the
+    index under the lock. The slots are synced before the new end is written, so after a crash every record
+    before the recorded end is indexed. Reads take the lock only to look up a location, to open a segment or
+    to capture the published end, and a scan stops at the end it captured, so a read never sees part of a
+    group still being appended.
+
+    Attributes:
+    directory -- The directory holding the segments and the index
+    segment_size -- The size in bytes after which a new segment is started
+    index -- The rui to record location index
+    lock -- Guards the index, the list of segments and the segment readers
+    readers -- Mapping from segment number to the file its records are read from
+    allocator -- Hands out the ruis of get_available_rui, recording its blocks in this store
+    """
+
+    def __init__(self, directory: str, segment_size: int = 64 << 20):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_size = segment_size
+        self.index = OffsetIndex(os.path.join(directory, "index.bin"))
+        self.segments = sorted(
+            int(name[len("segment-"):-len(".log")]) for name in os.listdir(directory) if name.startswith("segment-")
+        ) or [1]
+        self.readers = {}
+        self.lock = threading.Lock()
+        self.pending = WriteBuffer()
+        self.committer = GroupCommitter(self._append)
+        self._recover()
+        self.writer = open(self._segment_path(self.segments[-1]), "ab")
+        self.allocator = RuiAllocator(store=self)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:06d}.log")
+
+    def _recover(self):
+        """Indexes records appended after the last index checkpoint and drops a torn trailing record"""
+        for segment in self.segments:
+            if segment < self.index.end_segment or not os.path.exists(self._segment_path(segment)):
+                continue
+            offset = self.index.end_offset if segment == self.index.end_segment else 0
+            with open(self._segment_path(segment), "r+b") as segment_file:
+                segment_file.seek(offset)
+                for line in segment_file:
+                    if not line.endswith(b"\n"):
+                        segment_file.truncate(offset)
+                        break
+                    self.index.put(rui_key(json_to_rttuple(line).rui), segment, offset, len(line))
+                    offset += len(line)
+            self.index.mark_end(segment, offset)
+        self.index.flush()
+
+    def save_tuple(self, tup: RtTuple) -> bool:
+        self.pending.save(tup)
+        return True
+
+    def commit(self):
+        self.committer.commit(self.pending.take())
+
+    def _append(self, transactions: list[list[RtTuple]]):
+        """Appends a group of transactions, syncs the segment once and then publishes them in the index"""
+        records = [(tup.rui, (format_rttuple(tup) + "\n").encode("utf-8")) for transaction in transactions for tup in transaction]
+        locations = []
+        for rui, record in records:
+            if self.writer.tell() and self.writer.tell() + len(record) > self.segment_size:
+                self._roll()
+            locations.append((rui, self.segments[-1], self.writer.tell(), len(record)))
+            self.writer.write(record)
+        self.writer.flush()
+        os.fsync(self.writer.fileno())
+        with self.lock:
+            for rui, segment, offset, length in locations:
+                self.index.put(rui_key(rui), segment, offset, length)
+            self.index.flush()
+            self.index.mark_end(self.segments[-1], self.writer.tell())
+            self.index.flush_header()
+
+    def _roll(self):
+        self.writer.flush()
+        os.fsync(self.writer.fileno())
+        self.writer.close()
+        self.writer = open(self._segment_path(self.segments[-1] + 1), "ab")
+        with self.lock:
+            self.segments.append(self.segments[-1] + 1)
+
+    def rollback(self):
+        self.pending.discard()
+
+    def shut_down(self):
+        self.pending.discard()
+        self.writer.close()
+        for reader in self.readers.values():
+            reader.close()
+        self.index.flush()
+        self.index.close()
+
+    def _read(self, segment: int, offset: int, length: int) -> RtTuple:
+        reader = self.readers.get(segment)
+        if reader is None:
+            with self.lock:
+                reader = self.readers.get(segment)
+                if reader is None:
+                    reader = self.readers[segment] = open(self._segment_path(segment), "rb")
+        return json_to_rttuple(os.pread(reader.fileno(), length, offset))
+
+    def get_tuple(self, rui: Rui) -> RtTuple:
+        with self.lock:
+            location = self.index.get(rui_key(rui))
+        return self._read(*location) if location else None
+
+    def scan(self):
+        """Yields every tuple committed when the scan starts, in log order"""
+        with self.lock:
+            end_segment, end_offset = self.index.end_segment, self.index.end_offset
+            segments = [segment for segment in self.segments if segment <= end_segment]
+        for segment in segments:
+            with open(self._segment_path(segment), "rb") as segment_file:
+                offset = 0
+                for line in segment_file:
+                    if segment == end_segment and offset >= end_offset:
+                        break
+                    offset += len(line)
+                    yield json_to_rttuple(line)
+
+    def get_by_referent(self, rui: Rui) -> set[RtTuple]:
+        return {tup for tup in self.scan() if any(referent == rui for _, referent in tuple_referents(tup))}
+
+    def get_by_author(self, rui: Rui) -> set[RtTuple]:
+        """Returns the DI tuples of the author and the tuples they inserted"""
+        found = {tup for tup in self.scan() if tup.tuple_type is TupleType.DI and tup.ruia == rui}
+        for di in list(found):
+            authored = self.get_tuple(di.ruit)
+            if authored is not None:
+                found.add(authored)
+        return found
+
+    def get_available_rui(self) -> Rui:
+        return self.allocator.allocate()
+
+    def get_referents_by_type_and_designator_type(self, referent_type: Rui, designator_type: Rui, designator_txt: str) -> set[RtTuple]:
+        """Returns the NtoR tuples that assert a referent's type for referents denoted by a designator
+
+        One pass over the log collects the particulars of designator_type, those with an NtoDE tuple holding
+        designator_txt, the NtoN tuples and the NtoR tuples of referent_type, along with the DC tuples, and the
+        valid ones among them are then joined.
+        """
+        # Types are UUIs in NtoR tuples but may be passed as Ruis
+        referent_type, designator_type = UUI(str(referent_type)), UUI(str(designator_type))
+        data = designator_txt.encode("utf-8")
+        validity = ValidityView()
+        of_designator_type, with_text, links, typed = [], [], [], []
+        for tup in self.scan():
+            validity.apply(tup)
+            if tup.tuple_type is TupleType.NtoR and tup.polarity:
+                if tup.ruir == designator_type:
+                    of_designator_type.append(tup)
+                if tup.ruir == referent_type:
+                    typed.append(tup)
+            elif tup.tuple_type is TupleType.NtoDE and tup.polarity and tup.data == data:
+                with_text.append(tup)
+            elif tup.tuple_type is TupleType.NtoN and tup.polarity:
+                links.append(tup)
+        designators = {tup.ruin for tup in validity.valid(of_designator_type)} & {tup.ruin for tup in validity.valid(with_text)}
+        referents = {
+            participant
+            for link in validity.valid(links)
+            for designator in designators.intersection(link.p)
+            for participant in link.p
+            if participant != designator
+        }
+        return {tup for tup in validity.valid(typed) if tup.ruin in referents}
+
+    def run_query(self, query: TupleQuery) -> set[RtTuple]:
+        types = query.match_tuple_type()
+        validity = ValidityView()
+        found = set()
+        for tup in self.scan():
+            validity.apply(tup)
+            if tup.tuple_type in types and query.match_tuple(tup):
+                found.add(tup)
+        return found if query.include_invalid else validity.valid(found)
@@ -0,0 +1,304 @@
+from collections import defaultdict
+from datetime import datetime
+
+from rt_core_v2.rttuple import RtTuple, TupleType, TupleComponents
+from rt_core_v2.ids_codes.rui import Rui, UUI, ISO_Rui, TempRef, Relationship
+from rt_core_v2.ids_codes.allocator import RuiAllocator
+from rt_core_v2.persist.rts_store import RtStore, TupleQuery
+from rt_core_v2.persist.planner import AccessPath, RangeAccessPath, QueryPlanner, QueryPlan
+from rt_core_v2.persist.time_index import TimeIndex
+from rt_core_v2.persist.validity import ValidityView
+from rt_core_v2.persist.adjacency import AdjacencyIndex
+from rt_core_v2.persist.designator_index import DesignatorIndex
+from rt_core_v2.persist.concept_index import ConceptIndex
+from rt_core_v2.persist.transaction import WriteBuffer, GroupCommitter
+from rt_core_v2.ids_codes.concept import Concept, ConceptRegistry
+
+"""Tuple components that hold a referent of the tuple and are therefore indexed for get_by_referent"""
+referent_components = (
+    TupleComponents.ruin,
+    TupleComponents.ruit,
+    TupleComponents.ruitn,
+    TupleComponents.ruia,
+    TupleComponents.ruid,
+    TupleComponents.ruir,
+    TupleComponents.p_list,
+)
+
+
+def tuple_referents(tup: RtTuple):
+    """Yields (component, referent) for every referent held by the tuple"""
+    for component in referent_components:
+        value = getattr(tup, component.value, None)
+        if value is None:
+            continue
+        if component is TupleComponents.p_list:
+            for entry in value:
+                yield component, entry
+        else:
+            yield component, value
+
+
+class InMemoryRtStore(RtStore):
+    """RtStore that keeps all committed tuples in memory behind hash indexes
+
+    Saved tuples are buffered per thread until commit and discarded on rollback. Commits of concurrent
+    writers are applied to the indexes in groups by a single thread at a time. Each group gets the next commit
+    sequence number, which is published once the whole group is indexed. Reads go through a MemorySnapshot
+    pinned to a published sequence number, which hides the tuples of later commits, so readers take no lock
+    and never see part of a commit such as a tuple without its DITuple.
+
+    Attributes:
+    tuples -- Mapping from a tuple's rui to the tuple
+    sequence -- Mapping from a tuple's rui to the sequence number of the commit that added it
+    committed_seq -- The sequence number of the last commit visible to readers
+    by_type -- Mapping from tuple type to the ruis of the tuples of that type
+    by_component -- Mapping from a referent component to an index from referent to tuple ruis
+    by_author -- Mapping from an author to the ruis of the tuples they authored and their DI tuples
+    by_relationship -- Mapping from a relationship to the ruis of the tuples asserting it
+    by_time -- Time indexes over the creation time t of DI and DC tuples and the authoring time ta of DI tuples
+    validity -- The current validity of the tuples, used by run_query to leave out invalidated tuples
+    adjacency -- Graph of the particulars related by NtoN tuples
+    designators -- Index from referent type, designator type and designator text to referents
+    concept_index -- Index of the NtoC tuples by concept, code and annotated particular
+    concepts -- The concepts of the code systems loaded into the store
+    planner -- Planner choosing among the indexes for run_query
+    allocator -- Hands out the ruis of get_available_rui, recording its blocks in this store
+    """
+
+    def __init__(self):
+        self.tuples: dict = {}
+        self.sequence: dict[Rui, int] = {}
+        self.committed_seq = 0
+        self.by_type: dict[TupleType, set] = defaultdict(set)
+        self.by_component: dict[TupleComponents, dict] = {component: defaultdict(set) for component in referent_components}
+        self.by_author: dict = defaultdict(set)
+        self.by_relationship: dict = defaultdict(set)
+        self.by_time: dict[TupleComponents, TimeIndex] = {TupleComponents.t: TimeIndex(), TupleComponents.ta: TimeIndex()}
+        self.validity = ValidityView()
+        self.adjacency = AdjacencyIndex()
+        self.designators = DesignatorIndex(self.adjacency, self.tuples.get)
+        self.concept_index = ConceptIndex()
+        self.concepts = ConceptRegistry()
+        self.pending = WriteBuffer()
+        self.committer = GroupCommitter(self._apply)
+        self.allocator = RuiAllocator(store=self)
+        self.planner = QueryPlanner(
+            [
+                AccessPath("rui", "rui", self._rui_posting),
+                # Tuples without ruin carry their non-repeatable referents in p
+                AccessPath(
+                    "ruin",
+                    "nonrepeatable_rui",
+                    lambda rui: self._posting(TupleComponents.ruin, rui) | self._posting(TupleComponents.p_list, rui),
+                ),
+                AccessPath("ruir", "repeatable_uui", lambda uui: self._posting(TupleComponents.ruir, uui)),
+                AccessPath("ruia", "author_rui", lambda rui: self._posting(TupleComponents.ruia, rui)),
+                AccessPath("p", "p_list", lambda rui: self._posting(TupleComponents.p_list, rui)),
+                AccessPath("r", "relationship", lambda r: self.by_relationship.get(r, set())),
+                AccessPath("code", "concept_code", lambda code: self.concept_index.tuples_with_code(code)),
+                RangeAccessPath("t", lambda begin, end: set(self.by_time[TupleComponents.t].range(begin, end, merge=False))),
+            ],
+            self.by_type,
+        )
+
+    def save_tuple(self, tup: RtTuple) -> bool:
+        self.pending.save(tup)
+        return True
+
+    def commit(self):
+        self.committer.commit(self.pending.take())
+
+    def _apply(self, transactions: list[list[RtTuple]]):
+        seq = self.committed_seq + 1
+        for transaction in transactions:
+            for tup in transaction:
+                self._index(tup, seq)
+        for index in self.by_time.values():
+            index.merge()
+        self.committed_seq = seq
+
+    def snapshot(self, seq: int = None) -> "MemorySnapshot":
+        """Returns a read-only view of the store as of the commit seq, by default the last commit"""
+        if seq is None:
+            seq = self.committed_seq
+        elif not 0 <= seq <= self.committed_seq:
+            raise ValueError(f"No commit with sequence number {seq}")
+        return MemorySnapshot(self, seq)
+
+    def rollback(self):
+        self.pending.discard()
+
+    def shut_down(self):
+        self.pending.discard()
+
+    def _index(self, tup: RtTuple, seq: int):
+        self.sequence.setdefault(tup.rui, seq)
+        self.tuples[tup.rui] = tup
+        self.by_type[tup.tuple_type].add(tup.rui)
+        for component, referent in tuple_referents(tup):
+            self.by_component[component][referent].add(tup.rui)
+        if hasattr(tup, "r"):
+            self.by_relationship[tup.r].add(tup.rui)
+        if tup.tuple_type is TupleType.DI:
+            self.by_author[tup.ruia].update((tup.rui, tup.ruit))
+        if isinstance(getattr(tup, "t", None), datetime):
+            self.by_time[TupleComponents.t].add(tup.t, tup.rui)
+        ta = getattr(tup, "ta", None)
+        if isinstance(ta, TempRef) and isinstance(ta.ref, ISO_Rui):
+            self.by_time[TupleComponents.ta].add(ta.ref.date, tup.rui)
+        self.validity.apply(tup, seq)
+        if tup.tuple_type is TupleType.NtoN:
+            self.adjacency.add(tup)
+        self.designators.add(tup)
+        self.concept_index.add(tup)
+
+    def _fetch(self, ruis) -> set[RtTuple]:
+        return self.snapshot()._fetch(ruis)
+
+    def get_tuple(self, rui: Rui) -> RtTuple:
+        return self.snapshot().get_tuple(rui)
+
+    def get_by_referent(self, rui: Rui) -> set[RtTuple]:
+        return self.snapshot().get_by_referent(rui)
+
+    def get_by_author(self, rui: Rui) -> set[RtTuple]:
+        return self.snapshot().get_by_author(rui)
+
+    def get_by_time(self, begin: datetime = None, end: datetime = None, component: TupleComponents = TupleComponents.t) -> list[RtTuple]:
+        """Returns the tuples whose timestamp component lies within [begin, end], in time order"""
+        return self.snapshot().get_by_time(begin, end, component)
+
+    def get_inserted_between(self, begin: datetime = None, end: datetime = None) -> list[RtTuple]:
+        """Returns the tuples whose DI tuple was created within [begin, end], in insertion order"""
+        return self.snapshot().get_inserted_between(begin, end)
+
+    def get_neighborhood(self, rui: Rui, hops: int, relationships: list[Relationship] = None) -> dict[Rui, int]:
+        """Maps every particular within hops valid NtoN tuples of rui to its distance from rui"""
+        return self.adjacency.k_hop(rui, hops, relationships, self.validity.invalid)
+
+    def follow_relationships(self, rui: Rui, steps: list[Relationship]) -> set[Rui]:
+        """The particulars reached from rui by following one relationship per step over valid NtoN tuples"""
+        return self.adjacency.follow(rui, steps, self.validity.invalid)
+
+    def get_path(self, source: Rui, target: Rui, max_hops: int, relationships: list[Relationship] = None) -> list[tuple]:
+        """A shortest path from source to target over valid NtoN tuples, see AdjacencyIndex.shortest_path"""
+        return self.adjacency.shortest_path(source, target, max_hops, relationships, self.validity.invalid)
+
+    def load_code_system(self, ruics: Rui, entries) -> int:
+        """Registers the concepts of a code system, given as (code, name) pairs or a mapping from code to name"""
+        return self.concepts.load_code_system(UUI(str(ruics)), entries)
+
+    def get_by_concept(self, ruics: Rui, code: str) -> set[RtTuple]:
+        """Returns the valid NtoC tuples using the concept code of code system ruics"""
+        return self.validity.valid(self._fetch(self.concept_index.tuples_with_concept(UUI(str(ruics)), code)))
+
+    def get_annotated_particulars(self, ruics: Rui, code: str) -> set[Rui]:
+        """Returns the particulars that valid, positive NtoC tuples annotate with the concept"""
+        return {tup.ruin for tup in self.get_by_concept(ruics, code) if tup.polarity}
+
+    def get_concepts(self, ruin: Rui) -> list[Concept]:
+        """Returns the concepts that valid, positive NtoC tuples annotate the particular with"""
+        tuples = self.validity.valid(self._fetch(self.concept_index.tuples_of(ruin)))
+        return [self.concepts.concept(tup.ruics, tup.code) for tup in tuples if tup.polarity]
+
+    def get_available_rui(self) -> Rui:
+        return self.allocator.allocate()
+
+    def get_referents_by_type_and_designator_type(self, referent_type: Rui, designator_type: Rui, designator_txt: str) -> set[RtTuple]:
+        return self.snapshot().get_referents_by_type_and_designator_type(referent_type, designator_type, designator_txt)
+
+    def get_referents_by_designator_prefix(self, referent_type: Rui, designator_type: Rui, prefix: str) -> dict[str, set[RtTuple]]:
+        return self.snapshot().get_referents_by_designator_prefix(referent_type, designator_type, prefix)
+
+    def _posting(self, component: TupleComponents, value) -> set:
+        return self.by_component[component].get(value, set())
+
+    def _rui_posting(self, rui: Rui) -> set:
+        return {rui} if rui in self.tuples else set()
+
+    def plan_query(self, query: TupleQuery) -> QueryPlan:
+        return self.planner.plan(query)
+
+    def run_query(self, query: TupleQuery) -> set[RtTuple]:
+        return self.snapshot().run_query(query)
+
+
+class MemorySnapshot:
+    """Read-only view of an InMemoryRtStore as of a commit
+
+    The view shares the indexes of the store and leaves out the tuples of later commits, including those
+    being applied while it is read, and reads validity as it was at its commit.
+
+    Attributes:
+    store -- The store viewed
+    seq -- The sequence number of the commit the view is pinned to
+    """
+
+    def __init__(self, store: InMemoryRtStore, seq: int):
+        self.store = store
+        self.seq = seq
+
+    def visible(self, rui: Rui) -> bool:
+        return self.store.sequence.get(rui, self.seq + 1) <= self.seq
+
+    def _fetch(self, ruis) -> set[RtTuple]:
+        # Copied first as writers may add to the index sets being read
+        return {self.store.tuples[rui] for rui in list(ruis) if self.visible(rui)}
+
+    def get_tuple(self, rui: Rui) -> RtTuple:
+        return self.store.tuples.get(rui) if self.visible(rui) else None
+
+    def get_by_referent(self, rui: Rui) -> set[RtTuple]:
+        ruis = set()
+        for index in self.store.by_component.values():
+            ruis.update(index.get(rui, ()))
+        return self._fetch(ruis)
+
+    def get_by_author(self, rui: Rui) -> set[RtTuple]:
+        return self._fetch(self.store.by_author.get(rui, ()))
+
+    def get_by_time(self, begin: datetime = None, end: datetime = None, component: TupleComponents = TupleComponents.t) -> list[RtTuple]:
+        """Returns the tuples whose timestamp component lies within [begin, end], in time order"""
+        ruis = self.store.by_time[component].range(begin, end, merge=False)
+        return [self.store.tuples[rui] for rui in ruis if self.visible(rui)]
+
+    def get_inserted_between(self, begin: datetime = None, end: datetime = None) -> list[RtTuple]:
+        inserted = (self.get_tuple(tup.ruit) for tup in self.get_by_time(begin, end) if tup.tuple_type is TupleType.DI)
+        return [tup for tup in inserted if tup is not None]
+
+    def run_query(self, query: TupleQuery) -> set[RtTuple]:
+        found = self.store.plan_query(query).execute(self.get_tuple)
+        return found if query.include_invalid else self.store.validity.valid_at(found, self.seq)
+
+    def is_current(self, rui: Rui) -> bool:
+        """Whether the tuple rui was committed and valid as of the commit of the view"""
+        return self.visible(rui) and self.store.validity.is_valid_at(rui, self.seq)
+
+    def get_referents_by_type_and_designator_type(self, referent_type: Rui, designator_type: Rui, designator_txt: str) -> set[RtTuple]:
+        """Returns the NtoR tuples that assert a referent's type for referents denoted by a designator
+
+        The designator is found through its NtoR tuple for designator_type and its NtoDE tuple holding designator_txt,
+        and is related to its referents by an NtoN tuple. The designator index resolves the referents directly,
+        through valid tuples only.
+        """
+        # Types are UUIs in NtoR tuples but may be passed as Ruis
+        referent_type, designator_type = UUI(str(referent_type)), UUI(str(designator_type))
+        referents = self.store.designators.lookup(referent_type, designator_type, designator_txt, self.is_current)
+        return self._referent_types(referents, referent_type)
+
+    def get_referents_by_designator_prefix(self, referent_type: Rui, designator_type: Rui, prefix: str) -> dict[str, set[RtTuple]]:
+        """Maps every designator text starting with prefix, in sorted order, to the NtoR tuples typing its referents"""
+        referent_type, designator_type = UUI(str(referent_type)), UUI(str(designator_type))
+        return {
+            text: self._referent_types(referents, referent_type)
+            for text, referents in self.store.designators.lookup_prefix(referent_type, designator_type, prefix, self.is_current).items()
+        }
+
+    def _referent_types(self, referents, referent_type: UUI) -> set[RtTuple]:
+        return {
+            tup
+            for referent in referents
+            for tup in self._fetch(self.store.by_component[TupleComponents.ruin].get(referent, ()))
+            if tup.tuple_type is TupleType.NtoR and tup.ruir == referent_type and tup.polarity and self.is_current(tup.rui)
+        }
@@ -0,0 +1,112 @@
+from typing import Callable
+
+from rt_core_v2.rttuple import RtTuple, TupleType
+from rt_core_v2.persist.rts_store import TupleQuery, temporal_bound
+
+
+class AccessPath:
+    """An index that answers one TupleQuery field with posting lists of tuple keys
+
+    Attributes:
+    name -- The name of the index, used when describing plans
+    query_attr -- The TupleQuery attribute the index answers
+    lookup -- Function from a value of that attribute to the set of keys of the tuples holding it
+    """
+
+    def __init__(self, name: str, query_attr: str, lookup: Callable[[object], set]):
+        self.name = name
+        self.query_attr = query_attr
+        self.lookup = lookup
+
+    def postings(self, query: TupleQuery) -> list[set]:
+        """Returns one posting list per value of the query attribute, or none when the attribute is unset"""
+        value = getattr(query, self.query_attr)
+        if value is None:
+            return []
+        if isinstance(value, list):
+            return [self.lookup(entry) for entry in value]
+        return [self.lookup(value)]
+
+
+class RangeAccessPath(AccessPath):
+    """An ordered index that answers the begin_timestamp and end_timestamp bounds of a TupleQuery
+
+    Attributes:
+    name -- The name of the index, used when describing plans
+    lookup -- Function from the (begin, end) datetimes, either of which may be None, to the keys in that range
+    """
+
+    def __init__(self, name: str, lookup: Callable[[object, object], set]):
+        super().__init__(name, "begin_timestamp", lookup)
+
+    def postings(self, query: TupleQuery) -> list[set]:
+        if query.begin_timestamp is None and query.end_timestamp is None:
+            return []
+        begin = temporal_bound(query.begin_timestamp) if query.begin_timestamp is not None else None
+        end = temporal_bound(query.end_timestamp) if query.end_timestamp is not None else None
+        return [self.lookup(begin, end)]
+
+
+class QueryPlan:
+    """Execution plan for a TupleQuery
+
+    Attributes:
+    query -- The planned query
+    types -- The tuple types that can satisfy the query
+    steps -- The names of the posting lists used, most selective first
+    candidates -- The keys left after intersecting the posting lists
+    """
+
+    def __init__(self, query: TupleQuery, types: set[TupleType], steps: list[str], candidates: set):
+        self.query = query
+        self.types = types
+        self.steps = steps
+        self.candidates = candidates
+
+    def execute(self, fetch: Callable[[object], RtTuple]) -> set[RtTuple]:
+        """Fetches the candidates and applies the residual predicates of the query to them"""
+        found = set()
+        for key in self.candidates:
+            tup = fetch(key)
+            if tup is not None and tup.tuple_type in self.types and self.query.match_tuple(tup):
+                found.add(tup)
+        return found
+
+
+class QueryPlanner:
+    """Cost-based planner that turns a TupleQuery into a QueryPlan
+
+    The tuple types are first pruned with TupleQuery.match_tuple_type. The cost of an access path is the size
+    of its posting list, and the cost of scanning the remaining types is the number of tuples they hold.
+    The cheapest source supplies the initial candidates, which are then intersected with the other posting
+    lists in increasing order of size so each intersection iterates the smaller side.
+
+    Attributes:
+    access_paths -- The available indexes
+    type_index -- Mapping from tuple type to the keys of every tuple of that type
+    """
+
+    def __init__(self, access_paths: list[AccessPath], type_index: dict[TupleType, set]):
+        self.access_paths = access_paths
+        self.type_index = type_index
+
+    def plan(self, query: TupleQuery) -> QueryPlan:
+        types = query.match_tuple_type()
+        if not types:
+            return QueryPlan(query, types, [], set())
+        postings = sorted(
+            ((path.name, posting) for path in self.access_paths for posting in path.postings(query)),
+            key=lambda entry: len(entry[1]),
+        )
+        scan_cost = sum(len(self.type_index.get(tuple_type, ())) for tuple_type in types)
+        if not postings or scan_cost < len(postings[0][1]):
+            postings.insert(0, ("scan", set().union(*(self.type_index.get(tuple_type, ()) for tuple_type in types))))
+        steps = []
+        candidates = None
+        for name, posting in postings:
+            # The first posting is copied as the store may add to it while the plan executes
+            candidates = set(posting) if candidates is None else candidates & posting
+            steps.append(name)
+            if not candidates:
+                break
+        return QueryPlan(query, types, steps, candidates)
@@ -1,8 +1,9 @@
 from abc import ABC, abstractmethod
+from datetime import datetime, timezone
 from typing import Optional
 
 from rt_core_v2.rttuple import RtTuple, TupleType
-from rt_core_v2.ids_codes.rui import Rui, TempRef, UUI, Relationship
+from rt_core_v2.ids_codes.rui import Rui, ISO_Rui, TempRef, UUI, Relationship
 from rt_core_v2.metadata import RtChangeReason, TupleEventType
 
 
@@ -27,7 +28,8 @@ class TupleQuery:
         p_list: Optional[list[Rui]] = None,
         replacements: Optional[list[Rui]] = None,
         nonrepeatable_rui: Optional[Rui] = None,
-        repeatable_uui: Optional[UUI] = None
+        repeatable_uui: Optional[UUI] = None,
+        include_invalid: bool = False,
     ):
         self.types: set[TupleType] = types if types is not None else set()
         self.rui: Optional[Rui] = rui
@@ -48,6 +50,8 @@ class TupleQuery:
         self.confidence: Optional[float] = confidence
         self.p_list: Optional[list[Rui]] = p_list
         self.replacements: Optional[list[Rui]] = replacements
+        # Stores leave out tuples invalidated by their latest DC tuple unless asked for them
+        self.include_invalid: bool = include_invalid
 
     # Tuples types are filtered out not by the query sharing qualiting that the tuple has, but by the query having any quality that the tuple type does not
     def match_tuple_type(self) -> set[TupleType]:
@@ -270,6 +274,72 @@ class TupleQuery:
             return False
         return True
 
+    def match_tuple(self, tup: RtTuple) -> bool:
+        """
+        Returns whether the tuple satisfies every populated field of the query.
+        A populated field that the tuple does not carry never matches.
+        """
+        if self.types and tup.tuple_type not in self.types:
+            return False
+        for query_attr, component in query_components.items():
+            expected = getattr(self, query_attr)
+            if expected is None:
+                continue
+            if query_attr == "nonrepeatable_rui" and hasattr(tup, "p"):
+                if expected not in tup.p:
+                    return False
+                continue
+            if not hasattr(tup, component) or getattr(tup, component) != expected:
+                return False
+        if self.p_list is not None:
+            if not hasattr(tup, "p") or any(entry not in tup.p for entry in self.p_list):
+                return False
+        if self.replacements is not None:
+            if not hasattr(tup, "replacements") or any(entry not in tup.replacements for entry in self.replacements):
+                return False
+        if self.begin_timestamp is not None or self.end_timestamp is not None:
+            if not hasattr(tup, "t"):
+                return False
+            if self.begin_timestamp is not None and as_utc(tup.t) < temporal_bound(self.begin_timestamp):
+                return False
+            if self.end_timestamp is not None and as_utc(tup.t) > temporal_bound(self.end_timestamp):
+                return False
+        return True
+
+
+"""Mapping from TupleQuery attributes compared by equality to the tuple component they constrain"""
+query_components = {
+    "rui": "rui",
+    "author_rui": "ruia",
+    "relationship": "r",
+    "repeatable_uui": "ruir",
+    "nonrepeatable_rui": "ruin",
+    "ta": "ta",
+    "tr": "tr",
+    "data": "data",
+    "datatype": "ruidt",
+    "polarity": "polarity",
+    "change_reason": "event_reason",
+    "change_code": "event",
+    "concept_code": "code",
+    "confidence": "C",
+}
+
+
+def as_utc(value: datetime) -> datetime:
+    """Naive datetimes are taken as UTC, so they can be compared with aware ones"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def temporal_bound(bound) -> datetime:
+    """Resolves a query timestamp, given as a TempRef, ISO_Rui or datetime, to an aware datetime"""
+    if isinstance(bound, TempRef):
+        bound = bound.ref
+    if isinstance(bound, ISO_Rui):
+        bound = bound.date
+    if not isinstance(bound, datetime):
+        raise ValueError(f"Temporal reference {bound} does not resolve to a point in time")
+    return as_utc(bound)
 
 
 class RtStore(ABC):
@@ -286,7 +356,7 @@ class RtStore(ABC):
         pass
 
     @abstractmethod
-    def get_by_author(self, rui: Rui) -> Rui:
+    def get_by_author(self, rui: Rui) -> set[RtTuple]:
         pass
 
     @abstractmethod
@@ -0,0 +1,297 @@
+import threading
+import zlib
+import multiprocessing
+from collections import defaultdict
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from rt_core_v2.rttuple import RtTuple, TupleType, type_to_class, component_names
+from rt_core_v2.ids_codes.rui import Rui, UUI
+from rt_core_v2.ids_codes.allocator import RuiAllocator
+from rt_core_v2.binary import iter_binary_records, records_to_binary
+from rt_core_v2.persist.rts_store import RtStore, TupleQuery
+from rt_core_v2.persist.sqlite_store import SqliteRtStore, encode_rui
+from rt_core_v2.persist.transaction import WriteBuffer
+
+"""Tuple types placed on the shard of their ruin, so that queries for a particular's own tuples of these types go to one shard"""
+ruin_types = frozenset(tuple_type for tuple_type, tuple_class in type_to_class.items() if "ruin" in component_names(tuple_class))
+
+
+def shard_index(rui, count: int) -> int:
+    """Shard number of a referent, the same in every process and every run"""
+    return zlib.crc32(str(rui).encode("utf-8")) % count
+
+
+def sqlite_shards(directory: str, count: int, batch_size: int = 10000) -> list[Callable[[], SqliteRtStore]]:
+    """Returns the functions opening the SQLite files of count shards in directory, which are created if needed"""
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    return [partial(SqliteRtStore, str(Path(directory) / f"shard-{number}.db"), batch_size) for number in range(count)]
+
+
+def _commit_records(store: RtStore, records: bytes):
+    try:
+        for tup in iter_binary_records(records):
+            store.save_tuple(tup)
+        store.commit()
+    except BaseException:
+        store.rollback()
+        raise
+
+
+def _get_tuples(store: RtStore, ruis: list[Rui]) -> list[RtTuple]:
+    return [tup for tup in map(store.get_tuple, ruis) if tup is not None]
+
+
+def _route_keys(store: RtStore) -> list[bytes | str]:
+    """The encoded ruis of every tuple the store holds, read when a sharded store opens to rebuild its route"""
+    if isinstance(store, SqliteRtStore):
+        with store.reading() as connection:
+            return [row[0] for row in connection.execute("SELECT rui FROM tuple_index")]
+    return [encode_rui(tup.rui) for tup in store.run_query(TupleQuery(include_invalid=True))]
+
+
+"""Mapping from operation name to the function a shard worker runs on its store, returning a list of tuples,
+sent back as binary records, or a plain list or None, sent as is"""
+shard_operations = {
+    "commit": _commit_records,
+    "get_tuples": _get_tuples,
+    "get_by_referent": lambda store, rui: store.get_by_referent(rui),
+    "get_by_author": lambda store, rui: store.get_by_author(rui),
+    "run_query": lambda store, query: store.run_query(query),
+    "route_keys": _route_keys,
+}
+
+"""Operations whose results are not tuples"""
+plain_operations = frozenset({"route_keys"})
+
+
+def serve_shard(connection, open_store: Callable[[], RtStore]):
+    """Runs in the worker process of a shard, answering the requests of the parent until it shuts the shard down
+
+    Tuples travel both ways as binary records, which are cheaper to decode than pickled tuples.
+    """
+    store = open_store()
+    while True:
+        operation, arguments = connection.recv()
+        if operation == "shut_down":
+            store.shut_down()
+            connection.send((True, None))
+            connection.close()
+            return
+        try:
+            found = shard_operations[operation](store, *arguments)
+            if found is not None and operation not in plain_operations:
+                found = records_to_binary(found)
+            connection.send((True, found))
+        except Exception as error:
+            connection.send((False, error))
+
+
+class ShardProcess:
+    """A shard store running in a worker process of its own, reached through a pipe
+
+    Requests are answered one at a time, so a thread holds the lock of the shard from sending a request until
+    its response is received.
+
+    Attributes:
+    connection -- The parent's end of the pipe to the worker
+    process -- The worker process
+    lock -- Held while a request to the shard is outstanding
+    """
+
+    def __init__(self, open_store: Callable[[], RtStore], context=None):
+        context = context or multiprocessing.get_context()
+        self.connection, worker_connection = context.Pipe()
+        self.process = context.Process(target=serve_shard, args=(worker_connection, open_store), daemon=True)
+        self.process.start()
+        worker_connection.close()
+        self.lock = threading.Lock()
+
+    def send(self, operation: str, *arguments):
+        self.connection.send((operation, arguments))
+
+    def receive(self) -> tuple[bool, object]:
+        """Returns (True, the result of the operation) or (False, the error raised by the worker)"""
+        ok, outcome = self.connection.recv()
+        if ok and isinstance(outcome, bytes):
+            outcome = list(iter_binary_records(outcome))
+        return ok, outcome
+
+    def request(self, operation: str, *arguments):
+        with self.lock:
+            self.send(operation, *arguments)
+            ok, outcome = self.receive()
+        if not ok:
+            raise outcome
+        return outcome
+
+    def shut_down(self):
+        self.request("shut_down")
+        self.process.join()
+        self.connection.close()
+
+
+class ShardedRtStore(RtStore):
+    """RtStore partitioning the tuples across several stores by a hash of their primary referent
+
+    Every shard is a store opened and run in a worker process of its own, so the shards answer a lookup in
+    parallel without sharing the GIL. A tuple with a ruin is placed on the shard of its ruin and an NtoN tuple
+    on the shard of its first participant. Tuples about a tuple, DI, DC and F tuples, are placed with the tuple
+    they are about, so a tuple and its DITuple are committed together by one shard and each shard applies the
+    DCTuples changing the validity of its own tuples. Other tuples are placed by their own rui.
+
+    The route maps the rui of every stored tuple to its shard, so get_tuple and queries for a rui go to a
+    single shard. It holds one entry per tuple, keyed by the encoded rui to keep entries small, and is rebuilt
+    from the shards when the store opens.
+
+    Saved tuples are buffered per thread in this process until commit, which sends each shard its part of the
+    transaction to save and commit. Shards commit independently, so a commit spanning several shards is not
+    atomic: when one shard fails, the others may already have committed their part.
+
+    Queries for a particular's own tuples go to the shard of the particular. Other lookups, including
+    get_by_referent since a referent also appears in the tuples of the particulars related to it, run on
+    every shard and their results are merged.
+
+    Attributes:
+    shards -- The worker processes holding the partitions
+    route -- Mapping from the encoded rui of every stored tuple to the number of its shard
+    pending -- The tuples saved by each thread since its last commit or rollback
+    allocator -- Hands out the ruis of get_available_rui, recording its blocks in this store
+    """
+
+    def __init__(self, shards: list[Callable[[], RtStore]], context=None):
+        if not shards:
+            raise ValueError("A sharded store needs at least one shard")
+        self.shards = [ShardProcess(open_store, context) for open_store in shards]
+        self.pending = WriteBuffer()
+        self.route: dict[bytes | str, int] = {}
+        for number, keys in self._gather({number: ("route_keys",) for number in range(len(self.shards))}).items():
+            self.route.update(dict.fromkeys(keys, number))
+        self.allocator = RuiAllocator(store=self)
+
+    def _gather(self, requests: dict[int, tuple]) -> dict[int, Optional[list]]:
+        """Sends every shard number in requests its (operation, arguments...) at once and collects the results"""
+        numbers = sorted(requests)
+        responses = {}
+        # Locks are always taken in shard order, so concurrent gathers cannot deadlock
+        locked = []
+        try:
+            for number in numbers:
+                shard = self.shards[number]
+                shard.lock.acquire()
+                locked.append(shard)
+                shard.send(*requests[number])
+            for number in numbers:
+                responses[number] = self.shards[number].receive()
+        finally:
+            for shard in locked:
+                shard.lock.release()
+        for ok, outcome in responses.values():
+            if not ok:
+                raise outcome
+        return {number: outcome for number, (_, outcome) in responses.items()}
+
+    def _gather_all(self, operation: str, *arguments, shards: Iterable[int] = None) -> set[RtTuple]:
+        shards = range(len(self.shards)) if shards is None else shards
+        return set().union(*self._gather({number: (operation, *arguments) for number in shards}).values())
+
+    def shard_of(self, rui) -> int:
+        return shard_index(rui, len(self.shards))
+
+    def place(self, tup: RtTuple, placed: dict = None) -> int:
+        """The shard number of a tuple, placed with the tuple it is about when that one is in placed or stored"""
+        about = getattr(tup, "ruit", None)
+        if about is None:
+            about = getattr(tup, "ruitn", None)
+        if about is not None:
+            key = encode_rui(about)
+            number = (placed or {}).get(key, self.route.get(key))
+            return number if number is not None else self.shard_of(about)
+        referent = getattr(tup, "ruin", None)
+        if referent is None and getattr(tup, "p", None):
+            referent = tup.p[0]
+        return self.shard_of(referent if referent is not None else tup.rui)
+
+    def save_tuple(self, tup: RtTuple) -> bool:
+        self.pending.save(tup)
+        return True
+
+    def commit(self):
+        tuples = self.pending.take()
+        placed = {}
+        # Tuples about a tuple follow it, so those about tuples of this commit are placed last
+        for tup in sorted(tuples, key=lambda tup: hasattr(tup, "ruit") or hasattr(tup, "ruitn")):
+            placed[encode_rui(tup.rui)] = self.place(tup, placed)
+        by_shard = defaultdict(list)
+        for tup in tuples:
+            by_shard[placed[encode_rui(tup.rui)]].append(tup)
+        self.route.update(placed)
+        if by_shard:
+            self._gather({number: ("commit", records_to_binary(tuples)) for number, tuples in by_shard.items()})
+
+    def rollback(self):
+        self.pending.discard()
+
+    def shut_down(self):
+        self.pending.discard()
+        for shard in self.shards:
+            shard.shut_down()
+
+    def get_tuple(self, rui: Rui) -> RtTuple:
+        number = self.route.get(encode_rui(rui))
+        if number is None:
+            return None
+        return next(iter(self.shards[number].request("get_tuples", [rui])), None)
+
+    def get_by_referent(self, rui: Rui) -> set[RtTuple]:
+        return self._gather_all("get_by_referent", rui)
+
+    def get_by_author(self, rui: Rui) -> set[RtTuple]:
+        """Returns the DI tuples of the author and the tuples they inserted, which each shard holds together"""
+        return self._gather_all("get_by_author", rui)
+
+    def get_available_rui(self) -> Rui:
+        return self.allocator.allocate()
+
+    def query_shards(self, query: TupleQuery) -> list[int]:
+        """The numbers of the shards that can hold tuples matching the query"""
+        if query.rui is not None:
+            number = self.route.get(encode_rui(query.rui))
+            return [] if number is None else [number]
+        if query.nonrepeatable_rui is not None and query.match_tuple_type() <= ruin_types:
+            return [self.shard_of(query.nonrepeatable_rui)]
+        return list(range(len(self.shards)))
+
+    def run_query(self, query: TupleQuery) -> set[RtTuple]:
+        return self._gather_all("run_query", query, shards=self.query_shards(query))
+
+    def get_referents_by_type_and_designator_type(self, referent_type: Rui, designator_type: Rui, designator_txt: str) -> set[RtTuple]:
+        """Returns the NtoR tuples that assert a referent's type for referents denoted by a designator
+
+        The designator, its referents and the NtoN tuples relating them may be on different shards, so the
+        join is done here from one query per step.
+        """
+        # Types are UUIs in NtoR tuples but may be passed as Ruis
+        referent_type, designator_type = UUI(str(referent_type)), UUI(str(designator_type))
+        texts = self.run_query(TupleQuery(types={TupleType.NtoDE}, data=designator_txt.encode("utf-8")))
+        designators = {
+            tup.ruin
+            for tup in texts
+            if tup.polarity
+            and any(typed.polarity for typed in self.run_query(TupleQuery(types={TupleType.NtoR}, nonrepeatable_rui=tup.ruin, repeatable_uui=designator_type)))
+        }
+        referents = {
+            participant
+            for designator in designators
+            for tup in self.run_query(TupleQuery(types={TupleType.NtoN}, p_list=[designator]))
+            if tup.polarity
+            for participant in tup.p
+            if participant != designator
+        }
+        return {
+            tup
+            for referent in referents
+            for tup in self.run_query(TupleQuery(types={TupleType.NtoR}, nonrepeatable_rui=referent, repeatable_uui=referent_type))
+            if tup.polarity
+        }
@@ -0,0 +1,512 @@
+import sqlite3
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from operator import attrgetter, call
+from dataclasses import fields
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import NamedTuple, Optional
+from uuid6 import UUID
+
+from rt_core_v2.rttuple import RtTuple, TupleType, type_to_class
+from rt_core_v2.ids_codes.rui import Rui, ID_Rui, ISO_Rui, UUI, TempRef, Relationship
+from rt_core_v2.ids_codes.allocator import RuiAllocator
+from rt_core_v2.persist.rts_store import RtStore, TupleQuery, query_components, temporal_bound
+from rt_core_v2.persist.validity import ValidityView
+from rt_core_v2.persist.transaction import WriteBuffer, GroupCommitter
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def encode_rui(rui) -> bytes | str:
+    """ID_Ruis are stored as their 16 raw uuid bytes and ISO_Ruis as ISO 8601 text"""
+    if isinstance(rui, ISO_Rui):
+        return rui.date.isoformat()
+    if isinstance(rui, ID_Rui):
+        return rui.uuid.bytes
+    if isinstance(rui, datetime):
+        return rui.isoformat()
+    return rui.bytes
+
+
+def decode_rui(value: bytes | str) -> Rui:
+    if isinstance(value, bytes):
+        return ID_Rui(UUID(bytes=value))
+    return ISO_Rui(datetime.fromisoformat(value))
+
+
+def encode_datetime(value: datetime) -> int:
+    """Datetimes are stored as twice their microseconds since the epoch, plus one for naive datetimes
+
+    Naive datetimes are taken as UTC. The low bit keeps them naive when read back, and stored values still
+    sort in time order, so time ranges are selected with datetime_bound.
+    """
+    naive = value.tzinfo is None
+    if naive:
+        value = value.replace(tzinfo=timezone.utc)
+    return ((value - EPOCH) // MICROSECOND) * 2 + naive
+
+
+def decode_datetime(value: int) -> datetime:
+    microseconds, naive = divmod(value, 2)
+    value = EPOCH + microseconds * MICROSECOND
+    return value.replace(tzinfo=None) if naive else value
+
+
+def datetime_bound(value: datetime, upper: bool) -> int:
+    """The stored value bounding a time range at value, including both naive and aware datetimes at value"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return ((value - EPOCH) // MICROSECOND) * 2 + upper
+
+
+class ColumnCodec:
+    """Converts one tuple component type to and from its SQLite column representation
+
+    Attributes:
+    sql_type -- The declared type of the column
+    encode -- Converts a component value into a value SQLite can bind
+    decode -- Converts a stored value back into the component value
+    """
+
+    def __init__(self, sql_type: str, encode, decode):
+        self.sql_type = sql_type
+        self.encode = encode
+        self.decode = decode
+
+
+rui_codec = ColumnCodec("BLOB", encode_rui, decode_rui)
+
+component_codecs = {
+    ID_Rui: rui_codec,
+    Rui: rui_codec,
+    UUI: ColumnCodec("TEXT", str, UUI),
+    Relationship: ColumnCodec("TEXT", str, Relationship),
+    TempRef: ColumnCodec("BLOB", lambda x: encode_rui(x.ref), lambda x: TempRef(decode_rui(x))),
+    datetime: ColumnCodec("INTEGER", encode_datetime, decode_datetime),
+    bool: ColumnCodec("INTEGER", int, bool),
+    float: ColumnCodec("REAL", float, float),
+    str: ColumnCodec("TEXT", str, str),
+    bytes: ColumnCodec("BLOB", bytes, bytes),
+}
+
+
+def codec_for(annotation) -> ColumnCodec:
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return ColumnCodec("TEXT" if isinstance(next(iter(annotation)).value, str) else "INTEGER", lambda x: x.value, annotation)
+    return component_codecs[annotation]
+
+
+"""Attribute paths reading the column value of a component straight from the component, by annotation
+
+ID_Ruis are read as their uuid bytes, including the usual ID_Rui of a TempRef. Components holding another kind
+of identifier than the path expects, such as an ISO_Rui in a TempRef, fail the path and go through the codecs.
+"""
+fast_paths = {
+    ID_Rui: "{}.identifier.bytes",
+    UUI: "{}.identifier",
+    Relationship: "{}.uri",
+    TempRef: "{}.ref.identifier.bytes",
+    bool: "{}",
+    float: "{}",
+    str: "{}",
+    bytes: "{}",
+}
+
+
+def fast_path(name: str, annotation) -> str | None:
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return f"{name}.value"
+    path = fast_paths.get(annotation)
+    return path.format(name) if path else None
+
+
+class TupleTable:
+    """SQLite table layout for one tuple type, derived from the fields of its dataclass
+
+    List components such as p and replacements are held in child tables of (tuple_rui, position, member).
+
+    Rows are encoded by one attrgetter reading every column along its fast path, with the codecs of the
+    columns without a path, such as datetimes, applied afterwards.
+
+    Attributes:
+    tuple_type -- The tuple type stored in this table
+    name -- The name of the table
+    columns -- Mapping from scalar component name to its codec, in dataclass field order
+    lists -- Mapping from list component name to the name of its child table
+    get_fast -- Reads the column values of a tuple, or the components of the columns listed in converters
+    converters -- The positions and encoders of the columns read as components by get_fast
+    """
+
+    def __init__(self, tuple_type: TupleType):
+        self.tuple_type = tuple_type
+        self.tuple_class = type_to_class[tuple_type]
+        self.name = self.tuple_class.__name__.lower()
+        self.columns: dict[str, ColumnCodec] = {}
+        self.lists: dict[str, str] = {}
+        paths = []
+        self.converters: list[tuple[int, object]] = []
+        for entry in fields(self.tuple_class):
+            if getattr(entry.type, "__origin__", None) is list:
+                self.lists[entry.name] = f"{self.name}_{entry.name}"
+                continue
+            self.columns[entry.name] = codec_for(entry.type)
+            path = fast_path(entry.name, entry.type)
+            if path is None:
+                self.converters.append((len(paths), self.columns[entry.name].encode))
+                path = entry.name
+            paths.append(path)
+        self.get_fast = attrgetter(*paths)
+        # Component names such as unique are SQL keywords, so columns are always quoted
+        self.column_sql = ", ".join(f'"{name}"' for name in self.columns)
+        placeholders = ", ".join("?" for _ in self.columns)
+        self.insert_sql = f"INSERT INTO {self.name} ({self.column_sql}) VALUES ({placeholders})"
+        self.get_columns = attrgetter(*self.columns)
+        self.encoders = tuple(codec.encode for codec in self.columns.values())
+        self.insert_list_sql = {name: f"INSERT INTO {table} (tuple_rui, position, member) VALUES (?, ?, ?)" for name, table in self.lists.items()}
+        self.insert_index_sql = f"INSERT INTO tuple_index (rui, tuple_type) VALUES (?, '{tuple_type.value}')"
+
+    def create_statements(self) -> list[str]:
+        column_defs = ", ".join(
+            f'"{name}" {codec.sql_type}' + (" PRIMARY KEY" if name == "rui" else "")
+            for name, codec in self.columns.items()
+        )
+        statements = [f"CREATE TABLE IF NOT EXISTS {self.name} ({column_defs}) WITHOUT ROWID"]
+        for name in self.columns:
+            if name in indexed_columns:
+                statements.append(f"CREATE INDEX IF NOT EXISTS {self.name}_{name} ON {self.name} ({name})")
+        for table in self.lists.values():
+            statements.append(
+                f"CREATE TABLE IF NOT EXISTS {table} (tuple_rui BLOB, position INTEGER, member BLOB, PRIMARY KEY (tuple_rui, position)) WITHOUT ROWID"
+            )
+            statements.append(f"CREATE INDEX IF NOT EXISTS {table}_member ON {table} (member)")
+        return statements
+
+    def encode(self, tup: RtTuple) -> tuple | list:
+        try:
+            row = self.get_fast(tup)
+        except AttributeError:
+            return tuple(map(call, self.encoders, self.get_columns(tup)))
+        if self.converters:
+            row = list(row)
+            for position, encode in self.converters:
+                row[position] = encode(row[position])
+        return row
+
+    def encode_lists(self, tup: RtTuple) -> tuple[list, ...]:
+        """The encoded members of each list component, in the order of lists"""
+        return tuple([encode_rui(member) for member in getattr(tup, name)] for name in self.lists)
+
+    def decode(self, row: tuple, lists: dict[str, list]) -> RtTuple:
+        arguments = {name: codec.decode(value) for (name, codec), value in zip(self.columns.items(), row)}
+        arguments.update(lists)
+        return self.tuple_class(**arguments)
+
+
+class EncodedTuple(NamedTuple):
+    """A tuple encoded into the values of its table row, saved with SqliteRtStore.save_encoded
+
+    Encoding is most of the work of writing a tuple, so bulk loads encode tuples in worker processes and the
+    writer only inserts the rows. DC tuples are also carried whole, as the store's validity view applies them.
+
+    Attributes:
+    tuple_type -- The type of the tuple, naming its table
+    row -- The column values of the tuple
+    lists -- The encoded members of each list component of the table
+    event -- The tuple itself when it is a DC tuple, otherwise None
+    """
+
+    tuple_type: TupleType
+    row: tuple
+    lists: tuple
+    event: Optional[RtTuple]
+
+
+def encode_tuples(tuples) -> list[EncodedTuple]:
+    """Encodes tuples into table rows, in any process, for SqliteRtStore.save_encoded"""
+    encoded = []
+    for tup in tuples:
+        table = tuple_tables[tup.tuple_type]
+        event = tup if tup.tuple_type is TupleType.DC else None
+        encoded.append(EncodedTuple(tup.tuple_type, tuple(table.encode(tup)), table.encode_lists(tup), event))
+    return encoded
+
+
+"""Columns holding referents or timestamps, which get a secondary index"""
+indexed_columns = {"ruin", "ruit", "ruitn", "ruia", "ruid", "ruir", "t"}
+
+tuple_tables = {tuple_type: TupleTable(tuple_type) for tuple_type in TupleType}
+
+"""Table mapping the rui of every stored tuple to its type, so get_tuple reads a single table"""
+index_statement = "CREATE TABLE IF NOT EXISTS tuple_index (rui BLOB PRIMARY KEY, tuple_type TEXT) WITHOUT ROWID"
+
+"""The largest number of keys bound to one IN (...) list"""
+max_in_keys = 500
+
+
+class SqliteRtStore(RtStore):
+    """Durable RtStore on the standard library sqlite3 module
+
+    Every tuple type has its own table, RUIs are stored as 16 byte blobs and the tuple_index table maps the rui
+    of every tuple to its type. The database runs in WAL mode with synchronous=FULL, so every commit syncs the
+    WAL before it returns. Saved tuples are buffered per thread until commit, and the commits of concurrent
+    writers are written in groups by a GroupCommitter, each group in one transaction and so with one sync, and
+    no uncommitted row is ever in the database outside of a commit. Reads of a database file
+    go through a connection per reading thread, inside a read transaction, so a read sees one committed state
+    of the database. An in-memory database can only be reached through the writer connection, so its reads
+    take the lock that writes hold.
+
+    Attributes:
+    path -- The path of the database file, or ":memory:"
+    connection -- The sqlite3 connection of the writers, in autocommit mode so transactions are managed explicitly
+    batch_size -- The number of tuples encoded and written per executemany call
+    pending -- The tuples saved by each thread since its last commit or rollback, as tuples or EncodedTuples
+    committer -- Writes the commits of concurrent writers in groups
+    lock -- Held while a group is written, and by the reads of an in-memory database
+    readers -- The reader connection of each thread
+    validity -- The current validity of the committed tuples, loaded from the DC table when the store opens
+    allocator -- Hands out the ruis of get_available_rui, recording its blocks in this store
+    """
+
+    def __init__(self, path: str = ":memory:", batch_size: int = 10000):
+        self.path = path
+        self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=FULL")
+        for table in tuple_tables.values():
+            for statement in table.create_statements():
+                self.connection.execute(statement)
+        self.connection.execute(index_statement)
+        if self.connection.execute("SELECT 1 FROM tuple_index LIMIT 1").fetchone() is None:
+            # Databases written before the tuple index existed
+            for tuple_type, table in tuple_tables.items():
+                self.connection.execute(f"INSERT INTO tuple_index SELECT rui, '{tuple_type.value}' FROM {table.name}")
+        self.batch_size = batch_size
+        self.pending = WriteBuffer()
+        self.committer = GroupCommitter(self._write_group)
+        self.lock = threading.RLock()
+        self.readers = threading.local()
+        self.reader_connections: list[sqlite3.Connection] = []
+        self.validity = ValidityView()
+        for tup in self._select(self.connection, tuple_tables[TupleType.DC]):
+            self.validity.apply(tup)
+        self.allocator = RuiAllocator(store=self)
+
+    def save_tuple(self, tup: RtTuple) -> bool:
+        self.pending.save(tup)
+        return True
+
+    """Encodes tuples in a form save_encoded accepts, used by bulk_load to encode in its worker processes"""
+    encode_tuples = staticmethod(encode_tuples)
+
+    def save_encoded(self, encoded: EncodedTuple):
+        """Saves a tuple already encoded by encode_tuples, committed like a saved tuple"""
+        self.pending.save(encoded)
+
+    def commit(self):
+        self.committer.commit(self.pending.take())
+
+    def _write_group(self, transactions: list[list[RtTuple]]):
+        by_type: dict[TupleType, list[RtTuple]] = defaultdict(list)
+        for transaction in transactions:
+            for tup in transaction:
+                by_type[tup.tuple_type].append(tup)
+        with self.lock:
+            self.connection.execute("BEGIN")
+            try:
+                for tuple_type, tuples in by_type.items():
+                    for start in range(0, len(tuples), self.batch_size):
+                        self._insert(tuple_tables[tuple_type], tuples[start:start + self.batch_size])
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+        for tup in by_type.get(TupleType.DC, ()):
+            self.validity.apply(tup.event if isinstance(tup, EncodedTuple) else tup)
+
+    def _insert(self, table: TupleTable, tuples: list[RtTuple | EncodedTuple]):
+        rows, lists = [], []
+        for tup in tuples:
+            if isinstance(tup, EncodedTuple):
+                rows.append(tup.row)
+                lists.append(tup.lists)
+            else:
+                rows.append(table.encode(tup))
+                if table.lists:
+                    lists.append(table.encode_lists(tup))
+        self.connection.executemany(table.insert_sql, rows)
+        self.connection.executemany(table.insert_index_sql, [(row[0],) for row in rows])
+        for index, sql in enumerate(table.insert_list_sql.values()):
+            self.connection.executemany(
+                sql,
+                [(row[0], position, member) for row, members in zip(rows, lists) for position, member in enumerate(members[index])],
+            )
+
+    def rollback(self):
+        self.pending.discard()
+
+    def shut_down(self):
+        self.pending.discard()
+        for connection in self.reader_connections:
+            connection.close()
+        self.reader_connections = []
+        self.connection.close()
+
+    @contextmanager
+    def reading(self):
+        """Yields a connection on which every read sees the same committed state of the database"""
+        if self.path in (":memory:", ""):
+            with self.lock:
+                yield self.connection
+            return
+        connection = getattr(self.readers, "connection", None)
+        if connection is None:
+            connection = self.readers.connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA query_only=1")
+            self.reader_connections.append(connection)
+        if connection.in_transaction:
+            # A read nested in another read of this thread shares its transaction
+            yield connection
+            return
+        connection.execute("BEGIN")
+        try:
+            yield connection
+        finally:
+            connection.execute("COMMIT")
+
+    def _select(self, connection: sqlite3.Connection, table: TupleTable, where: str = "", parameters: tuple = ()) -> list[RtTuple]:
+        rows = connection.execute(f"SELECT {table.column_sql} FROM {table.name} {where}", parameters).fetchall()
+        if not rows or not table.lists:
+            return [table.decode(row, {}) for row in rows]
+        keys = [row[0] for row in rows]
+        members = {name: self._members(connection, list_table, keys) for name, list_table in table.lists.items()}
+        return [table.decode(row, {name: found.get(row[0], []) for name, found in members.items()}) for row in rows]
+
+    @staticmethod
+    def _members(connection: sqlite3.Connection, list_table: str, keys: list) -> dict[bytes, list[Rui]]:
+        """Reads the lists of the tuples with the given keys from a child table, max_in_keys tuples per query"""
+        members = defaultdict(list)
+        for start in range(0, len(keys), max_in_keys):
+            chunk = keys[start:start + max_in_keys]
+            rows = connection.execute(
+                f"SELECT tuple_rui, member FROM {list_table} WHERE tuple_rui IN ({', '.join('?' * len(chunk))})"
+                " ORDER BY tuple_rui, position",
+                chunk,
+            )
+            for key, member in rows:
+                members[key].append(decode_rui(member))
+        return members
+
+    def get_tuple(self, rui: Rui) -> RtTuple:
+        key = encode_rui(rui)
+        with self.reading() as connection:
+            indexed = connection.execute("SELECT tuple_type FROM tuple_index WHERE rui = ?", (key,)).fetchone()
+            if indexed is None:
+                return None
+            found = self._select(connection, tuple_tables[TupleType(indexed[0])], "WHERE rui = ?", (key,))
+        return found[0] if found else None
+
+    def get_by_referent(self, rui: Rui) -> set[RtTuple]:
+        found = set()
+        with self.reading() as connection:
+            for table in tuple_tables.values():
+                for name, codec in table.columns.items():
+                    if name in indexed_columns and name != "t" and isinstance(rui, UUI) == (codec.sql_type == "TEXT"):
+                        found.update(self._select(connection, table, f"WHERE {name} = ?", (codec.encode(rui),)))
+                if isinstance(rui, UUI):
+                    continue
+                for list_table in table.lists.values():
+                    if list_table == "dctuple_replacements":
+                        continue
+                    found.update(
+                        self._select(
+                            connection, table, f"WHERE rui IN (SELECT tuple_rui FROM {list_table} WHERE member = ?)", (encode_rui(rui),)
+                        )
+                    )
+        return found
+
+    def get_by_author(self, rui: Rui) -> set[RtTuple]:
+        with self.reading() as connection:
+            found = set(self._select(connection, tuple_tables[TupleType.DI], "WHERE ruia = ?", (encode_rui(rui),)))
+            for di in list(found):
+                authored = self.get_tuple(di.ruit)
+                if authored is not None:
+                    found.add(authored)
+        return found
+
+    def get_available_rui(self) -> Rui:
+        return self.allocator.allocate()
+
+    def get_referents_by_type_and_designator_type(self, referent_type: Rui, designator_type: Rui, designator_txt: str) -> set[RtTuple]:
+        """Returns the NtoR tuples that assert a referent's type for referents denoted by a designator
+
+        The join returns the ruis of the tuples of every step, which are checked against the validity view so
+        that a designator is only followed through valid, positive tuples.
+        """
+        with self.reading() as connection:
+            rows = connection.execute(
+                "SELECT referent_type.rui, designator_type.rui, designator.rui, link.tuple_rui FROM ntortuple designator_type"
+                " JOIN ntodetuple designator ON designator.ruin = designator_type.ruin"
+                " JOIN ntontuple_p link ON link.member = designator_type.ruin"
+                " JOIN ntontuple relation ON relation.rui = link.tuple_rui"
+                " JOIN ntontuple_p referent ON referent.tuple_rui = link.tuple_rui AND referent.member != link.member"
+                " JOIN ntortuple referent_type ON referent_type.ruin = referent.member"
+                " WHERE designator_type.ruir = ? AND designator.data = ? AND referent_type.ruir = ?"
+                " AND designator_type.polarity AND designator.polarity AND relation.polarity AND referent_type.polarity",
+                (str(designator_type), designator_txt.encode("utf-8"), str(referent_type)),
+            ).fetchall()
+            invalid = {encode_rui(rui) for rui in list(self.validity.invalid)}
+            keys = list({row[0] for row in rows if invalid.isdisjoint(row)})
+            found = set()
+            for start in range(0, len(keys), max_in_keys):
+                chunk = keys[start:start + max_in_keys]
+                found.update(self._select(connection, tuple_tables[TupleType.NtoR], f"WHERE rui IN ({', '.join('?' * len(chunk))})", tuple(chunk)))
+        return found
+
+    def run_query(self, query: TupleQuery) -> set[RtTuple]:
+        """Pushes equality and time range predicates down into each candidate table, then checks the full query"""
+        found = set()
+        with self.reading() as connection:
+            for tuple_type in query.match_tuple_type():
+                table = tuple_tables[tuple_type]
+                where = self._where(table, query)
+                if where is None:
+                    continue
+                clauses, parameters = where
+                where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+                found.update(tup for tup in self._select(connection, table, where_sql, tuple(parameters)) if query.match_tuple(tup))
+        return found if query.include_invalid else self.validity.valid(found)
+
+    @staticmethod
+    def _where(table: TupleTable, query: TupleQuery):
+        """Returns the clauses and parameters selecting the query from the table, or None if no row can match"""
+        clauses, parameters = [], []
+        for query_attr, component in query_components.items():
+            expected = getattr(query, query_attr)
+            if expected is None:
+                continue
+            if component in table.columns:
+                clauses.append(f'"{component}" = ?')
+                parameters.append(table.columns[component].encode(expected))
+            elif not (query_attr == "nonrepeatable_rui" and "p" in table.lists):
+                return None
+        if query.begin_timestamp is not None or query.end_timestamp is not None:
+            if "t" not in table.columns:
+                return None
+            if query.begin_timestamp is not None:
+                clauses.append("t >= ?")
+                parameters.append(datetime_bound(temporal_bound(query.begin_timestamp), upper=False))
+            if query.end_timestamp is not None:
+                clauses.append("t <= ?")
+                parameters.append(datetime_bound(temporal_bound(query.end_timestamp), upper=True))
+        for name, members in (("p", query.p_list), ("replacements", query.replacements)):
+            if members is None:
+                continue
+            if name not in table.lists:
+                return None
+            for member in members:
+                clauses.append(f"rui IN (SELECT tuple_rui FROM {table.lists[name]} WHERE member = ?)")
+                parameters.append(encode_rui(member))
+        return clauses, parameters
@@ -0,0 +1,65 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def time_key(value: datetime) -> int:
+    """Microseconds since the epoch of a datetime, naive datetimes are taken as UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // MICROSECOND
+
+
+class TimeIndex:
+    """Sorted array index from a timestamp to the keys of the tuples carrying it
+
+    Timestamps are kept as int64 microseconds in an array sorted by time, with the keys in a parallel list,
+    so a range is found with two binary searches and returned in time order in O(log n + k). Added entries are
+    buffered and merged into the arrays on the next lookup, which sorts the buffer and lets the sort merge
+    the two ordered runs in linear time.
+
+    A store whose writers merge each commit themselves can read ranges with merge=False concurrently with a
+    writer, as the sorted arrays are only ever extended with later entries or replaced as a whole.
+
+    Attributes:
+    sorted -- The sorted timestamps and the key of the tuple carrying each timestamp
+    unsorted -- Entries added since the last merge
+    """
+
+    def __init__(self):
+        self.sorted: tuple[array, list] = (array("q"), [])
+        self.unsorted: list[tuple[int, object]] = []
+
+    def __len__(self):
+        return len(self.sorted[0]) + len(self.unsorted)
+
+    def add(self, time: datetime, key):
+        self.unsorted.append((time_key(time), key))
+
+    def merge(self):
+        """Merges the entries added since the last merge into the sorted arrays"""
+        if not self.unsorted:
+            return
+        self.unsorted.sort(key=itemgetter(0))
+        times, keys = self.sorted
+        if not times or self.unsorted[0][0] >= times[-1]:
+            times.extend(time for time, _ in self.unsorted)
+            keys.extend(key for _, key in self.unsorted)
+        else:
+            entries = list(zip(times, keys)) + self.unsorted
+            entries.sort(key=itemgetter(0))
+            self.sorted = (array("q", (time for time, _ in entries)), [key for _, key in entries])
+        self.unsorted = []
+
+    def range(self, begin: datetime = None, end: datetime = None, merge: bool = True) -> list:
+        """Returns the keys of the entries with begin <= time <= end in time order, open ended when a bound is None"""
+        if merge:
+            self.merge()
+        times, keys = self.sorted
+        low = 0 if begin is None else bisect_left(times, time_key(begin))
+        high = len(times) if end is None else bisect_right(times, time_key(end))
+        return keys[low:high]
@@ -0,0 +1,91 @@
+import threading
+from typing import Callable, Iterable
+
+from rt_core_v2.rttuple import RtTuple
+
+
+class WriteBuffer:
+    """Per-thread buffer of the tuples saved since the last commit or rollback
+
+    Each thread builds its own transaction, so a concrete tuple and its DITuple saved by one thread are
+    committed together and never mixed with the tuples of another writer. Rolling back discards the buffer.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+
+    @property
+    def tuples(self) -> list[RtTuple]:
+        tuples = getattr(self.local, "tuples", None)
+        if tuples is None:
+            tuples = self.local.tuples = []
+        return tuples
+
+    def save(self, tup: RtTuple):
+        self.tuples.append(tup)
+
+    def save_all(self, tuples: Iterable[RtTuple]):
+        """Buffers tuples that must be committed together, such as a concrete tuple and its DITuple"""
+        self.tuples.extend(tuples)
+
+    def take(self) -> list[RtTuple]:
+        """Returns the buffered tuples and empties the buffer"""
+        tuples = self.tuples
+        self.local.tuples = []
+        return tuples
+
+    def discard(self):
+        self.local.tuples = []
+
+
+class _Transaction:
+    def __init__(self, tuples: list[RtTuple]):
+        self.tuples = tuples
+        self.done = False
+        self.error = None
+
+
+class GroupCommitter:
+    """Commits the transactions of concurrent writers in groups, paying for one durable write per group
+
+    The first writer to commit while no group is being written becomes the leader. It takes every
+    transaction queued so far, including those of writers that arrived while the previous group was being
+    written, and hands them to write_group in a single call, which is expected to write and sync them once.
+    The other writers wait until their group is done and share its outcome, so an error raised by
+    write_group is raised in every writer of the group.
+
+    Attributes:
+    write_group -- Function writing a list of transactions, each a list of tuples, durably and atomically
+    queue -- The transactions waiting for the next group
+    """
+
+    def __init__(self, write_group: Callable[[list[list[RtTuple]]], None]):
+        self.write_group = write_group
+        self.queue: list[_Transaction] = []
+        self.writing = False
+        self.condition = threading.Condition()
+
+    def commit(self, tuples: list[RtTuple]):
+        if not tuples:
+            return
+        transaction = _Transaction(tuples)
+        with self.condition:
+            self.queue.append(transaction)
+            while self.writing and not transaction.done:
+                self.condition.wait()
+            if not transaction.done:
+                self.writing = True
+                group, self.queue = self.queue, []
+        if not transaction.done:
+            error = None
+            try:
+                self.write_group([entry.tuples for entry in group])
+            except BaseException as raised:
+                error = raised
+            with self.condition:
+                for entry in group:
+                    entry.done, entry.error = True, error
+                self.writing = False
+                self.condition.notify_all()
+        if transaction.error is not None:
+            raise transaction.error
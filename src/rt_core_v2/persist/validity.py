@@ -0,0 +1,74 @@
+from typing import Optional
+
+from rt_core_v2.rttuple import RtTuple, DCTuple, TupleType
+from rt_core_v2.ids_codes.rui import Rui
+from rt_core_v2.metadata import TupleEventType
+from rt_core_v2.persist.time_index import time_key
+
+
+class ValidityView:
+    """Current validity of tuples, maintained incrementally from the DC tuples about them
+
+    Each DC tuple applied is compared with the latest DC tuple known for its ruit, so the view is updated in
+    constant time per tuple. A tuple is invalid when its latest DC tuple invalidates it, and valid when it has
+    none or the latest one revalidates it. DC tuples arriving out of order only replace the latest event when
+    their time t is not earlier than it. When DC tuples are applied with the commit sequence number that made
+    them visible, the view also records each change of status so the validity at an earlier commit can be read.
+
+    Attributes:
+    latest -- Mapping from ruit to the time key and the latest DC tuple about that tuple
+    invalid -- The ruis of the currently invalidated tuples
+    history -- Mapping from ruit to the (commit sequence number, invalid) changes of its status, in commit order
+    """
+
+    def __init__(self):
+        self.latest: dict[Rui, tuple[int, DCTuple]] = {}
+        self.invalid: set[Rui] = set()
+        self.history: dict[Rui, list[tuple[int, bool]]] = {}
+
+    def apply(self, tup: RtTuple, seq: Optional[int] = None):
+        """Updates the view with a committed tuple, ignoring tuples other than DC tuples"""
+        if tup.tuple_type is not TupleType.DC:
+            return
+        key = time_key(tup.t)
+        current = self.latest.get(tup.ruit)
+        if current is not None and key < current[0]:
+            return
+        self.latest[tup.ruit] = (key, tup)
+        invalid = tup.event is TupleEventType.INVALIDATE
+        if invalid:
+            self.invalid.add(tup.ruit)
+        else:
+            self.invalid.discard(tup.ruit)
+        if seq is not None:
+            self.history.setdefault(tup.ruit, []).append((seq, invalid))
+
+    def is_valid(self, rui: Rui) -> bool:
+        return rui not in self.invalid
+
+    def is_valid_at(self, rui: Rui, seq: int) -> bool:
+        """Whether the tuple rui was valid once the commit with sequence number seq was applied"""
+        changes = self.history.get(rui)
+        if not changes:
+            return True
+        for change_seq, invalid in reversed(changes):
+            if change_seq <= seq:
+                return not invalid
+        return True
+
+    def latest_event(self, rui: Rui) -> Optional[DCTuple]:
+        """The latest DC tuple about the tuple rui, or None if its status never changed"""
+        latest = self.latest.get(rui)
+        return latest[1] if latest else None
+
+    def valid(self, tuples) -> set[RtTuple]:
+        """Returns the currently valid tuples among tuples"""
+        if not self.invalid:
+            return set(tuples)
+        return {tup for tup in tuples if tup.rui not in self.invalid}
+
+    def valid_at(self, tuples, seq: int) -> set[RtTuple]:
+        """Returns the tuples among tuples that were valid once the commit with sequence number seq was applied"""
+        if not self.history:
+            return set(tuples)
+        return {tup for tup in tuples if self.is_valid_at(tup.rui, seq)}
@@ -1,7 +1,11 @@
 import enum
+import struct
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, asdict, fields
+from functools import cache
+from hashlib import blake2b
 from typing import ClassVar, override
+from uuid import UUID
 
 from rt_core_v2.ids_codes.rui import Rui, UUI, ID_Rui, ISO_Rui, TempRef, Relationship
 from rt_core_v2.metadata import TupleEventType, ValueEnum, RtChangeReason
@@ -100,6 +104,57 @@ class AttributesVisitor(RtTupleVisitor):
         return output
 
 
+def _canonical_text(tag: bytes, text: str) -> bytes:
+    encoded = text.encode("utf-8")
+    return tag + struct.pack("<I", len(encoded)) + encoded
+
+
+def canonical_component(value) -> bytes:
+    """Encodes a tuple component so that equal components, and only equal components, share an encoding"""
+    if value is None:
+        return b"N"
+    if isinstance(value, bool):
+        return b"b1" if value else b"b0"
+    if isinstance(value, (int, float)):
+        return b"f" + struct.pack("<d", value)
+    if isinstance(value, ID_Rui):
+        return b"I" + value.uuid.bytes
+    if isinstance(value, ISO_Rui):
+        return b"S" + canonical_component(value.date)
+    if isinstance(value, TempRef):
+        return b"T" + canonical_component(value.ref)
+    if isinstance(value, UUI):
+        return _canonical_text(b"U", str(value.identifier))
+    if isinstance(value, Relationship):
+        return _canonical_text(b"R", str(value.uri))
+    if isinstance(value, UUID):
+        return b"u" + value.bytes
+    if isinstance(value, datetime):
+        # Aware datetimes are equal across time zones, so they are encoded in UTC
+        return _canonical_text(b"D", value.astimezone(timezone.utc).isoformat() if value.tzinfo else value.isoformat())
+    if isinstance(value, enum.Enum):
+        return _canonical_text(b"E", f"{type(value).__name__}.{value.name}")
+    if isinstance(value, str):
+        return _canonical_text(b"s", value)
+    if isinstance(value, bytes):
+        return b"B" + struct.pack("<I", len(value)) + value
+    if isinstance(value, list):
+        return b"L" + struct.pack("<I", len(value)) + b"".join(canonical_component(entry) for entry in value)
+    return _canonical_text(b"?", repr(value))
+
+
+@cache
+def component_names(tuple_class) -> tuple[str, ...]:
+    """The names of the components of a tuple class in field order"""
+    return tuple(entry.name for entry in fields(tuple_class))
+
+
+@cache
+def list_component_names(tuple_class) -> tuple[str, ...]:
+    """The names of the list components of a tuple class, such as p and replacements"""
+    return tuple(entry.name for entry in fields(tuple_class) if getattr(entry.type, "__origin__", None) is list)
+
+
 @dataclass
 class RtTuple(ABC):
     """Abstract Referent Tracking tuple that contains the information that all referent tracking tuples contain
@@ -113,10 +168,45 @@ class RtTuple(ABC):
     rui: ID_Rui = field(default_factory=ID_Rui)
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, type(self)):
             return False
-        get_attr = AttributesVisitor()
-        return self.accept(get_attr) == other.accept(get_attr)
+        return self.fingerprint == other.fingerprint
+
+    def __setattr__(self, name, value):
+        # A reassigned component makes the cached fingerprint stale
+        self.__dict__.pop("_fingerprint", None)
+        object.__setattr__(self, name, value)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop("_fingerprint", None)
+        return state
+
+    @property
+    def fingerprint(self) -> bytes:
+        """128 bit BLAKE2b digest of the tuple type and the canonical encoding of every component
+
+        The digest is cached with a copy of every list component, as lists can be changed in place without
+        going through __setattr__, and is recomputed when a list no longer equals its copy.
+        """
+        cached = self.__dict__.get("_fingerprint")
+        if cached is not None:
+            fingerprint, copies = cached
+            if not copies or all(getattr(self, name) == copy for name, copy in copies):
+                return fingerprint
+        digest = blake2b(str(self.tuple_type).encode("utf-8"), digest_size=16)
+        for name in component_names(type(self)):
+            digest.update(canonical_component(getattr(self, name)))
+        fingerprint = digest.digest()
+        copies = tuple((name, list(getattr(self, name))) for name in list_component_names(type(self)))
+        self.__dict__["_fingerprint"] = (fingerprint, copies)
+        return fingerprint
+
+    def __hash__(self):
+        # Equal tuples always share a rui, so the rui alone is a valid hash
+        return hash(self.rui)
 
     def accept(self, visitor: RtTupleVisitor):
         return visitor.visit(self)
@@ -0,0 +1,93 @@
+import pickle
+import threading
+
+from rt_core_v2.ids_codes.rui import ID_Rui
+from rt_core_v2.ids_codes.allocator import RuiAllocator
+from rt_core_v2.rttuple import NtoRTuple, RuiStatus, TupleType
+from rt_core_v2.persist.rts_store import TupleQuery
+from rt_core_v2.persist.memory_store import InMemoryRtStore
+from rt_core_v2.persist.sqlite_store import SqliteRtStore
+
+
+def test_allocated_ruis_are_monotonic_uuid7s():
+    allocator = RuiAllocator(block_bits=4)
+    ruis = allocator.allocate_many(100)
+    assert all(rui.uuid.version == 7 for rui in ruis)
+    assert [rui.uuid.int for rui in ruis] == sorted(rui.uuid.int for rui in ruis)
+    assert len(set(ruis)) == 100
+    assert ruis[0] == ID_Rui(ruis[0].uuid)
+
+
+def test_threads_allocate_without_collisions():
+    allocator = RuiAllocator(block_bits=6)
+    allocated = [[] for _ in range(8)]
+
+    def work(index):
+        allocated[index] = allocator.allocate_many(1000)
+
+    threads = [threading.Thread(target=work, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({rui for ruis in allocated for rui in ruis}) == 8000
+
+
+def test_reserved_blocks_are_recorded_and_released():
+    store = InMemoryRtStore()
+    allocator = RuiAllocator(block_bits=4, store=store)
+    block = allocator.reserve_block()
+    # Blocks travel to worker processes by pickling
+    worker_block = pickle.loads(pickle.dumps(block))
+    used = [worker_block.allocate() for _ in range(5)]
+    assert allocator.status(used[0]) is RuiStatus.reserved
+    # The first rui of the block names it and is not handed out
+    reservations = store.run_query(TupleQuery(types={TupleType.AN}))
+    assert [(tup.ruin.uuid.int, tup.ar) for tup in reservations] == [(used[0].uuid.int - 1, RuiStatus.reserved)]
+
+    allocator.release(worker_block)
+    assert allocator.status(used[4]) is None
+    # The unused remainder is recorded and reused by the next block
+    reused = allocator.allocate()
+    assert reused.uuid.int == used[4].uuid.int + 2
+    recorded = {(tup.ruin.uuid.int, tup.ar) for tup in store.run_query(TupleQuery(types={TupleType.AN}))}
+    assert recorded == {(used[0].uuid.int - 1, RuiStatus.reserved), (used[4].uuid.int + 1, RuiStatus.reserved), (used[4].uuid.int + 1, RuiStatus.assigned)}
+    assert allocator.status(ID_Rui()) is None
+
+
+def test_reservations_are_committed_apart_from_the_caller():
+    store = InMemoryRtStore()
+    allocator = RuiAllocator(block_bits=4, store=store)
+    pending = NtoRTuple()
+    store.save_tuple(pending)
+    allocator.allocate()
+    store.rollback()
+    assert store.get_tuple(pending.rui) is None
+    assert len(store.run_query(TupleQuery(types={TupleType.AN}))) == 1
+
+
+def test_released_remainders_are_reclaimed_after_reopening(tmp_path):
+    path = str(tmp_path / "rts.db")
+    store = SqliteRtStore(path)
+    block = store.allocator.reserve_block()
+    used = [block.allocate() for _ in range(3)]
+    store.allocator.release(block)
+    store.shut_down()
+
+    store = SqliteRtStore(path)
+    reclaimed = store.get_available_rui()
+    assert reclaimed in block and reclaimed.uuid.int == used[-1].uuid.int + 2
+    store.shut_down()
+
+    # The reclaimed remainder is recorded as taken, so it is not handed out again
+    store = SqliteRtStore(path)
+    assert store.get_available_rui() not in block
+    store.shut_down()
+
+
+def test_store_hands_out_allocated_ruis():
+    store = InMemoryRtStore()
+    first, second = store.get_available_rui(), store.get_available_rui()
+    assert first != second and first.uuid.version == 7
+    assert store.allocator.status(second) is RuiStatus.assigned
+    assert len(store.run_query(TupleQuery(types={TupleType.AN}))) == 1
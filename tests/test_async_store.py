@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+
+from rt_core_v2.ids_codes.rui import ID_Rui
+from rt_core_v2.rttuple import DITuple, NtoRTuple, TupleType
+from rt_core_v2.persist.rts_store import TupleQuery
+from rt_core_v2.persist.memory_store import InMemoryRtStore
+from rt_core_v2.persist.async_store import BatchingAsyncRtStore
+
+
+class CountingStore(InMemoryRtStore):
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+
+    def get_tuple(self, rui):
+        self.lookups += 1
+        return super().get_tuple(rui)
+
+
+async def save_all(store, tuples):
+    for tup in tuples:
+        await store.save_tuple(tup)
+        await store.save_tuple(DITuple(ruit=tup.rui))
+    await store.commit()
+
+
+def test_concurrent_lookups_are_batched():
+    backend = CountingStore()
+    store = BatchingAsyncRtStore(backend)
+    batches = []
+    run_batch = store._run_batch
+    store._run_batch = lambda requests: batches.append(len(requests)) or run_batch(requests)
+    tuples = [NtoRTuple(ruin=ID_Rui()) for _ in range(10)]
+
+    async def scenario():
+        await save_all(store, tuples)
+        batches.clear()
+        found = await asyncio.gather(*[store.get_tuple(tup.rui) for tup in tuples + tuples])
+        await store.shut_down()
+        return found
+
+    found = asyncio.run(scenario())
+    assert found == tuples + tuples
+    assert batches[0] == 20
+    # Repeated ruis in one batch reach the store once
+    assert backend.lookups == 10
+
+
+def test_errors_reach_their_request_only():
+    class FailingStore(InMemoryRtStore):
+        def get_by_referent(self, rui):
+            raise KeyError(rui)
+
+    store = BatchingAsyncRtStore(FailingStore())
+    tup = NtoRTuple()
+
+    async def scenario():
+        await save_all(store, [tup])
+        missing, found = await asyncio.gather(store.get_by_referent(tup.ruin), store.get_tuple(tup.rui), return_exceptions=True)
+        await store.shut_down()
+        return missing, found
+
+    missing, found = asyncio.run(scenario())
+    assert isinstance(missing, KeyError)
+    assert found == tup
+
+
+def test_run_query_streams_results():
+    first_received = threading.Event()
+
+    class SlowStore(InMemoryRtStore):
+        def run_query(self, query):
+            if query.types == {TupleType.NtoR}:
+                # Only returns once the tuples of the earlier type reached the consumer
+                first_received.wait(5)
+            return super().run_query(query)
+
+    store = BatchingAsyncRtStore(SlowStore(), chunk_size=3)
+    patient = ID_Rui()
+    tuples = [NtoRTuple(ruin=patient) for _ in range(7)]
+
+    async def scenario():
+        await save_all(store, tuples)
+        found = []
+        async for tup in store.run_query(TupleQuery(types={TupleType.DI, TupleType.NtoR})):
+            found.append(tup)
+            first_received.set()
+        referent = await store.get_by_referent(patient)
+        await store.shut_down()
+        return found, referent
+
+    started = time.monotonic()
+    found, referent = asyncio.run(scenario())
+    assert time.monotonic() - started < 4
+    assert len(found) == 14 and set(tuples) <= set(found)
+    assert set(tuples) <= referent
+
+
+def test_tasks_have_their_own_write_buffers():
+    class CountingCommits(InMemoryRtStore):
+        commits = 0
+
+        def commit(self):
+            self.commits += 1
+            super().commit()
+
+    backend = CountingCommits()
+    store = BatchingAsyncRtStore(backend)
+    kept, dropped = NtoRTuple(), NtoRTuple()
+    grouped = [NtoRTuple() for _ in range(5)]
+
+    async def keep():
+        await store.save_tuple(kept)
+        await asyncio.sleep(0)
+        await store.commit()
+
+    async def drop():
+        await store.save_tuple(dropped)
+        await store.rollback()
+        await store.commit()
+
+    async def scenario():
+        await asyncio.gather(keep(), drop())
+        commits = backend.commits
+        await asyncio.gather(*[save_all(store, [tup]) for tup in grouped])
+        found = await asyncio.gather(*[store.get_tuple(tup.rui) for tup in [kept, dropped] + grouped])
+        await store.shut_down()
+        return commits, found
+
+    commits, found = asyncio.run(scenario())
+    assert commits == 1
+    assert found == [kept, None] + grouped
+    # The concurrent commits of the five tasks were written as one commit of the store
+    assert backend.commits == 2
+
+
+def test_rollback_discards_saved_tuples():
+    store = BatchingAsyncRtStore(InMemoryRtStore())
+    tup = NtoRTuple()
+
+    async def scenario():
+        await store.save_tuple(tup)
+        await store.rollback()
+        await store.commit()
+        found = await store.get_tuple(tup.rui)
+        await store.shut_down()
+        return found
+
+    assert asyncio.run(scenario()) is None
@@ -0,0 +1,80 @@
+import pytest
+from datetime import datetime, timezone, timedelta
+
+np = pytest.importorskip("numpy")
+
+from rt_core_v2.ids_codes.rui import ID_Rui, ISO_Rui, UUI, Relationship
+from rt_core_v2.rttuple import DCTuple, DITuple, FTuple, NtoNTuple, NtoRTuple, TupleType, type_to_class
+from rt_core_v2.batch import TupleBatch, DictionaryColumn, ListColumn, batches_by_type, rui_pairs
+
+
+def test_batch_round_trip_for_every_tuple_type():
+    for tuple_class in type_to_class.values():
+        tuples = [tuple_class() for _ in range(3)]
+        batch = TupleBatch.from_tuples(tuples)
+        assert len(batch) == 3
+        assert batch.to_tuples() == tuples
+
+
+def test_batch_column_representations():
+    human = UUI("http://purl.obolibrary.org/obo/NCBITaxon_9606")
+    tuples = [NtoRTuple(ruir=human, polarity=index % 2 == 0) for index in range(4)]
+    batch = TupleBatch.from_tuples(tuples)
+    assert batch["ruin"].shape == (4, 16) and batch["ruin"].dtype == np.uint8
+    assert batch["polarity"].dtype == bool
+    assert isinstance(batch["ruir"], DictionaryColumn) and batch["ruir"].values == [human]
+    assert batch["ruir"].codes.dtype == np.int32
+    high, low = rui_pairs(batch["ruin"])
+    assert (int(high[0]) << 64 | int(low[0])) == tuples[0].ruin.uuid.int
+
+    di = TupleBatch.from_tuples([DITuple()])
+    assert di["t"].dtype == np.int64
+    assert TupleBatch.from_tuples([FTuple(C=0.5)])["C"].dtype == np.float64
+
+
+def test_batch_filters_and_joins():
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    inserted = [DITuple(t=start + timedelta(days=day)) for day in range(10)]
+    batch = TupleBatch.from_tuples(inserted)
+    recent = batch.filter(batch.between("t", begin=start + timedelta(days=7)))
+    assert recent.to_tuples() == inserted[7:]
+    assert batch.filter(batch.equals("ruit", inserted[2].ruit)).to_tuples() == [inserted[2]]
+
+    confidences = TupleBatch.from_tuples([FTuple(ruitn=tup.ruit, C=0.1 * day) for day, tup in enumerate(inserted[:4])])
+    joined = batch.filter(batch.isin("ruit", confidences["ruitn"]) & (batch["t"] > batch["t"][0]))
+    assert joined.to_tuples() == inserted[1:4]
+
+
+def test_batch_list_columns():
+    patient, hospital = ID_Rui(), ID_Rui()
+    located = Relationship("http://example.org/locatedIn")
+    tuples = [NtoNTuple(r=located, p=[patient, hospital]), NtoNTuple(r=located, p=[ID_Rui()]), NtoNTuple(r=located, p=[hospital])]
+    batch = TupleBatch.from_tuples(tuples)
+    assert isinstance(batch["p"], ListColumn)
+    assert batch["p"].offsets.tolist() == [0, 2, 3, 4]
+    assert batch.filter(batch.contains("p", hospital)).to_tuples() == [tuples[0], tuples[2]]
+    assert batch.filter(np.array([2, 0])).to_tuples() == [tuples[2], tuples[0]]
+
+    mixed = [NtoNTuple(p=[patient, ISO_Rui(datetime(2024, 5, 1, tzinfo=timezone.utc))]), NtoNTuple(p=[])]
+    assert TupleBatch.from_tuples(mixed).to_tuples() == mixed
+    replaced = [DCTuple(replacements=[patient]), DCTuple()]
+    assert TupleBatch.from_tuples(replaced).to_tuples() == replaced
+
+
+def test_batches_by_type_and_validation():
+    tuples = [DITuple(), NtoRTuple(), DITuple()]
+    batches = batches_by_type(tuples)
+    assert set(batches) == {TupleType.DI, TupleType.NtoR}
+    assert len(batches[TupleType.DI]) == 2
+    with pytest.raises(ValueError):
+        TupleBatch.from_tuples(tuples)
+    assert len(TupleBatch.from_tuples([], TupleType.F)) == 0
+
+
+def test_batch_keeps_naive_timestamps_naive():
+    naive, aware = datetime(2024, 5, 1, 12), datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+    batch = TupleBatch.from_tuples([DITuple(t=naive), DITuple(t=aware)])
+    assert batch.equals("t", naive).tolist() == [True, True]
+    decoded = batch.filter(np.array([1, 0])).to_tuples()
+    assert decoded[0].t == aware and decoded[0].t.tzinfo is timezone.utc
+    assert decoded[1].t == naive and decoded[1].t.tzinfo is None
@@ -0,0 +1,47 @@
+import pytest
+from io import BytesIO
+from datetime import datetime, timezone
+
+from rt_core_v2.ids_codes.rui import ID_Rui, ISO_Rui, TempRef, UUI, Relationship
+from rt_core_v2.rttuple import ANTuple, DCTuple, DITuple, FTuple, NtoDETuple, NtoNTuple, RuiStatus, PorType, type_to_class
+from rt_core_v2.metadata import TupleEventType, RtChangeReason
+from rt_core_v2.formatter import RtTupleFormat, format_rttuple, write_tuples_stream
+from rt_core_v2.binary import BinaryDecodeError, binary_to_rttuple, iter_binary_tuples
+
+
+def test_binary_round_trip_for_every_tuple_type():
+    for tuple_class in type_to_class.values():
+        tup = tuple_class()
+        record = format_rttuple(tup, RtTupleFormat.binary_format)
+        assert isinstance(record, bytes)
+        assert binary_to_rttuple(record) == tup
+        assert len(record) < len(format_rttuple(tup)) / 2
+
+
+def test_binary_round_trip_of_varied_components():
+    iso = ISO_Rui(datetime(2024, 5, 1, 8, 30, tzinfo=timezone.utc))
+    tuples = [
+        ANTuple(ar=RuiStatus.reserved, unique=PorType.non_singular),
+        DITuple(t=datetime(2023, 2, 1, 9, 15, 0, 123), ta=TempRef(iso), event_reason=RtChangeReason.PM2),
+        DCTuple(event=TupleEventType.REVALIDATE, replacements=[ID_Rui(), ID_Rui()]),
+        FTuple(C=0.25),
+        NtoNTuple(polarity=False, r=Relationship("http://example.org/rél"), p=[ID_Rui(), iso]),
+        NtoDETuple(data=bytes(range(256)), ruidt=UUI("http://www.w3.org/2001/XMLSchema#base64Binary")),
+    ]
+    for tup in tuples:
+        assert binary_to_rttuple(format_rttuple(tup, RtTupleFormat.binary_format)) == tup
+    # Raw bytes are stored as is, without base64
+    assert len(format_rttuple(tuples[-1], RtTupleFormat.binary_format)) < 256 + 100
+
+
+def test_binary_stream_and_errors():
+    tuples = [DITuple() for _ in range(3)] + [NtoNTuple(p=[ID_Rui()])]
+    stream = BytesIO()
+    assert write_tuples_stream(tuples, stream, RtTupleFormat.binary_format) == 4
+    stream.seek(0)
+    assert list(iter_binary_tuples(stream)) == tuples
+
+    record = format_rttuple(FTuple(), RtTupleFormat.binary_format)
+    for corrupt in (record[:-3], record + b"\x00", b"\xff" + record[1:], b""):
+        with pytest.raises(BinaryDecodeError):
+            binary_to_rttuple(corrupt)
@@ -0,0 +1,109 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from rt_core_v2.ids_codes.rui import ID_Rui, UUI
+from rt_core_v2.rttuple import DITuple, NtoRTuple, TupleType
+from rt_core_v2.formatter import RtTupleFormat, write_tuples_stream
+from rt_core_v2.persist.memory_store import InMemoryRtStore
+from rt_core_v2.persist.sqlite_store import SqliteRtStore
+from rt_core_v2.persist.bulk_load import bulk_load, json_chunks, binary_chunks
+
+
+def make_dump(path, format, count=200):
+    tuples = []
+    for _ in range(count):
+        ntor = NtoRTuple(ruin=ID_Rui(), ruir=UUI("http://purl.obolibrary.org/obo/NCBITaxon_9606"))
+        tuples += [ntor, DITuple(ruit=ntor.rui)]
+    with open(path, "wb") as dump:
+        write_tuples_stream(tuples, dump, format)
+    return tuples
+
+
+def test_chunks_end_on_record_boundaries(tmp_path):
+    for format, split in ((RtTupleFormat.json_format, json_chunks), (RtTupleFormat.binary_format, binary_chunks)):
+        path = tmp_path / f"dump-{format.name}"
+        make_dump(path, format)
+        chunks = split(path, 1000)
+        assert len(chunks) > 5
+        assert chunks[0][0] == 0 and chunks[-1][1] == path.stat().st_size
+        assert all(end == start for (_, end), (start, _) in zip(chunks, chunks[1:]))
+
+
+def test_bulk_load_with_process_pool(tmp_path):
+    path = tmp_path / "dump.jsonl"
+    tuples = make_dump(path, RtTupleFormat.json_format)
+    with open(path, "ab") as dump:
+        dump.write(b'{"rui": "broken"}\n')
+    store = SqliteRtStore(str(tmp_path / "rts.db"))
+    assert bulk_load(str(path), store, workers=2, chunk_size=4096, batch_size=64) == len(tuples)
+    assert all(store.get_tuple(tup.rui) == tup for tup in tuples)
+
+
+def test_bulk_load_binary_dump(tmp_path):
+    path = tmp_path / "dump.bin"
+    tuples = make_dump(path, RtTupleFormat.binary_format)
+    store = SqliteRtStore()
+    with ThreadPoolExecutor(2) as executor:
+        assert bulk_load(str(path), store, RtTupleFormat.binary_format, chunk_size=2048, executor=executor) == len(tuples)
+    assert all(store.get_tuple(tup.rui) == tup for tup in tuples)
+
+    # Stores that cannot save encoded tuples are loaded by the calling process
+    store = InMemoryRtStore()
+    assert bulk_load(str(path), store, RtTupleFormat.binary_format, chunk_size=2048) == len(tuples)
+    assert set(store.tuples.values()) == set(tuples)
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 4, reason="needs a CPU per worker besides the writer")
+def test_workers_speed_up_loading(tmp_path):
+    path = tmp_path / "dump.jsonl"
+    tuples = make_dump(path, RtTupleFormat.json_format, count=20000)
+
+    class SerialStore(SqliteRtStore):
+        encode_tuples = None
+
+    elapsed = {}
+    for name, store, workers in (("serial", SerialStore(str(tmp_path / "serial.db")), None), ("parallel", SqliteRtStore(str(tmp_path / "parallel.db")), 3)):
+        start = time.perf_counter()
+        assert bulk_load(str(path), store, workers=workers, chunk_size=256 << 10) == len(tuples)
+        elapsed[name] = time.perf_counter() - start
+    assert elapsed["parallel"] < elapsed["serial"] / 1.5
+
+
+def test_commits_keep_a_tuple_with_its_dituple(tmp_path):
+    class BatchRecordingStore(InMemoryRtStore):
+        def __init__(self):
+            super().__init__()
+            self.batches = [[]]
+
+        def save_tuple(self, tup):
+            self.batches[-1].append(tup)
+            return super().save_tuple(tup)
+
+        def commit(self):
+            super().commit()
+            self.batches.append([])
+
+    path = tmp_path / "dump.jsonl"
+    tuples = make_dump(path, RtTupleFormat.json_format, count=20)
+    store = BatchRecordingStore()
+    assert bulk_load(str(path), store, chunk_size=1024, batch_size=3) == len(tuples)
+    batches = [batch for batch in store.batches if batch]
+    assert len(batches) == 10
+    assert all(len(batch) == 4 and isinstance(batch[-1], DITuple) for batch in batches)
+
+
+def test_sqlite_commits_keep_a_tuple_with_its_dituple(tmp_path):
+    path = tmp_path / "dump.jsonl"
+    tuples = make_dump(path, RtTupleFormat.json_format, count=20)
+    store = SqliteRtStore()
+    groups = []
+    write_group = store.committer.write_group
+    store.committer.write_group = lambda transactions: (groups.extend(transactions), write_group(transactions))
+    with ThreadPoolExecutor(2) as executor:
+        assert bulk_load(str(path), store, chunk_size=1024, batch_size=3, executor=executor) == len(tuples)
+    assert len(groups) == 10
+    assert all(len(group) == 4 and group[-1].tuple_type is TupleType.DI for group in groups)
+    assert all(store.get_tuple(tup.rui) == tup for tup in tuples)
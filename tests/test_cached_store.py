@@ -0,0 +1,94 @@
+from rt_core_v2.ids_codes.rui import ID_Rui, UUI
+from rt_core_v2.rttuple import DITuple, NtoRTuple
+from rt_core_v2.binary import rttuple_to_binary
+from rt_core_v2.persist.memory_store import InMemoryRtStore
+from rt_core_v2.persist.cached_store import CachingRtStore, LruCache
+
+human = UUI("http://purl.obolibrary.org/obo/NCBITaxon_9606")
+
+
+class CountingStore(InMemoryRtStore):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def get_by_referent(self, rui):
+        self.calls += 1
+        return super().get_by_referent(rui)
+
+
+def save(store, tup):
+    store.save_tuple(tup)
+    store.save_tuple(DITuple(ruit=tup.rui))
+    store.commit()
+
+
+def test_lru_cache_bounds():
+    cache = LruCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert (cache.hits, cache.misses, cache.evictions) == (3, 1, 1)
+
+    sized = LruCache(max_entries=10, max_bytes=10)
+    sized.put("a", 1, 6)
+    sized.put("b", 2, 6)
+    sized.put("c", 3, 11)
+    assert list(sized.entries) == ["b"] and sized.size == 6
+
+
+def test_lookups_are_cached_until_a_commit_mentions_the_referent():
+    backend = CountingStore()
+    store = CachingRtStore(backend)
+    patient, other = ID_Rui(), ID_Rui()
+    first = NtoRTuple(ruin=patient, ruir=human)
+    save(store, first)
+    save(store, NtoRTuple(ruin=other, ruir=human))
+
+    assert first in store.get_by_referent(patient)
+    assert first in store.get_by_referent(patient)
+    store.get_by_referent(other)
+    assert backend.calls == 2 and store.referents.hits == 1
+
+    second = NtoRTuple(ruin=patient, ruir=human)
+    store.save_tuple(second)
+    assert second not in store.get_by_referent(patient)
+    store.commit()
+    assert second in store.get_by_referent(patient)
+    store.get_by_referent(other)
+    assert backend.calls == 3
+
+    assert store.get_tuple(first.rui) == first and store.get_tuple(first.rui) == first
+    assert store.tuples.hits == 1 and store.tuples.misses == 1
+
+
+def test_lookup_overlapping_a_commit_is_not_cached():
+    patient = ID_Rui()
+    late = NtoRTuple(ruin=patient, ruir=human)
+
+    class RacingStore(InMemoryRtStore):
+        def get_by_referent(self, rui):
+            found = super().get_by_referent(rui)
+            if late.rui not in self.tuples:
+                save(store, late)
+            return found
+
+    store = CachingRtStore(RacingStore())
+    assert store.get_by_referent(patient) == set()
+    assert late in store.get_by_referent(patient)
+
+
+def test_byte_budget():
+    tuples = [NtoRTuple(ruin=ID_Rui(), ruir=human) for _ in range(4)]
+    budget = 4 * len(rttuple_to_binary(tuples[0]))
+    store = CachingRtStore(InMemoryRtStore(), max_bytes=budget)
+    for tup in tuples:
+        save(store, tup)
+        store.get_tuple(tup.rui)
+        store.get_by_referent(tup.ruin)
+    # The budget is shared by the two caches
+    assert len(store.tuples) == 2 and len(store.referents) == 2
+    assert store.tuples.size + store.referents.size <= budget
+    assert store.tuples.evictions == 2
@@ -0,0 +1,49 @@
+import pytest
+from dataclasses import FrozenInstanceError
+
+from rt_core_v2.ids_codes.rui import ID_Rui, TempRef, UUI, Relationship
+from rt_core_v2.rttuple import NtoNTuple, NtoRTuple, DITuple, type_to_class
+from rt_core_v2.formatter import format_rttuple
+from rt_core_v2.compact import type_to_compact_class, to_compact, from_compact, footprint_per_tuple
+from rt_core_v2.persist.memory_store import InMemoryRtStore
+
+
+def test_compact_round_trip_preserves_components_and_fingerprint():
+    for tuple_class in type_to_class.values():
+        tup = tuple_class()
+        compact = to_compact(tup)
+        assert not hasattr(compact, "__dict__")
+        assert compact.tuple_type is tup.tuple_type
+        assert compact.fingerprint == tup.fingerprint
+        assert from_compact(compact) == tup
+        assert format_rttuple(compact) == format_rttuple(tup)
+
+
+def test_compact_components_are_rebuilt_from_packed_uuids():
+    patient = ID_Rui()
+    nton = to_compact(NtoNTuple(r=Relationship("http://example.org/partOf"), p=[patient, ID_Rui()], tr=TempRef(patient)))
+    assert nton.p[0] == patient
+    assert nton.tr == TempRef(patient)
+    assert type_to_compact_class[nton.tuple_type](r=nton.r, p=nton.p, tr=nton.tr, rui=nton.rui) == nton
+
+
+def test_compact_tuples_are_frozen():
+    compact = to_compact(DITuple())
+    with pytest.raises(FrozenInstanceError):
+        compact.ruit = ID_Rui()
+    with pytest.raises(TypeError):
+        type_to_compact_class[compact.tuple_type](polarity=True)
+
+
+def test_stores_accept_compact_tuples():
+    patient = ID_Rui()
+    compact = to_compact(NtoRTuple(ruin=patient, ruir=UUI("http://purl.obolibrary.org/obo/NCBITaxon_9606")))
+    store = InMemoryRtStore()
+    store.save_tuple(compact)
+    store.commit()
+    assert store.get_by_referent(patient) == {compact}
+
+
+def test_compact_tuples_use_less_than_half_the_memory():
+    ntor_class = type_to_compact_class[NtoRTuple.tuple_type]
+    assert footprint_per_tuple(ntor_class, 2000) * 2 < footprint_per_tuple(NtoRTuple, 2000)
@@ -1,4 +1,4 @@
-from rt_core_v2.ids_codes.concept import Concept, Attribute
+from rt_core_v2.ids_codes.concept import Concept, Attribute, ConceptRegistry
 from rt_core_v2.ids_codes.rui import ID_Rui
 
 
@@ -74,3 +74,14 @@ class TestAttribute:
         a2 = Attribute("partOf", cs_rui_2)
         assert a1.r == a2.r
         assert a1.cs_rui != a2.cs_rui
+
+
+class TestConceptRegistry:
+    def test_load_code_system_in_one_pass(self):
+        cs_rui = ID_Rui()
+        registry = ConceptRegistry()
+        assert registry.load_code_system(cs_rui, {"E11": "Type 2 diabetes mellitus", "I10": "Essential hypertension"}) == 2
+        assert registry.get(cs_rui, "I10").name == "Essential hypertension"
+        assert registry.code_systems[cs_rui] == {"E11", "I10"}
+        assert registry.get(ID_Rui(), "I10") is None
+        assert registry.concept(ID_Rui(), "I10").name == ""
@@ -14,6 +14,7 @@ from rt_core_v2.factory import (
     component_to_string,
     insert_rttuple,
     rttuple_factory,
+    rttuple_batch_factory,
 )
 
 
@@ -108,3 +109,32 @@ class TestRttupleFactory:
         # Factory should handle TypeError and return None or a valid tuple with defaults
         # Based on the implementation, invalid args cause TypeError which returns None
         assert result is None or isinstance(result[0], ANTuple)
+
+
+class TestRttupleBatchFactory:
+    def test_batch_factory_shares_insertion_metadata(self):
+        author = ID_Rui()
+        rows = [{TupleComponents.ruitn: ID_Rui(), TupleComponents.C: 0.5} for _ in range(5)]
+        rows.append({"ruitn": ID_Rui(), "C": 0.9})
+
+        concrete_tuples, meta_tuples = rttuple_batch_factory(rows, TupleType.F, author)
+
+        assert [tup.C for tup in concrete_tuples] == [0.5] * 5 + [0.9]
+        assert [meta.ruit for meta in meta_tuples] == [tup.rui for tup in concrete_tuples]
+        assert {meta.ruia for meta in meta_tuples} == {author}
+        assert {meta.ruid for meta in meta_tuples} == {author}
+        assert len({meta.t for meta in meta_tuples}) == 1
+        assert len({meta.ta for meta in meta_tuples}) == 1
+
+    def test_batch_factory_rejects_unknown_components_and_meta_types(self):
+        with pytest.raises(ValueError, match="ruin"):
+            rttuple_batch_factory([{TupleComponents.ruin: ID_Rui()}], TupleType.F, ID_Rui())
+        with pytest.raises(ValueError):
+            rttuple_batch_factory([{}], TupleType.DI, ID_Rui())
+
+    def test_batch_factory_returns_tuple_batches(self):
+        pytest.importorskip("numpy")
+        rows = [{TupleComponents.ruin: ID_Rui()} for _ in range(3)]
+        concrete_batch, meta_batch = rttuple_batch_factory(rows, TupleType.AN, ID_Rui(), as_batch=True)
+        assert len(concrete_batch) == len(meta_batch) == 3
+        assert concrete_batch.tuple_type is TupleType.AN and meta_batch.tuple_type is TupleType.DI
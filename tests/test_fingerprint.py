@@ -0,0 +1,48 @@
+import copy
+from datetime import datetime, timezone, timedelta
+
+from rt_core_v2.ids_codes.rui import ID_Rui, TempRef, Relationship
+from rt_core_v2.rttuple import ANTuple, DITuple, NtoNTuple, NtoDETuple, FTuple
+from rt_core_v2.formatter import format_rttuple, json_to_rttuple
+from rt_core_v2.compact import to_compact
+
+
+def test_fingerprint_is_stable():
+    nton = NtoNTuple(r=Relationship("http://example.org/partOf"), p=[ID_Rui(), ID_Rui()])
+    assert len(nton.fingerprint) == 16
+    assert json_to_rttuple(format_rttuple(nton)).fingerprint == nton.fingerprint
+    compact = to_compact(nton)
+    assert compact.fingerprint is compact.fingerprint
+    assert compact.fingerprint == nton.fingerprint
+
+
+def test_fingerprint_follows_modified_components():
+    a = NtoNTuple(r=Relationship("http://example.org/partOf"), p=[ID_Rui()])
+    b = copy.deepcopy(a)
+    assert a == b
+    # The fingerprint is cached until a component changes, in place or by assignment
+    assert b.fingerprint is b.fingerprint
+    b.p.append(ID_Rui())
+    assert a != b and a.fingerprint != b.fingerprint
+    b.p.pop()
+    assert a == b
+    b.r = Relationship("http://example.org/hasPart")
+    assert a != b
+
+
+def test_equal_tuples_share_fingerprint():
+    rui, ruit, ruid, ruia, ta = ID_Rui(), ID_Rui(), ID_Rui(), ID_Rui(), TempRef()
+    t = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+    utc = DITuple(rui=rui, ruit=ruit, ruid=ruid, ruia=ruia, ta=ta, t=t)
+    shifted = DITuple(rui=rui, ruit=ruit, ruid=ruid, ruia=ruia, ta=ta, t=t.astimezone(timezone(timedelta(hours=-5))))
+    assert utc == shifted
+    assert utc.fingerprint == shifted.fingerprint
+    assert FTuple(rui=rui, ruitn=ruit, C=1) == FTuple(rui=rui, ruitn=ruit, C=1.0)
+
+
+def test_different_tuples_differ():
+    rui = ID_Rui()
+    assert NtoDETuple(rui=rui, data=b"ab") != NtoDETuple(rui=rui, data=b"a")
+    assert NtoNTuple(rui=rui, p=[]) != NtoNTuple(rui=rui, p=[ID_Rui()])
+    assert ANTuple(rui=rui) != ANTuple(rui=rui, ruin=ID_Rui())
+    assert len({ANTuple().fingerprint for _ in range(100)}) == 100
@@ -1,6 +1,12 @@
+import base64
 import json
+import logging
+from datetime import datetime, timezone
+from io import BytesIO, StringIO
 
-from rt_core_v2.ids_codes.rui import Rui, ID_Rui, TempRef, Relationship, UUI
+import pytest
+
+from rt_core_v2.ids_codes.rui import Rui, ID_Rui, ISO_Rui, TempRef, Relationship, UUI
 from rt_core_v2.rttuple import (
     ANTuple,
     ARTuple,
@@ -13,11 +19,10 @@ from rt_core_v2.rttuple import (
     NtoDETuple,
     NtoLackRTuple,
     AttributesVisitor,
+    type_to_class,
 )
-from rt_core_v2.formatter import format_rttuple, json_to_rttuple
+from rt_core_v2.formatter import format_rttuple, json_to_rttuple, iter_tuples, write_tuples_stream, RtTupleJSONEncoder, decode_rttuple, TupleDecodeError
 from rt_core_v2.metadata import TupleEventType, RtChangeReason
-import base64
-from datetime import datetime, timezone
 
 def ordered(obj):
     if isinstance(obj, dict):
@@ -238,3 +243,52 @@ def test_ntolackr_json():
     print(f"Recreated NtolackrTuple:  {recreated_ntolackr.accept(get_attributes)}")
 
     assert ntolackr == recreated_ntolackr
+
+
+def test_json_lines_stream_round_trip():
+    tuples = [NtoRTuple(rui=ID_Rui(), r=relation, ruin=ruin, ruir=ruir, tr=time_1) for _ in range(5)]
+    tuples += [DITuple(ruit=tup.rui, ruid=ruid, t=t, ruia=ruia, ta=time_1) for tup in tuples]
+
+    text = StringIO()
+    assert write_tuples_stream(iter(tuples), text, chunk_size=3) == len(tuples)
+    assert text.getvalue().count("\n") == len(tuples)
+    text.seek(0)
+    assert list(iter_tuples(text)) == tuples
+
+    binary = BytesIO()
+    write_tuples_stream(tuples, binary)
+    binary.write(b"\n" + b'{"rui": "not-a-uuid-field", "bogus": 1}\n')
+    binary.seek(0)
+    assert list(iter_tuples(binary)) == tuples
+
+
+def test_compiled_encoders_match_generic_json():
+    tuples = [tuple_class() for tuple_class in type_to_class.values()]
+    tuples += [
+        NtoNTuple(p=[ruin, ISO_Rui(t)], r=Relationship('http://example.org/"quoted"/\u00fc')),
+        NtoCTuple(code="caf\u00e9\n"),
+        FTuple(C=float("nan")),
+        FTuple(C=1),
+        NtoDETuple(data="d\u00e4ta".encode("utf-8")),
+        DITuple(t=datetime(2020, 1, 1)),
+    ]
+    for tup in tuples:
+        assert format_rttuple(tup) == json.dumps(tup.accept(get_attributes), cls=RtTupleJSONEncoder)
+
+
+def test_decoder_parses_iso_datetimes_and_reports_errors(caplog):
+    whole_second = DITuple(ruit=ruit, ruid=ruid, t=datetime(2024, 3, 1, 12, tzinfo=timezone.utc), ruia=ruia, ta=time_1)
+    assert decode_rttuple(format_rttuple(whole_second)) == whole_second
+
+    with pytest.raises(TupleDecodeError) as error:
+        decode_rttuple(f'{{"rui": "{rui}", "tuple_type": "F", "ruitn": "{ruitn}", "C": "high"}}')
+    assert error.value.component == "C" and error.value.tuple_type.value == "F"
+    with pytest.raises(TupleDecodeError) as error:
+        decode_rttuple(f'{{"rui": "{rui}", "tuple_type": "F", "ruin": "{ruin}"}}')
+    assert error.value.component == "ruin"
+    with pytest.raises(TupleDecodeError):
+        decode_rttuple('{"rui": "x", "tuple_type": "XY"}')
+
+    with caplog.at_level(logging.WARNING, logger="rt_core_v2.formatter"):
+        assert json_to_rttuple("not json") is None
+    assert "Invalid rttuple-json" in caplog.text
@@ -0,0 +1,152 @@
+import os
+import threading
+from datetime import datetime, timezone
+
+from rt_core_v2.ids_codes.rui import ID_Rui, UUI, Relationship
+from rt_core_v2.rttuple import ANTuple, DCTuple, DITuple, NtoDETuple, NtoNTuple, NtoRTuple, TupleType
+from rt_core_v2.formatter import format_rttuple
+from rt_core_v2.metadata import TupleEventType
+from rt_core_v2.persist.rts_store import TupleQuery
+from rt_core_v2.persist.log_store import LogRtStore, OffsetIndex, rui_key
+
+patient = ID_Rui()
+human = UUI("http://purl.obolibrary.org/obo/NCBITaxon_9606")
+
+
+def test_committed_tuples_survive_reopen(tmp_path):
+    store = LogRtStore(str(tmp_path))
+    tuples = [ANTuple(ruin=patient), NtoRTuple(ruin=patient, ruir=human), DITuple(ruit=patient)]
+    for tup in tuples:
+        store.save_tuple(tup)
+    store.commit()
+    uncommitted = ANTuple()
+    store.save_tuple(uncommitted)
+    store.shut_down()
+
+    store = LogRtStore(str(tmp_path))
+    for tup in tuples:
+        assert store.get_tuple(tup.rui) == tup
+    assert store.get_tuple(uncommitted.rui) is None
+    assert store.get_by_referent(patient) == set(tuples)
+    assert store.run_query(TupleQuery(types={TupleType.NtoR})) == {tuples[1]}
+    store.shut_down()
+
+
+def test_segments_roll_over(tmp_path):
+    store = LogRtStore(str(tmp_path), segment_size=512)
+    tuples = [ANTuple() for _ in range(20)]
+    for tup in tuples:
+        store.save_tuple(tup)
+    store.commit()
+
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("segment-")]) > 1
+    assert all(store.get_tuple(tup.rui) == tup for tup in tuples)
+    store.shut_down()
+
+
+def test_recovery_indexes_unindexed_records_and_drops_torn_tail(tmp_path):
+    store = LogRtStore(str(tmp_path))
+    store.shut_down()
+    appended = ANTuple()
+    with open(tmp_path / "segment-000001.log", "ab") as segment:
+        segment.write((format_rttuple(appended) + "\n").encode("utf-8"))
+        segment.write(b'{"rui": "torn')
+
+    store = LogRtStore(str(tmp_path))
+    assert store.get_tuple(appended.rui) == appended
+    assert list(store.scan()) == [appended]
+    store.shut_down()
+
+
+def test_offset_index_grows(tmp_path):
+    index = OffsetIndex(str(tmp_path / "index.bin"), capacity=4)
+    keys = [rui_key(ID_Rui()) for _ in range(100)]
+    for position, key in enumerate(keys):
+        index.put(key, 1, position, 10)
+
+    assert index.capacity >= 200
+    assert all(index.get(key) == (1, position, 10) for position, key in enumerate(keys))
+    assert index.get(rui_key(ID_Rui())) is None
+    index.close()
+
+
+def test_lookups_scan_the_log_once(tmp_path):
+    author = ID_Rui()
+    mrn_type = UUI("http://example.org/medical_record_number")
+    mrn = ID_Rui()
+    patient_type = NtoRTuple(ruin=patient, ruir=human)
+    link = NtoNTuple(r=Relationship("http://purl.obolibrary.org/obo/IAO_0000219"), p=[mrn, patient])
+    tuples = [patient_type, NtoRTuple(ruin=mrn, ruir=mrn_type), NtoDETuple(ruin=mrn, data=b"MRN-0042"), link]
+    inserted = DITuple(ruit=patient_type.rui, ruia=author)
+    store = LogRtStore(str(tmp_path))
+    for tup in tuples + [inserted]:
+        store.save_tuple(tup)
+    store.commit()
+
+    assert store.get_by_referent(patient) == {patient_type, link}
+    assert store.get_by_author(author) == {inserted, patient_type}
+    assert store.get_referents_by_type_and_designator_type(human, mrn_type, "MRN-0042") == {patient_type}
+    assert store.get_referents_by_type_and_designator_type(human, mrn_type, "MRN-0043") == set()
+
+    store.save_tuple(DCTuple(ruit=link.rui, event=TupleEventType.INVALIDATE, t=datetime.now(timezone.utc)))
+    store.commit()
+    assert store.get_referents_by_type_and_designator_type(human, mrn_type, "MRN-0042") == set()
+    store.shut_down()
+
+
+def test_scans_stop_at_the_published_end(tmp_path):
+    store = LogRtStore(str(tmp_path))
+    committed = NtoRTuple(ruin=patient, ruir=human)
+    store.save_tuple(committed)
+    store.commit()
+    # A record written but not yet published, as while a group is being appended
+    store.writer.write((format_rttuple(NtoRTuple(ruin=patient, ruir=human)) + "\n").encode("utf-8"))
+    store.writer.flush()
+    assert list(store.scan()) == [committed]
+    assert store.get_by_referent(patient) == {committed}
+    store.shut_down()
+
+
+def test_growing_the_index_keeps_the_end_of_the_log(tmp_path):
+    index = OffsetIndex(str(tmp_path / "index.bin"), capacity=4)
+    index.mark_end(3, 1234)
+    for _ in range(10):
+        index.put(rui_key(ID_Rui()), 1, 0, 10)
+    assert (index.end_segment, index.end_offset) == (3, 1234)
+    index.close()
+    reopened = OffsetIndex(str(tmp_path / "index.bin"))
+    assert (reopened.end_segment, reopened.end_offset) == (3, 1234)
+    reopened.close()
+
+
+def test_slots_are_flushed_before_the_end_is_published(tmp_path):
+    store = LogRtStore(str(tmp_path))
+    calls = []
+    index = store.index
+    index.flush = lambda flush=index.flush: (calls.append("slots"), flush())
+    index.mark_end = lambda *end, mark_end=index.mark_end: (calls.append("end"), mark_end(*end))
+    index.flush_header = lambda flush_header=index.flush_header: (calls.append("header"), flush_header())
+    store.save_tuple(NtoRTuple(ruin=patient, ruir=human))
+    store.commit()
+    assert calls == ["slots", "end", "header"]
+    store.shut_down()
+
+
+def test_point_reads_from_many_threads(tmp_path):
+    store = LogRtStore(str(tmp_path), segment_size=2048)
+    tuples = [NtoRTuple(ruin=patient, ruir=human) for _ in range(100)]
+    for tup in tuples:
+        store.save_tuple(tup)
+        store.commit()
+    store.shut_down()
+
+    store = LogRtStore(str(tmp_path), segment_size=2048)
+    found = []
+    threads = [threading.Thread(target=lambda: found.extend(map(store.get_tuple, (tup.rui for tup in tuples)))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(found) == 800 and set(found) == set(tuples)
+    assert len(store.readers) == len(store.segments)
+    store.shut_down()
@@ -0,0 +1,327 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from rt_core_v2.ids_codes.rui import ID_Rui, ISO_Rui, TempRef, UUI, Relationship
+from rt_core_v2.rttuple import ANTuple, DITuple, DCTuple, NtoNTuple, NtoRTuple, NtoDETuple, NtoCTuple, TupleType, TupleComponents
+from rt_core_v2.metadata import TupleEventType
+from rt_core_v2.persist.rts_store import TupleQuery
+from rt_core_v2.persist.memory_store import InMemoryRtStore
+
+patient = ID_Rui()
+author = ID_Rui()
+human = UUI("http://purl.obolibrary.org/obo/NCBITaxon_9606")
+part_of = Relationship("http://purl.obolibrary.org/obo/BFO_0000050")
+
+
+def make_store(*tuples):
+    store = InMemoryRtStore()
+    for tup in tuples:
+        store.save_tuple(tup)
+    store.commit()
+    return store
+
+
+def test_saved_tuples_are_visible_only_after_commit():
+    store = InMemoryRtStore()
+    a = ANTuple(ruin=patient)
+    store.save_tuple(a)
+    assert store.get_tuple(a.rui) is None
+    store.commit()
+    assert store.get_tuple(ID_Rui(a.rui.uuid)) == a
+
+
+def test_rollback_discards_pending_tuples():
+    store = InMemoryRtStore()
+    a = ANTuple(ruin=patient)
+    store.save_tuple(a)
+    store.rollback()
+    store.commit()
+    assert store.get_tuple(a.rui) is None
+
+
+def test_get_by_referent_and_author():
+    a = ANTuple(ruin=patient)
+    di = DITuple(ruit=a.rui, ruia=author)
+    ntor = NtoRTuple(ruin=patient, ruir=human)
+    nton = NtoNTuple(r=part_of, p=[ID_Rui(), patient])
+    unrelated = ANTuple()
+    store = make_store(a, di, ntor, nton, unrelated)
+
+    assert store.get_by_referent(ID_Rui(patient.uuid)) == {a, ntor, nton}
+    assert store.get_by_author(author) == {a, di}
+
+
+def test_run_query_uses_components_and_residual_predicates():
+    ntor = NtoRTuple(ruin=patient, ruir=human, polarity=True)
+    negated = NtoRTuple(ruin=patient, ruir=human, polarity=False)
+    ntoc = NtoCTuple(ruin=patient, code="E11")
+    store = make_store(ntor, negated, ntoc, ANTuple(ruin=patient))
+
+    assert store.run_query(TupleQuery(nonrepeatable_rui=patient, repeatable_uui=human, polarity=False)) == {negated}
+    assert store.run_query(TupleQuery(concept_code="E11")) == {ntoc}
+    assert store.run_query(TupleQuery(types={TupleType.NtoR})) == {ntor, negated}
+    assert store.run_query(TupleQuery(rui=ntoc.rui)) == {ntoc}
+
+
+def test_run_query_time_range():
+    now = datetime.now(timezone.utc)
+    old = DITuple(t=now - timedelta(days=10))
+    recent = DITuple(t=now - timedelta(days=1))
+    store = make_store(old, recent, ANTuple())
+
+    query = TupleQuery(begin_timestamp=TempRef(ISO_Rui(now - timedelta(days=7))), end_timestamp=TempRef(ISO_Rui(now)))
+    assert store.run_query(query) == {recent}
+
+
+def test_get_referents_by_type_and_designator_type():
+    mrn_type = UUI("http://example.org/medical_record_number")
+    mrn = ID_Rui()
+    patient_type = NtoRTuple(ruin=patient, ruir=human)
+    store = make_store(
+        patient_type,
+        NtoRTuple(ruin=mrn, ruir=mrn_type),
+        NtoDETuple(ruin=mrn, data=b"MRN-0042"),
+        NtoNTuple(r=part_of, p=[mrn, patient]),
+    )
+
+    assert store.get_referents_by_type_and_designator_type(human, mrn_type, "MRN-0042") == {patient_type}
+    assert store.get_referents_by_type_and_designator_type(human, mrn_type, "MRN-0043") == set()
+
+
+def test_planner_starts_from_most_selective_index():
+    rare = Relationship("http://example.org/rare")
+    target = NtoNTuple(r=rare, p=[patient])
+    store = make_store(target, *(NtoRTuple(ruin=patient, ruir=human) for _ in range(5)), NtoCTuple(code="E11"))
+
+    plan = store.plan_query(TupleQuery(nonrepeatable_rui=patient, relationship=rare))
+    assert plan.steps == ["r", "ruin"]
+    assert plan.execute(store.tuples.get) == {target}
+
+    plan = store.plan_query(TupleQuery(concept_code="E11", polarity=True))
+    assert plan.types == {TupleType.NtoC}
+    assert plan.steps == ["code"]
+    assert len(plan.candidates) == 1
+
+
+def test_time_index_answers_ranges_in_time_order():
+    start = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    cohort = [NtoRTuple(ruin=ID_Rui(), ruir=human) for _ in range(6)]
+    inserted = [
+        DITuple(ruit=tup.rui, t=start + timedelta(days=day), ta=TempRef(ISO_Rui(start - timedelta(days=day))))
+        for day, tup in zip((5, 1, 3, 0, 4, 2), cohort)
+    ]
+    store = make_store(*cohort, *inserted[:3])
+    store.save_tuple(DCTuple(t=start + timedelta(days=2, hours=12)))
+    for tup in inserted[3:]:
+        store.save_tuple(tup)
+    store.commit()
+
+    last_week = store.get_by_time(start + timedelta(days=1), start + timedelta(days=3))
+    assert [tup.t.day for tup in last_week] == [2, 3, 3, 4]
+    assert store.get_inserted_between(start + timedelta(days=1), start + timedelta(days=3)) == [cohort[1], cohort[5], cohort[2]]
+    assert [tup.ta.ref.date.day for tup in store.get_by_time(end=start - timedelta(days=4), component=TupleComponents.ta)] == [27, 28]
+
+    plan = store.plan_query(TupleQuery(begin_timestamp=TempRef(ISO_Rui(start + timedelta(days=5)))))
+    assert plan.steps == ["t"]
+    assert plan.execute(store.tuples.get) == {inserted[0]}
+
+
+def test_adjacency_traversal_over_nton_tuples():
+    has_encounter = Relationship("http://example.org/hasEncounter")
+    has_specimen = Relationship("http://example.org/hasSpecimen")
+    has_result = Relationship("http://example.org/hasResult")
+    encounter, specimen, result, other = ID_Rui(), ID_Rui(), ID_Rui(), ID_Rui()
+    to_specimen = NtoNTuple(r=has_specimen, p=[encounter, specimen])
+    store = make_store(
+        NtoNTuple(r=has_encounter, p=[patient, encounter]),
+        to_specimen,
+        NtoNTuple(r=has_result, p=[specimen, result]),
+        NtoNTuple(r=part_of, p=[encounter, other]),
+        NtoNTuple(r=has_result, p=[patient, other], polarity=False),
+    )
+
+    assert store.follow_relationships(patient, [has_encounter, has_specimen, has_result]) == {result}
+    assert store.get_neighborhood(patient, 2) == {patient: 0, encounter: 1, specimen: 2, other: 2}
+    assert store.get_neighborhood(patient, 3, [has_encounter, has_specimen]) == {patient: 0, encounter: 1, specimen: 2}
+    path = store.get_path(patient, result, 3)
+    assert [step[0] for step in path] == [patient, encounter, specimen, result]
+    assert path[2][1] == to_specimen.rui
+    assert store.get_path(patient, result, 2) is None
+
+    store.save_tuple(DCTuple(ruit=to_specimen.rui))
+    store.commit()
+    assert store.follow_relationships(patient, [has_encounter, has_specimen, has_result]) == set()
+
+
+def test_designator_index_exact_and_prefix_lookup():
+    mrn_type = UUI("http://example.org/medical_record_number")
+    patients = [ID_Rui() for _ in range(3)]
+    tuples = []
+    for number, referent in zip(("MRN-0041", "MRN-0042", "MRN-1000"), patients):
+        mrn = ID_Rui()
+        tuples += [
+            NtoNTuple(r=part_of, p=[mrn, referent]),
+            NtoDETuple(ruin=mrn, data=number.encode("utf-8")),
+            NtoRTuple(ruin=mrn, ruir=mrn_type),
+            NtoRTuple(ruin=referent, ruir=human),
+        ]
+    # The referent's type arrives after its designator is complete
+    store = make_store(*tuples[:-1])
+    assert store.get_referents_by_type_and_designator_type(human, mrn_type, "MRN-1000") == set()
+    store = make_store(*tuples)
+
+    assert {tup.ruin for tup in store.get_referents_by_type_and_designator_type(human, mrn_type, "MRN-1000")} == {patients[2]}
+    found = store.get_referents_by_designator_prefix(human, mrn_type, "MRN-004")
+    assert list(found) == ["MRN-0041", "MRN-0042"]
+    assert {tup.ruin for tup in found["MRN-0042"]} == {patients[1]}
+    assert store.get_referents_by_designator_prefix(human, mrn_type, "X") == {}
+
+
+
+def test_designator_index_updates_a_hub_in_any_order():
+    mrn_type = UUI("http://example.org/medical_record_number")
+    hospital = ID_Rui()
+    store = make_store(NtoDETuple(ruin=hospital, data=b"General Hospital"))
+    # Texts of particulars with no type yet are kept as tuple ruis only
+    assert hospital not in store.designators.texts
+    mrns = [ID_Rui() for _ in range(200)]
+    for number, mrn in enumerate(mrns):
+        text = f"MRN-{number:04}".encode("utf-8")
+        first, *rest = [NtoNTuple(r=part_of, p=[mrn, hospital]), NtoDETuple(ruin=mrn, data=text), NtoRTuple(ruin=mrn, ruir=mrn_type)]
+        store.save_tuple(first)
+        store.commit()
+        for tup in rest[:: 1 if number % 2 else -1]:
+            store.save_tuple(tup)
+        store.commit()
+    store.save_tuple(NtoRTuple(ruin=hospital, ruir=human))
+    store.commit()
+
+    assert {tup.ruin for tup in store.get_referents_by_type_and_designator_type(human, mrn_type, "MRN-0123")} == {hospital}
+    assert len(store.get_referents_by_designator_prefix(human, mrn_type, "MRN-01")) == 100
+    assert list(store.designators.texts[hospital]) == ["General Hospital"]
+
+
+def test_designator_lookup_ignores_invalidated_links():
+    mrn_type = UUI("http://example.org/medical_record_number")
+    patient, mrn = ID_Rui(), ID_Rui()
+    link = NtoNTuple(r=part_of, p=[mrn, patient])
+    store = make_store(link, NtoDETuple(ruin=mrn, data=b"MRN-7"), NtoRTuple(ruin=mrn, ruir=mrn_type), NtoRTuple(ruin=patient, ruir=human))
+    before = store.snapshot()
+    assert len(store.get_referents_by_type_and_designator_type(human, mrn_type, "MRN-7")) == 1
+
+    store.save_tuple(DCTuple(ruit=link.rui, event=TupleEventType.INVALIDATE, t=datetime.now(timezone.utc)))
+    store.commit()
+    assert store.get_referents_by_type_and_designator_type(human, mrn_type, "MRN-7") == set()
+    assert store.get_referents_by_designator_prefix(human, mrn_type, "MRN") == {}
+    # A snapshot taken before the invalidation still resolves the link
+    assert len(before.get_referents_by_type_and_designator_type(human, mrn_type, "MRN-7")) == 1
+
+def test_concept_index_and_code_system_loading(tmp_path):
+    icd10 = UUI("http://hl7.org/fhir/sid/icd-10")
+    snomed = UUI("http://snomed.info/sct")
+    code_file = tmp_path / "icd10.tsv"
+    code_file.write_text("code\tname\nE11\tType 2 diabetes mellitus\nI10\tEssential hypertension\n", encoding="utf-8")
+    other = ID_Rui()
+    diabetic = NtoCTuple(ruics=icd10, ruin=patient, code="E11")
+    store = make_store(
+        diabetic,
+        NtoCTuple(ruics=icd10, ruin=other, code="I10"),
+        NtoCTuple(ruics=icd10, ruin=other, code="E11", polarity=False),
+        NtoCTuple(ruics=snomed, ruin=other, code="E11"),
+    )
+    assert store.concepts.load_code_system_file(icd10, str(code_file)) == 2
+
+    assert store.get_annotated_particulars(icd10, "E11") == {patient}
+    assert [concept.name for concept in store.get_concepts(patient)] == ["Type 2 diabetes mellitus"]
+    assert store.get_concepts(patient)[0] is store.concepts.get(icd10, "E11")
+
+    plan = store.plan_query(TupleQuery(concept_code="I10"))
+    assert plan.steps[0] == "code" and len(plan.candidates) == 1
+
+    store.save_tuple(DCTuple(ruit=diabetic.rui))
+    store.commit()
+    assert store.get_annotated_particulars(icd10, "E11") == set()
+
+
+def test_snapshot_is_pinned_to_its_commit():
+    first = NtoRTuple(ruin=patient, ruir=human)
+    store = make_store(first)
+    snapshot = store.snapshot()
+    second = NtoRTuple(ruin=patient, ruir=human)
+    store.save_tuple(second)
+    store.save_tuple(DCTuple(ruit=first.rui, event=TupleEventType.INVALIDATE, t=datetime.now(timezone.utc)))
+    store.commit()
+
+    query = TupleQuery(types={TupleType.NtoR}, nonrepeatable_rui=patient)
+    assert snapshot.run_query(query) == {first}
+    assert snapshot.get_tuple(second.rui) is None
+    assert store.run_query(query) == {second}
+    assert store.snapshot(snapshot.seq).get_by_referent(patient) == {first}
+
+    # A DITuple committed ahead of its tuple does not reveal the tuple to earlier snapshots
+    late = NtoRTuple(ruin=patient, ruir=human)
+    store.save_tuple(DITuple(ruit=late.rui, t=datetime.now(timezone.utc)))
+    store.commit()
+    before = store.snapshot()
+    store.save_tuple(late)
+    store.commit()
+    assert before.get_inserted_between() == []
+    assert store.get_inserted_between() == [late]
+
+
+def test_snapshot_reads_are_consistent_while_writing():
+    store = InMemoryRtStore()
+    done = threading.Event()
+    torn = []
+
+    def writer():
+        for _ in range(300):
+            ntor = NtoRTuple(ruin=ID_Rui(), ruir=human)
+            store.save_tuple(ntor)
+            store.save_tuple(DITuple(ruit=ntor.rui, ruia=author))
+            store.commit()
+        done.set()
+
+    def reader():
+        while not done.is_set():
+            snapshot = store.snapshot()
+            inserted = {tup.ruit for tup in snapshot.run_query(TupleQuery(types={TupleType.DI}))}
+            ntors = snapshot.run_query(TupleQuery(types={TupleType.NtoR}))
+            torn.extend(tup for tup in ntors if tup.rui not in inserted)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not torn
+    assert len(store.run_query(TupleQuery(types={TupleType.NtoR}))) == 300
+
+
+def test_traversals_run_while_committing_links():
+    store = InMemoryRtStore()
+    hub = ID_Rui()
+    done = threading.Event()
+    errors = []
+
+    def writer():
+        for _ in range(2000):
+            store.save_tuple(NtoNTuple(r=part_of, p=[ID_Rui(), hub]))
+            store.commit()
+        done.set()
+
+    def reader():
+        try:
+            while not done.is_set():
+                store.get_neighborhood(hub, 2)
+                store.get_path(hub, patient, 2)
+        except RuntimeError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=writer), threading.Thread(target=reader)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(store.get_neighborhood(hub, 1)) == 2001
@@ -1,4 +1,9 @@
-from rt_core_v2.ids_codes.rui import Rui, TempRef, ID_Rui
+import copy
+import pickle
+
+import pytest
+
+from rt_core_v2.ids_codes.rui import Rui, TempRef, ID_Rui, ISO_Rui, UUI, Relationship
 from uuid6 import uuid7
 from datetime import datetime, timezone
 
@@ -62,3 +67,33 @@ def test_tempref():
     )
     print_tr(p)
     print("##############\n")
+
+
+def test_vocabulary_is_interned_and_identifiers_are_hashable():
+    uuid = uuid7()
+    assert ID_Rui(uuid) == ID_Rui(uuid)
+    assert UUI("http://purl.obolibrary.org/obo/BFO_0000001") is UUI("http://purl.obolibrary.org/obo/BFO_0000001")
+    assert Relationship("http://example.org/partOf") is Relationship("http://example.org/partOf")
+    assert ISO_Rui(datetime(2024, 1, 1, tzinfo=timezone.utc)) == ISO_Rui(datetime(2024, 1, 1, tzinfo=timezone.utc))
+    assert ID_Rui() != ID_Rui()
+
+    referents = {ID_Rui(uuid): "patient"}
+    assert referents[ID_Rui(uuid)] == "patient"
+    assert len({TempRef(ID_Rui(uuid)), TempRef(ID_Rui(uuid)), TempRef()}) == 2
+
+
+def test_interned_identifiers_survive_copy_and_pickle():
+    rui = ID_Rui()
+    assert copy.deepcopy(rui) is rui
+    restored = pickle.loads(pickle.dumps([rui, Relationship("http://example.org/partOf")]))
+    assert restored[0] == rui
+    assert restored[1] is Relationship("http://example.org/partOf")
+
+
+def test_identifiers_are_immutable():
+    identifiers = [ID_Rui(), UUI("http://example.org/x"), TempRef(), Relationship("http://example.org/x")]
+    for identifier, field in zip(identifiers, ["identifier", "identifier", "ref", "uri"]):
+        with pytest.raises(AttributeError):
+            setattr(identifier, field, "http://example.org/y")
+    assert Relationship("http://example.org/x").uri == "http://example.org/x"
+    assert not hasattr(ID_Rui(), "__dict__")
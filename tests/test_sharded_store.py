@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+
+from rt_core_v2.ids_codes.rui import ID_Rui, UUI, Relationship
+from rt_core_v2.rttuple import DCTuple, DITuple, NtoDETuple, NtoNTuple, NtoRTuple, TupleType
+from rt_core_v2.metadata import TupleEventType
+from rt_core_v2.persist.rts_store import TupleQuery
+from rt_core_v2.persist.memory_store import InMemoryRtStore
+from rt_core_v2.persist.sharded_store import ShardedRtStore, shard_index, sqlite_shards
+
+human = UUI("http://purl.obolibrary.org/obo/NCBITaxon_9606")
+mrn_type = UUI("http://example.org/medical_record_number")
+denotes = Relationship("http://purl.obolibrary.org/obo/IAO_0000219")
+
+
+def save_all(store, *tuples):
+    for tup in tuples:
+        store.save_tuple(tup)
+        store.save_tuple(DITuple(ruit=tup.rui))
+    store.commit()
+
+
+def holding(store, tup):
+    return [number for number, shard in enumerate(store.shards) if shard.request("get_tuples", [tup.rui])]
+
+
+def test_tuples_are_placed_with_their_referent():
+    store = ShardedRtStore([InMemoryRtStore] * 4)
+    patients = [ID_Rui() for _ in range(20)]
+    tuples = [NtoRTuple(ruin=patient, ruir=human) for patient in patients]
+    save_all(store, *tuples)
+
+    for patient, tup in zip(patients, tuples):
+        assert holding(store, tup) == [shard_index(patient, 4)]
+        assert store.get_tuple(tup.rui) == tup
+        query = TupleQuery(types={TupleType.NtoR}, nonrepeatable_rui=patient)
+        assert store.query_shards(query) == [shard_index(patient, 4)]
+        assert store.run_query(query) == {tup}
+        # Tuples about a tuple are placed with it
+        (inserted,) = store.get_by_referent(tup.rui)
+        assert holding(store, inserted) == [shard_index(patient, 4)]
+    assert len(store.run_query(TupleQuery(types={TupleType.NtoR}))) == 20
+    assert len(store.run_query(TupleQuery(types={TupleType.DI}))) == 20
+    assert len({number for tup in tuples for number in holding(store, tup)}) > 1
+    store.shut_down()
+
+
+def test_point_reads_go_to_one_shard():
+    store = ShardedRtStore([InMemoryRtStore] * 4)
+    tuples = [NtoRTuple(ruin=ID_Rui(), ruir=human) for _ in range(8)]
+    save_all(store, *tuples)
+    sent = []
+    for number, shard in enumerate(store.shards):
+        shard.send = lambda *request, number=number, send=shard.send: (sent.append(number), send(*request))
+
+    for tup in tuples:
+        sent.clear()
+        assert store.get_tuple(tup.rui) == tup
+        assert sent == [shard_index(tup.ruin, 4)]
+        assert store.run_query(TupleQuery(rui=tup.rui)) == {tup}
+    sent.clear()
+    assert store.get_tuple(ID_Rui()) is None
+    assert sent == []
+    store.shut_down()
+
+
+def test_invalidation_and_joins_across_shards():
+    store = ShardedRtStore([InMemoryRtStore] * 3)
+    patient, mrn = ID_Rui(), ID_Rui()
+    patient_type = NtoRTuple(ruin=patient, ruir=human)
+    wrong = NtoRTuple(ruin=patient, ruir=mrn_type)
+    link = NtoNTuple(r=denotes, p=[mrn, patient])
+    save_all(store, patient_type, wrong, NtoRTuple(ruin=mrn, ruir=mrn_type), NtoDETuple(ruin=mrn, data=b"MRN-7"), link)
+    store.save_tuple(DCTuple(ruit=wrong.rui, event=TupleEventType.INVALIDATE, t=datetime.now(timezone.utc)))
+    store.commit()
+
+    assert store.run_query(TupleQuery(types={TupleType.NtoR}, nonrepeatable_rui=patient)) == {patient_type}
+    assert link in store.get_by_referent(patient)
+    assert store.get_referents_by_type_and_designator_type(human, mrn_type, "MRN-7") == {patient_type}
+    store.shut_down()
+
+
+def test_reopened_sqlite_shards(tmp_path):
+    store = ShardedRtStore(sqlite_shards(str(tmp_path), 3))
+    tuples = [NtoRTuple(ruin=ID_Rui(), ruir=human) for _ in range(6)]
+    save_all(store, *tuples)
+    store.shut_down()
+
+    reopened = ShardedRtStore(sqlite_shards(str(tmp_path), 3))
+    # The route is rebuilt from the shards, so the DCTuple is placed with the tuple it invalidates
+    invalidation = DCTuple(ruit=tuples[0].rui, event=TupleEventType.INVALIDATE, t=datetime.now(timezone.utc))
+    reopened.save_tuple(invalidation)
+    reopened.commit()
+    assert holding(reopened, invalidation) == holding(reopened, tuples[0])
+    assert all(reopened.get_tuple(tup.rui) == tup for tup in tuples)
+    assert tuples[0] not in reopened.run_query(TupleQuery(types={TupleType.NtoR}))
+    assert len(reopened.run_query(TupleQuery(types={TupleType.NtoR}))) == 5
+    assert len(reopened.route) == 13
+    reopened.shut_down()
@@ -0,0 +1,134 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from rt_core_v2.ids_codes.rui import ID_Rui, ISO_Rui, TempRef, UUI, Relationship
+from rt_core_v2.rttuple import (
+    ANTuple,
+    ARTuple,
+    DITuple,
+    DCTuple,
+    FTuple,
+    NtoNTuple,
+    NtoRTuple,
+    NtoCTuple,
+    NtoDETuple,
+    NtoLackRTuple,
+    TupleType,
+)
+from rt_core_v2.metadata import TupleEventType
+from rt_core_v2.persist.rts_store import TupleQuery
+from rt_core_v2.persist.sqlite_store import SqliteRtStore
+
+patient = ID_Rui()
+author = ID_Rui()
+human = UUI("http://purl.obolibrary.org/obo/NCBITaxon_9606")
+part_of = Relationship("http://purl.obolibrary.org/obo/BFO_0000050")
+
+
+def make_store(*tuples, path=":memory:"):
+    store = SqliteRtStore(path)
+    for tup in tuples:
+        store.save_tuple(tup)
+    store.commit()
+    return store
+
+
+def test_every_tuple_type_round_trips(tmp_path):
+    tuples = [
+        ANTuple(ruin=patient),
+        ARTuple(ruir=human),
+        DITuple(ruit=patient, ruia=author, ta=TempRef(ISO_Rui(datetime.now(timezone.utc)))),
+        DCTuple(ruit=patient, event=TupleEventType.REVALIDATE, replacements=[ID_Rui(), ID_Rui()]),
+        FTuple(ruitn=patient, C=0.25),
+        NtoNTuple(polarity=False, r=part_of, p=[patient, ID_Rui()]),
+        NtoRTuple(ruin=patient, ruir=human),
+        NtoCTuple(ruin=patient, code="E11.9"),
+        NtoDETuple(ruin=patient, data=b"\x00\xffraw"),
+        NtoLackRTuple(ruin=patient, ruir=human),
+    ]
+    path = str(tmp_path / "rts.db")
+    make_store(*tuples, path=path).shut_down()
+
+    store = SqliteRtStore(path)
+    for tup in tuples:
+        assert store.get_tuple(tup.rui) == tup
+    # Commits sync the WAL, synchronous=FULL
+    assert store.connection.execute("PRAGMA synchronous").fetchone() == (2,)
+    store.shut_down()
+
+
+def test_saved_tuples_are_isolated_per_thread_until_commit(tmp_path):
+    store = SqliteRtStore(str(tmp_path / "rts.db"), batch_size=4)
+    mine = [ANTuple(ruin=patient) for _ in range(6)]
+    for tup in mine:
+        store.save_tuple(tup)
+    assert store.get_tuple(mine[0].rui) is None
+    assert store.run_query(TupleQuery(types={TupleType.AN})) == set()
+
+    other = ANTuple(ruin=patient)
+
+    def other_writer():
+        store.save_tuple(other)
+        store.rollback()
+
+    thread = threading.Thread(target=other_writer)
+    thread.start()
+    thread.join()
+    store.commit()
+    assert store.run_query(TupleQuery(types={TupleType.AN})) == set(mine)
+    assert store.get_tuple(other.rui) is None
+    store.shut_down()
+
+
+def test_naive_timestamps_stay_naive():
+    now = datetime.now()
+    naive, aware = DITuple(t=now), DITuple(t=now.astimezone(timezone.utc))
+    store = make_store(naive, aware)
+    assert store.get_tuple(naive.rui).t.tzinfo is None
+    assert store.get_tuple(naive.rui) == naive and store.get_tuple(aware.rui) == aware
+    bound = TempRef(ISO_Rui(now.astimezone(timezone.utc)))
+    assert store.run_query(TupleQuery(types={TupleType.DI}, begin_timestamp=bound, end_timestamp=bound)) == {naive, aware}
+
+
+def test_get_by_referent_and_author():
+    a = ANTuple(ruin=patient)
+    di = DITuple(ruit=a.rui, ruia=author)
+    ntor = NtoRTuple(ruin=patient, ruir=human)
+    nton = NtoNTuple(r=part_of, p=[ID_Rui(), patient])
+    store = make_store(a, di, ntor, nton, ANTuple())
+
+    assert store.get_by_referent(patient) == {a, ntor, nton}
+    assert store.get_by_referent(human) == {ntor}
+    assert store.get_by_author(author) == {a, di}
+
+
+def test_run_query():
+    now = datetime.now(timezone.utc)
+    ntor = NtoRTuple(ruin=patient, ruir=human, polarity=True)
+    negated = NtoRTuple(ruin=patient, ruir=human, polarity=False)
+    nton = NtoNTuple(r=part_of, p=[patient])
+    recent = DITuple(t=now - timedelta(days=1))
+    store = make_store(ntor, negated, nton, recent, DITuple(t=now - timedelta(days=10)))
+
+    assert store.run_query(TupleQuery(nonrepeatable_rui=patient, repeatable_uui=human, polarity=False)) == {negated}
+    assert store.run_query(TupleQuery(nonrepeatable_rui=patient, types={TupleType.NtoN})) == {nton}
+    assert store.run_query(TupleQuery(begin_timestamp=TempRef(ISO_Rui(now - timedelta(days=7))))) == {recent}
+
+
+def test_get_referents_by_type_and_designator_type():
+    mrn_type = UUI("http://example.org/medical_record_number")
+    mrn = ID_Rui()
+    patient_type = NtoRTuple(ruin=patient, ruir=human)
+    store = make_store(
+        patient_type,
+        NtoRTuple(ruin=mrn, ruir=mrn_type),
+        NtoDETuple(ruin=mrn, data=b"MRN-0042"),
+        NtoNTuple(r=part_of, p=[mrn, patient]),
+    )
+
+    assert store.get_referents_by_type_and_designator_type(human, mrn_type, "MRN-0042") == {patient_type}
+
+    link = store.run_query(TupleQuery(types={TupleType.NtoN}, nonrepeatable_rui=mrn)).pop()
+    store.save_tuple(DCTuple(ruit=link.rui, event=TupleEventType.INVALIDATE, t=datetime.now(timezone.utc)))
+    store.commit()
+    assert store.get_referents_by_type_and_designator_type(human, mrn_type, "MRN-0042") == set()
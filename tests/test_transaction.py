@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from rt_core_v2.rttuple import DITuple, NtoRTuple
+from rt_core_v2.persist.transaction import WriteBuffer, GroupCommitter
+from rt_core_v2.persist import log_store
+from rt_core_v2.persist.log_store import LogRtStore
+
+
+def test_write_buffer_is_per_thread():
+    buffer = WriteBuffer()
+    buffer.save(NtoRTuple())
+    other = []
+    thread = threading.Thread(target=lambda: other.append(buffer.take()))
+    thread.start()
+    thread.join()
+    assert other == [[]]
+    assert len(buffer.take()) == 1 and buffer.take() == []
+
+
+def test_concurrent_commits_are_grouped():
+    groups = []
+
+    def write_group(transactions):
+        groups.append(transactions)
+        time.sleep(0.05)
+
+    committer = GroupCommitter(write_group)
+    transactions = []
+    for _ in range(8):
+        ntor = NtoRTuple()
+        transactions.append([ntor, DITuple(ruit=ntor.rui)])
+    threads = [threading.Thread(target=committer.commit, args=(transaction,)) for transaction in transactions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    written = [transaction for group in groups for transaction in group]
+    assert sorted(map(id, written)) == sorted(map(id, transactions))
+    assert len(groups) < len(transactions)
+
+
+def test_group_errors_reach_every_writer():
+    def write_group(transactions):
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        GroupCommitter(write_group).commit([NtoRTuple()])
+
+
+def test_log_store_group_commit(tmp_path, monkeypatch):
+    syncs = []
+    real_fsync = log_store.os.fsync
+
+    def counting_fsync(descriptor):
+        syncs.append(descriptor)
+        time.sleep(0.02)
+        real_fsync(descriptor)
+
+    monkeypatch.setattr(log_store.os, "fsync", counting_fsync)
+    store = LogRtStore(str(tmp_path))
+    committed = []
+
+    def writer():
+        for _ in range(5):
+            ntor = NtoRTuple()
+            store.save_tuple(ntor)
+            store.save_tuple(DITuple(ruit=ntor.rui))
+            store.commit()
+            committed.append(ntor)
+
+    threads = [threading.Thread(target=writer) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(committed) == 30
+    assert all(store.get_tuple(ntor.rui) == ntor for ntor in committed)
+    assert len(syncs) < 30
+    store.shut_down()
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+
+from rt_core_v2.ids_codes.rui import ID_Rui, UUI
+from rt_core_v2.rttuple import DCTuple, NtoRTuple, TupleType
+from rt_core_v2.metadata import TupleEventType
+from rt_core_v2.persist.rts_store import TupleQuery
+from rt_core_v2.persist.validity import ValidityView
+from rt_core_v2.persist.memory_store import InMemoryRtStore
+from rt_core_v2.persist.sqlite_store import SqliteRtStore
+from rt_core_v2.persist.log_store import LogRtStore
+
+start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def change(tup, event, days):
+    return DCTuple(ruit=tup.rui, event=event, t=start + timedelta(days=days))
+
+
+def test_latest_event_decides_validity():
+    tup = NtoRTuple()
+    view = ValidityView()
+    assert view.is_valid(tup.rui) and view.latest_event(tup.rui) is None
+
+    invalidation = change(tup, TupleEventType.INVALIDATE, 1)
+    view.apply(invalidation)
+    assert not view.is_valid(tup.rui)
+
+    revalidation = change(tup, TupleEventType.REVALIDATE, 3)
+    view.apply(revalidation)
+    assert view.is_valid(tup.rui)
+    # A late arriving older event does not override the latest one
+    view.apply(change(tup, TupleEventType.INVALIDATE, 2))
+    assert view.is_valid(tup.rui) and view.latest_event(tup.rui) is revalidation
+
+
+def check_store(store):
+    human = UUI("http://purl.obolibrary.org/obo/NCBITaxon_9606")
+    patient = ID_Rui()
+    wrong, right = NtoRTuple(ruin=patient, ruir=human), NtoRTuple(ruin=patient, ruir=human)
+    for tup in (wrong, right, change(wrong, TupleEventType.INVALIDATE, 1)):
+        store.save_tuple(tup)
+    store.commit()
+
+    query = TupleQuery(types={TupleType.NtoR}, nonrepeatable_rui=patient)
+    assert store.run_query(query) == {right}
+    query.include_invalid = True
+    assert store.run_query(query) == {wrong, right}
+
+    store.save_tuple(change(wrong, TupleEventType.REVALIDATE, 2))
+    store.rollback()
+    assert store.run_query(TupleQuery(types={TupleType.NtoR})) == {right}
+    return wrong, right
+
+
+def test_stores_leave_out_invalidated_tuples(tmp_path):
+    check_store(InMemoryRtStore())
+    check_store(LogRtStore(str(tmp_path / "log")))
+
+    path = str(tmp_path / "tuples.db")
+    wrong, right = check_store(SqliteRtStore(path))
+    reopened = SqliteRtStore(path)
+    assert not reopened.validity.is_valid(wrong.rui)
+    assert reopened.run_query(TupleQuery(types={TupleType.NtoR})) == {right}